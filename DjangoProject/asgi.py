@@ -3,6 +3,13 @@ ASGI config for DjangoProject project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
 
+SSE-поток доски заявок (/system/api/service-requests/events/) держит соединение
+открытым и требует ASGI-сервера, например:
+
+    uvicorn DjangoProject.asgi:application --workers 1
+
+При нескольких процессах задайте SERVICE_REQUEST_EVENT_BROKER = DatabaseBroker.
+
 For more information on this file, see
 https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
 """
@@ -10,8 +10,11 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 import os
+import sys
 from pathlib import Path
 
+from django.core.exceptions import ImproperlyConfigured
+
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -46,6 +49,10 @@ INSTALLED_APPS = [
 AUTH_USER_MODEL = 'core.User'
 
 MIDDLEWARE = [
+    # Журнал запросов берёт число SQL-запросов у профилировщика, поэтому стоит перед ним
+    'core.access_log.AccessLogMiddleware',
+    # Раньше остальных, чтобы в общее время вошли все middleware (core/profiling.py)
+    'core.profiling.ProfilingMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',
@@ -54,6 +61,8 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    # После POST клиент читает основную базу, пока реплика не догонит (core/db_router.py)
+    'core.db_router.ReplicaStickinessMiddleware',
 ]
 
 STATICFILES_STORAGE = 'whitenoise.storage.CompressedManifestStaticFilesStorage'
@@ -82,15 +91,81 @@ WSGI_APPLICATION = 'DjangoProject.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
 
+# Профиль окружения: production | development (переменная DJANGO_ENV; без неё —
+# development при DEBUG, иначе production). Параметры SQLite берутся из профиля;
+# любую PRAGMA можно переопределить переменной окружения SQLITE_<ИМЯ>, например
+# SQLITE_MMAP_SIZE=0.
+DJANGO_ENV = os.environ.get('DJANGO_ENV', 'development' if DEBUG else 'production')
+
+SQLITE_PROFILES = {
+    'production': {
+        'CONN_MAX_AGE': None,
+        'PRAGMAS': {
+            'journal_mode': 'WAL',         # читатели не ждут писателя
+            'synchronous': 'NORMAL',       # с WAL не теряет целостность, fsync только на checkpoint
+            'busy_timeout': 5000,          # мс ожидания блокировки внутри SQLite
+            'cache_size': -64000,          # ~64 МБ страничного кэша на соединение
+            'mmap_size': 268435456,        # 256 МБ файла читаются через mmap
+            'temp_store': 'MEMORY',
+        },
+        'RETRY': {'attempts': 5, 'base_delay': 0.05, 'max_delay': 1.0},
+    },
+    'development': {
+        'CONN_MAX_AGE': 0,
+        'PRAGMAS': {
+            # WAL записывается в заголовок файла: db.sqlite3 в репозитории менялся бы
+            # от любого manage.py check или прогона тестов
+            'journal_mode': 'DELETE',
+            'synchronous': 'NORMAL',
+            'busy_timeout': 2000,
+            'cache_size': -8000,
+            'mmap_size': 0,
+            'temp_store': 'MEMORY',
+        },
+        'RETRY': {'attempts': 3, 'base_delay': 0.05, 'max_delay': 0.5},
+    },
+}
+if DJANGO_ENV not in SQLITE_PROFILES:
+    raise ImproperlyConfigured(
+        f"Неизвестный DJANGO_ENV={DJANGO_ENV!r}; допустимые значения: {', '.join(SQLITE_PROFILES)}"
+    )
+_sqlite = SQLITE_PROFILES[DJANGO_ENV]
+_pragmas = {name: os.environ.get(f'SQLITE_{name.upper()}', value) for name, value in _sqlite['PRAGMAS'].items()}
+
+# core/db_backends/sqlite3: штатный бэкенд SQLite + повтор при «database is locked»
+# и проверка постоянных соединений перед использованием.
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
+        'ENGINE': 'core.db_backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        'CONN_MAX_AGE': _sqlite['CONN_MAX_AGE'],
+        'CONN_HEALTH_CHECKS': True,
+        'OPTIONS': {
+            'init_command': '; '.join(f'PRAGMA {name}={value}' for name, value in _pragmas.items()),
+            # Блокировка записи берётся в BEGIN, а не при первой записи посреди транзакции
+            'transaction_mode': 'IMMEDIATE',
+            'retry': _sqlite['RETRY'],
+        },
     }
 }
 
+# Реплика для тяжёлых списков (core/db_router.py): копия основной базы, которую
+# обновляет manage.py refresh_replica. Пока реплика не синхронизирована или
+# отстаёт больше REPLICA_MAX_LAG секунд, всё читается с основной базы.
+DATABASES['replica'] = {
+    **DATABASES['default'],
+    'NAME': BASE_DIR / 'db.replica.sqlite3',
+    'TEST': {'MIRROR': 'default'},
+}
+DATABASE_ROUTERS = ['core.db_router.ReplicaRouter']
+REPLICA_MAX_LAG = 30
+
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
+# Кто передаёт медиафайлы (core/media.py): None — воркер (sendfile через gunicorn),
+# 'accel' — nginx по X-Accel-Redirect в MEDIA_ACCEL_PREFIX, 'sendfile' — X-Sendfile.
+MEDIA_SERVE_MODE = os.environ.get('MEDIA_SERVE_MODE') or None
+MEDIA_ACCEL_PREFIX = '/protected-media/'
 
 
 # Password validation
@@ -138,13 +213,45 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 SESSION_EXPIRE_AT_BROWSER_CLOSE = False
 
+# default — LRU в памяти процесса перед общим DatabaseCache (core/cache_backends.py).
+# Коды входа/регистрации (login_code_*, registration_code_*) читаются только из общего кэша.
 CACHES = {
     "default": {
+        "BACKEND": "core.cache_backends.TwoTierCache",
+        "OPTIONS": {
+            "SHARED": "shared",
+            "MAX_ENTRIES": 1000,
+            "LOCAL_TIMEOUT": 5,
+            "INVALIDATION_INTERVAL": 1,
+        },
+    },
+    "shared": {
         "BACKEND": "django.core.cache.backends.db.DatabaseCache",
         "LOCATION": "my_cache_table", # Replace with your desired table name
-    }
+        # Здесь живут эпоха TwoTierCache и версии http_cache: стандартные 300 записей
+        # переполнялись бы, а отсев удаляет треть таблицы вместе с ними
+        "OPTIONS": {"MAX_ENTRIES": 20000},
+    },
 }
 
+# Брокер SSE-событий доски заявок (ServiceRequest/events.py).
+# InProcessBroker — один ASGI-процесс; DatabaseBroker — несколько процессов на одной базе.
+SERVICE_REQUEST_EVENT_BROKER = 'ServiceRequest.events.InProcessBroker'
+
+# Профилирование запросов (core/profiling.py): Server-Timing для сотрудников,
+# выборка медленных запросов с планами EXPLAIN — в ротируемый лог.
+PROFILING_SLOW_MS = 500
+PROFILING_SAMPLE_RATE = 0.1
+PROFILING_LOG_FILE = os.path.join(BASE_DIR, 'logs', 'slow_requests.log')
+
+# Журнал запросов JSONL (core/access_log.py), пишется фоновым потоком; разбор — manage.py access_log_stats.
+# Файл свой у каждого процесса ({pid}): ротацию общего файла воркеры делали бы наперегонки
+ACCESS_LOG_FILE = os.path.join(BASE_DIR, 'logs', 'access.{pid}.jsonl')
+# Под manage.py test журнал выключен; тесты журнала и бенчмарки эндпоинтов включают его сами
+ACCESS_LOG_ENABLED = sys.argv[1:2] != ['test']
+ACCESS_LOG_MAX_BYTES = 50 * 1024 * 1024
+ACCESS_LOG_ROTATE_INTERVAL = 60 * 60 * 24
+
 # EMAIL_BACKEND = 'django.core.mail.backends.console.EmailBackend'
 EMAIL_BACKEND = 'django.core.mail.backends.smtp.EmailBackend'
 
@@ -7,11 +7,11 @@ from django.urls import path
 from crm import views as crm_views
 
 from core import views as core_views
+from core.media import serve_media
 
 from ServiceRequest import views as ServiceRequest_views
 
 from django.conf import settings
-from django.conf.urls.static import static
 
 
 
@@ -20,6 +20,8 @@ urlpatterns = [
     path('', core_views.home, name='home'),
     path('catalog/', core_views.computer_catalog, name='computer_catalog'),
     path('api/computer/<int:computer_id>/', core_views.computer_api_detail, name='computer_api_detail'),
+    path('api/computers/', core_views.computer_list_api, name='computer_list_api'),
+    path('api/catalog/facets/', core_views.catalog_facets_api, name='catalog_facets_api'),
     path('search/', core_views.search, name='search'),
     path('contact/', core_views.contact, name='contact'),
     path('article/', core_views.article, name='article'),
@@ -28,4 +30,6 @@ urlpatterns = [
     path('logout/', core_views.custom_logout_view, name='logout'),
     path('system/', include('crm.urls')),
     path('auth/', include('core.urls')),
-] + static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
+    # Медиа с ETag, Range и долгим кэшем; передачу может взять на себя nginx (core/media.py)
+    path(settings.MEDIA_URL.lstrip('/') + '<path:path>', serve_media, name='media'),
+]
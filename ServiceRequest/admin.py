@@ -3,7 +3,8 @@
 from django.contrib import admin
 from django import forms
 from django.utils.safestring import mark_safe
-from .models import ServiceRequest, IssueOption, Tag
+from .models import ServiceRequest, IssueOption, Tag, RequestCounter
+from . import search
 
 
 # ===========================
@@ -131,6 +132,13 @@ class ServiceRequestAdmin(admin.ModelAdmin):
         }),
     )
 
+    def get_search_results(self, request, queryset, search_term):
+        # Поиск через FTS5-индекс вместо icontains по шести полям (полный проход таблицы)
+        found = search.filter_queryset(queryset, search_term)
+        if found is None:
+            return super().get_search_results(request, queryset, search_term)
+        return found, False
+
     def save_model(self, request, obj, form, change):
         if not change:  # при создании
             obj.created_by = request.user
@@ -138,22 +146,52 @@ class ServiceRequestAdmin(admin.ModelAdmin):
 
     @admin.display(description='Теги')
     def display_tags(self, obj):
-        if not obj.tags.exists():
+        # Берём денормализованный снимок: без запросов на каждую строку списка
+        if not obj.tags_snapshot:
             return mark_safe('<span style="color: #6b7280; font-size: 12px;">—</span>')
 
         tags = []
-        for tag in obj.tags.all():
+        for tag in obj.tags_snapshot:
             tags.append(
                 f'<span style="'
-                f'color: {tag.color}; '
-                f'background-color: {tag.color}22; '
-                f'border: 1px solid {tag.color}; '
+                f'color: {tag["color"]}; '
+                f'background-color: {tag["color"]}22; '
+                f'border: 1px solid {tag["color"]}; '
                 f'padding: 2px 6px; '
                 f'border-radius: 4px; '
                 f'font-size: 12px; '
                 f'font-weight: 500; '
                 f'white-space: nowrap;">'
-                f'{tag.name}'
+                f'{tag["name"]}'
                 f'</span>'
             )
-        return mark_safe(' '.join(tags))
\ No newline at end of file
+        return mark_safe(' '.join(tags))
+
+
+# ===========================
+# Админка: Счётчики заявок (RequestCounter)
+# ===========================
+
+@admin.register(RequestCounter)
+class RequestCounterAdmin(admin.ModelAdmin):
+    """
+    Итоги по заявкам только для чтения.
+    Ведутся автоматически; сверка — manage.py recount_request_counters.
+    """
+    list_display = ('status', 'device_type', 'customer_type', 'count')
+    list_filter = ('status', 'device_type', 'customer_type')
+    ordering = ('status', 'device_type', 'customer_type')
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
+
+    def changelist_view(self, request, extra_context=None):
+        extra_context = extra_context or {}
+        extra_context['subtitle'] = f"Всего заявок: {RequestCounter.totals()['total']}"
+        return super().changelist_view(request, extra_context=extra_context)
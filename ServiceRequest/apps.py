@@ -4,3 +4,11 @@ from django.apps import AppConfig
 class ServicerequestConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'ServiceRequest'
+
+    def ready(self):
+        from django.db.models.signals import post_migrate
+
+        from . import signals  # noqa: F401
+        from .search import ensure_triggers
+
+        post_migrate.connect(ensure_triggers, sender=self)
@@ -0,0 +1,110 @@
+# ServiceRequest/bulk.py
+from django.db import transaction
+from django.utils import timezone
+
+from core.http_cache import bump_versions
+
+from .events import BOARD_CARD_FIELDS, board_card, publish_request_event
+from .models import RequestCounter, ServiceRequest, Tag
+from .tag_snapshot import rebuild_tag_snapshots
+
+BULK_MAX_IDS = 500
+
+
+class BulkUpdateError(ValueError):
+    """Некорректный запрос на массовое обновление (ответ 400)."""
+
+
+def bulk_update_requests(ids, status=None, add_tags=(), remove_tags=(), can_edit=None):
+    """
+    Меняет статус и/или теги у набора заявок в одной транзакции.
+
+    Вместо save() на каждую заявку выполняются set-based запросы: один UPDATE
+    статуса, один INSERT недостающих связей с тегами и один DELETE лишних.
+    Сигналы модели при этом не срабатывают, поэтому счётчики, снимки тегов,
+    версии для ETag и SSE-события обновляются здесь явно.
+
+    can_edit(created_by_id) -> bool ограничивает доступ к отдельным заявкам.
+    Возвращает список {'id', 'result'}, где result — updated / unchanged /
+    not_found / forbidden.
+    """
+    if status is not None and status not in dict(ServiceRequest.STATUS_CHOICES):
+        raise BulkUpdateError('Недопустимое значение статуса')
+
+    add_codes, remove_codes = set(add_tags), set(remove_tags)
+    if add_codes & remove_codes:
+        raise BulkUpdateError('Один и тот же тег нельзя одновременно добавить и удалить')
+    tag_ids = dict(Tag.objects.filter(code__in=add_codes | remove_codes).values_list('code', 'id'))
+    unknown = (add_codes | remove_codes) - tag_ids.keys()
+    if unknown:
+        raise BulkUpdateError(f"Неизвестные теги: {', '.join(sorted(unknown))}")
+    add_ids = {tag_ids[code] for code in add_codes}
+    remove_ids = {tag_ids[code] for code in remove_codes}
+
+    results = {}
+    through = ServiceRequest.tags.through
+    with transaction.atomic():
+        rows = {
+            row[0]: row
+            for row in ServiceRequest.objects.select_for_update()
+            .filter(id__in=ids)
+            .values_list('id', 'created_by_id', *RequestCounter.KEY_FIELDS)
+        }
+        editable = []
+        for pk in ids:
+            if pk not in rows:
+                results[pk] = 'not_found'
+            elif can_edit is not None and not can_edit(rows[pk][1]):
+                results[pk] = 'forbidden'
+            else:
+                editable.append(pk)
+
+        status_changed = set()
+        if status is not None:
+            status_changed = {pk for pk in editable if rows[pk][2] != status}
+
+        tags_changed = set()
+        if add_ids:
+            existing = set(
+                through.objects.filter(servicerequest_id__in=editable, tag_id__in=add_ids)
+                .values_list('servicerequest_id', 'tag_id')
+            )
+            missing = [
+                through(servicerequest_id=pk, tag_id=tag_id)
+                for pk in editable for tag_id in add_ids
+                if (pk, tag_id) not in existing
+            ]
+            through.objects.bulk_create(missing)
+            tags_changed.update(link.servicerequest_id for link in missing)
+        if remove_ids:
+            to_remove = through.objects.filter(servicerequest_id__in=editable, tag_id__in=remove_ids)
+            tags_changed.update(to_remove.values_list('servicerequest_id', flat=True))
+            to_remove.delete()
+
+        now = timezone.now()
+        if status_changed:
+            ServiceRequest.objects.filter(id__in=status_changed).update(status=status, updated_at=now)
+            deltas = {}
+            for pk in status_changed:
+                old_key = rows[pk][2:]
+                new_key = (status,) + old_key[1:]
+                deltas[old_key] = deltas.get(old_key, 0) - 1
+                deltas[new_key] = deltas.get(new_key, 0) + 1
+            RequestCounter.apply_deltas(deltas)
+        if tags_changed:
+            ServiceRequest.objects.filter(id__in=tags_changed - status_changed).update(updated_at=now)
+            rebuild_tag_snapshots(tags_changed)
+
+        changed = status_changed | tags_changed
+        for pk in editable:
+            results[pk] = 'updated' if pk in changed else 'unchanged'
+
+        if changed:
+            bump_versions('servicerequest', changed)
+            for req in ServiceRequest.objects.filter(id__in=changed).only(*BOARD_CARD_FIELDS):
+                if req.id in status_changed:
+                    publish_request_event('status', board_card(req))
+                if req.id in tags_changed:
+                    publish_request_event('tags', board_card(req))
+
+    return [{'id': pk, 'result': results[pk]} for pk in ids]
@@ -0,0 +1,198 @@
+# ServiceRequest/events.py
+"""
+Рассылка изменений заявок подключённым браузерам (Server-Sent Events).
+
+Брокер выбирается настройкой SERVICE_REQUEST_EVENT_BROKER:
+
+* InProcessBroker — очереди в памяти процесса. Подходит, когда ASGI-сервер
+  запущен одним процессом и сам обрабатывает изменения заявок.
+* DatabaseBroker — события пишутся в таблицу BoardEvent и читаются опросом.
+  Работает между несколькими процессами (в т.ч. WSGI-воркер публикует,
+  ASGI-процесс раздаёт) без внешних сервисов.
+"""
+import asyncio
+import itertools
+import json
+import threading
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import transaction
+from django.utils.module_loading import import_string
+
+DEFAULT_BROKER = 'ServiceRequest.events.InProcessBroker'
+SUBSCRIBER_QUEUE_SIZE = 100
+
+BOARD_CARD_FIELDS = (
+    'id', 'full_name', 'device_type', 'customer_type', 'status', 'created_at', 'tags_snapshot',
+)
+
+
+def board_card(req):
+    """Данные карточки канбан-доски: общие для API колонок и SSE-событий"""
+    return {
+        'id': req.id,
+        'status': req.status,
+        'full_name': req.full_name,
+        'device_type_display': req.get_device_type_display(),
+        'customer_type_display': req.get_customer_type_display(),
+        'created_at': req.created_at.isoformat(),
+        'tags': req.tags_snapshot,
+    }
+
+
+class InProcessBroker:
+    """Брокер в памяти: publish() потокобезопасен, subscribe() — асинхронный итератор."""
+
+    def __init__(self, queue_size=SUBSCRIBER_QUEUE_SIZE):
+        self.queue_size = queue_size
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self._subscribers = set()
+
+    def publish(self, event_type, data):
+        with self._lock:
+            event = {'id': next(self._ids), 'type': event_type, 'data': data}
+            subscribers = list(self._subscribers)
+        for loop, queue in subscribers:
+            # Синхронные представления работают в другом потоке, чем цикл подписчика
+            loop.call_soon_threadsafe(self._deliver, queue, event)
+        return event
+
+    @staticmethod
+    def _deliver(queue, event):
+        try:
+            queue.put_nowait(event)
+        except asyncio.QueueFull:
+            # Медленный клиент: вместо блокировки просим его перезагрузить доску
+            queue.overflowed = True
+
+    async def subscribe(self, last_event_id=None):
+        queue = asyncio.Queue(maxsize=self.queue_size)
+        queue.overflowed = False
+        subscriber = (asyncio.get_running_loop(), queue)
+        with self._lock:
+            self._subscribers.add(subscriber)
+        try:
+            while True:
+                event = await queue.get()
+                if queue.overflowed:
+                    # Часть событий потеряна: остальные из очереди уже бесполезны
+                    while not queue.empty():
+                        event = queue.get_nowait()
+                    queue.overflowed = False
+                    yield {'id': event['id'], 'type': 'resync', 'data': {}}
+                    continue
+                yield event
+        finally:
+            with self._lock:
+                self._subscribers.discard(subscriber)
+
+
+class DatabaseBroker:
+    """
+    Брокер поверх таблицы BoardEvent: общий для всех процессов, использующих одну базу.
+    Поддерживает Last-Event-ID — переподключившийся клиент получит пропущенное.
+    """
+
+    def __init__(self, poll_interval=1.0, keep_events=1000):
+        self.poll_interval = poll_interval
+        self.keep_events = keep_events
+
+    def publish(self, event_type, data):
+        from .models import BoardEvent
+
+        event = BoardEvent.objects.create(event_type=event_type, payload=data)
+        if event.id % 100 == 0:
+            BoardEvent.objects.filter(id__lte=event.id - self.keep_events).delete()
+        return {'id': event.id, 'type': event_type, 'data': data}
+
+    @staticmethod
+    def _latest_id():
+        from .models import BoardEvent
+
+        return BoardEvent.objects.order_by('-id').values_list('id', flat=True).first() or 0
+
+    @staticmethod
+    def _fetch_after(last_id):
+        from .models import BoardEvent
+
+        events = list(
+            BoardEvent.objects.filter(id__gt=last_id).order_by('id')
+            .values_list('id', 'event_type', 'payload')[:SUBSCRIBER_QUEUE_SIZE]
+        )
+        if events:
+            last_id = events[-1][0]
+        return last_id, [{'id': pk, 'type': kind, 'data': payload} for pk, kind, payload in events]
+
+    async def subscribe(self, last_event_id=None):
+        # Опрос идёт в пуле потоков, не занимая общий поток синхронных представлений
+        fetch = sync_to_async(self._fetch_after, thread_sensitive=False)
+        if last_event_id is None:
+            last_id = await sync_to_async(self._latest_id, thread_sensitive=False)()
+        else:
+            last_id = last_event_id
+        while True:
+            last_id, events = await fetch(last_id)
+            for event in events:
+                yield event
+            if not events:
+                await asyncio.sleep(self.poll_interval)
+
+
+async def sse_stream(events, heartbeat):
+    """
+    Сообщения SSE для асинхронного итератора событий events; если heartbeat
+    секунд событий нет — комментарий-«пинг», чтобы прокси не закрыл соединение.
+
+    Ожидающий __anext__ живёт в одной задаче между пингами: отменить его по
+    таймауту (как сделал бы wait_for) значило бы закрыть генератор подписки.
+    """
+    events = events.__aiter__()
+    # Совет браузеру, через сколько миллисекунд переподключаться
+    yield 'retry: 3000\n\n'
+    pending = None
+    try:
+        while True:
+            if pending is None:
+                pending = asyncio.ensure_future(events.__anext__())
+            done, _ = await asyncio.wait({pending}, timeout=heartbeat)
+            if not done:
+                yield ': ping\n\n'
+                continue
+            try:
+                event = pending.result()
+            except StopAsyncIteration:
+                return
+            finally:
+                pending = None
+            data = json.dumps(event['data'], ensure_ascii=False)
+            yield f"id: {event['id']}\nevent: {event['type']}\ndata: {data}\n\n"
+    finally:
+        if pending is not None:
+            pending.cancel()
+            try:
+                await pending
+            except (asyncio.CancelledError, StopAsyncIteration):
+                pass
+        await events.aclose()
+
+
+_broker = None
+_broker_lock = threading.Lock()
+
+
+def get_broker():
+    """Брокер процесса, созданный по настройке SERVICE_REQUEST_EVENT_BROKER."""
+    global _broker
+    if _broker is None:
+        with _broker_lock:
+            if _broker is None:
+                path = getattr(settings, 'SERVICE_REQUEST_EVENT_BROKER', DEFAULT_BROKER)
+                _broker = import_string(path)()
+    return _broker
+
+
+def publish_request_event(event_type, data):
+    """Публикует событие после фиксации транзакции, чтобы клиенты не увидели откатанное."""
+    transaction.on_commit(lambda: get_broker().publish(event_type, data))
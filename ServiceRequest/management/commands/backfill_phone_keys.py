@@ -0,0 +1,39 @@
+from django.core.management.base import BaseCommand
+
+from core.phones import normalize_phone
+from ServiceRequest.models import ServiceRequest
+
+
+class Command(BaseCommand):
+    help = "Заполняет нормализованный телефон (phone_key) у заявок, где он пуст или устарел."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=500,
+            help='Сколько заявок обновлять за один UPDATE.',
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        batch, updated, unparsed = [], 0, 0
+        rows = ServiceRequest.objects.values_list('id', 'phone_number', 'phone_key').iterator(chunk_size=2000)
+        for pk, phone, current in rows:
+            key = normalize_phone(phone)
+            if not key:
+                unparsed += 1
+            if key != current:
+                # bulk_update не трогает updated_at: это служебное поле, а не правка заявки
+                batch.append(ServiceRequest(id=pk, phone_key=key))
+            if len(batch) >= batch_size:
+                ServiceRequest.objects.bulk_update(batch, ['phone_key'])
+                updated += len(batch)
+                batch = []
+        if batch:
+            ServiceRequest.objects.bulk_update(batch, ['phone_key'])
+            updated += len(batch)
+
+        self.stdout.write(self.style.SUCCESS(f"Обновлено заявок: {updated}."))
+        if unparsed:
+            self.stdout.write(self.style.WARNING(f"Не удалось разобрать номер у {unparsed} заявок."))
@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from ServiceRequest.search import fts_available, rebuild_search_index
+
+
+class Command(BaseCommand):
+    help = "Пересобирает полнотекстовый индекс заявок (FTS5) по текущим данным."
+
+    def handle(self, *args, **options):
+        if not fts_available():
+            raise CommandError("Полнотекстовый индекс поддерживается только на SQLite (FTS5).")
+        total = rebuild_search_index()
+        self.stdout.write(self.style.SUCCESS(f"Поисковый индекс пересобран: {total} заявок."))
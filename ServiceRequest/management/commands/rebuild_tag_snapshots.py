@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+
+from ServiceRequest.tag_snapshot import SNAPSHOT_BATCH_SIZE, rebuild_tag_snapshots
+
+
+class Command(BaseCommand):
+    help = "Пересобирает денормализованный снимок тегов (tags_snapshot) у всех заявок."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=SNAPSHOT_BATCH_SIZE,
+            help='Сколько заявок обновлять за один UPDATE.',
+        )
+
+    def handle(self, *args, **options):
+        total = rebuild_tag_snapshots(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f"Снимки тегов пересобраны: {total} заявок."))
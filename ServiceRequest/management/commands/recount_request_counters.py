@@ -0,0 +1,50 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import Count
+
+from ServiceRequest.models import RequestCounter, ServiceRequest
+
+
+class Command(BaseCommand):
+    help = "Пересчитывает счётчики заявок (RequestCounter) по таблице заявок и сообщает о расхождениях."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--check',
+            action='store_true',
+            help='Только сообщить о расхождениях, не исправляя их (код выхода 1 при расхождении).',
+        )
+
+    def handle(self, *args, **options):
+        key_fields = RequestCounter.KEY_FIELDS
+        with transaction.atomic():
+            actual = {
+                tuple(row[f] for f in key_fields): row['n']
+                for row in ServiceRequest.objects.values(*key_fields).annotate(n=Count('id')).order_by()
+            }
+            stored = {
+                tuple(row[:-1]): row[-1]
+                for row in RequestCounter.objects.values_list(*key_fields, 'count')
+            }
+
+            drift = {
+                key: actual.get(key, 0) - stored.get(key, 0)
+                for key in actual.keys() | stored.keys()
+                if actual.get(key, 0) != stored.get(key, 0)
+            }
+            for key, delta in sorted(drift.items()):
+                self.stdout.write(self.style.WARNING(
+                    f"Расхождение {' / '.join(key)}: в счётчике {stored.get(key, 0)}, "
+                    f"фактически {actual.get(key, 0)} ({delta:+d})"
+                ))
+
+            if not drift:
+                self.stdout.write(self.style.SUCCESS("Счётчики совпадают с данными."))
+                return
+            if options['check']:
+                # CommandError откатывает транзакцию и завершает команду с кодом 1
+                raise CommandError(f"Найдено расхождений: {len(drift)}.")
+
+            RequestCounter.apply_deltas(drift)
+            RequestCounter.objects.filter(count=0).delete()
+        self.stdout.write(self.style.SUCCESS(f"Исправлено расхождений: {len(drift)}."))
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.5 on 2026-10-18 01:13
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ServiceRequest', '0004_tag_color'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='servicerequest',
+            index=models.Index(fields=['status', '-created_at', '-id'], name='sr_status_created_idx'),
+        ),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 5.2.5 on 2026-10-18 01:14
+
+from collections import defaultdict
+
+from django.db import migrations, models
+
+
+def fill_tags_snapshot(apps, schema_editor):
+    ServiceRequest = apps.get_model('ServiceRequest', 'ServiceRequest')
+    snapshots = defaultdict(list)
+    rows = (
+        ServiceRequest.tags.through.objects
+        .order_by('tag__name', 'tag_id')
+        .values_list('servicerequest_id', 'tag__code', 'tag__name', 'tag__color')
+    )
+    for request_id, code, name, color in rows:
+        snapshots[request_id].append({'code': code, 'name': name, 'color': color})
+    ServiceRequest.objects.bulk_update(
+        [ServiceRequest(id=pk, tags_snapshot=tags) for pk, tags in snapshots.items()],
+        ['tags_snapshot'],
+        batch_size=500,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ServiceRequest', '0005_servicerequest_board_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='servicerequest',
+            name='tags_snapshot',
+            field=models.JSONField(blank=True, default=list, editable=False, verbose_name='Снимок тегов'),
+        ),
+        migrations.RunPython(fill_tags_snapshot, migrations.RunPython.noop),
+    ]
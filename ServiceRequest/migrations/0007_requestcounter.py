@@ -0,0 +1,50 @@
+# Generated by Django 5.2.5 on 2026-10-18 01:15
+
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def fill_counters(apps, schema_editor):
+    ServiceRequest = apps.get_model('ServiceRequest', 'ServiceRequest')
+    RequestCounter = apps.get_model('ServiceRequest', 'RequestCounter')
+    rows = (
+        ServiceRequest.objects
+        .values('status', 'device_type', 'customer_type')
+        .annotate(n=Count('id'))
+        .order_by()
+    )
+    RequestCounter.objects.bulk_create([
+        RequestCounter(
+            status=row['status'],
+            device_type=row['device_type'],
+            customer_type=row['customer_type'],
+            count=row['n'],
+        )
+        for row in rows
+    ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ServiceRequest', '0006_servicerequest_tags_snapshot'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RequestCounter',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('status', models.CharField(choices=[('waiting', 'Ожидание'), ('working', 'В работе'), ('finish', 'Готов к выдаче')], max_length=20, verbose_name='Статус')),
+                ('device_type', models.CharField(choices=[('smartphone', 'Смартфон'), ('laptop', 'Ноутбук'), ('tablet', 'Планшет'), ('desktop', 'Системный блок'), ('monitor', 'Монитор'), ('printer', 'Принтер'), ('tv', 'Телевизор'), ('smartwatch', 'Умные часы'), ('other', 'Другое')], max_length=20, verbose_name='Тип устройства')),
+                ('customer_type', models.CharField(choices=[('individual', 'Физическое лицо'), ('legal_entity', 'Юридическое лицо')], max_length=20, verbose_name='Тип заказчика')),
+                ('count', models.IntegerField(default=0, verbose_name='Количество')),
+            ],
+            options={
+                'verbose_name': 'Счётчик заявок',
+                'verbose_name_plural': 'Счётчики заявок',
+                'constraints': [models.UniqueConstraint(fields=('status', 'device_type', 'customer_type'), name='request_counter_key')],
+            },
+        ),
+        migrations.RunPython(fill_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,63 @@
+# Generated by Django 5.2.5 on 2026-10-18 02:10
+
+from django.db import migrations
+
+# Индекс FTS5 (trigram) и триггеры, держащие его в синхронизации с таблицей заявок.
+# Телефон индексируется только цифрами. См. ServiceRequest/search.py.
+PHONE_DIGITS = (
+    "replace(replace(replace(replace(replace(new.phone_number, ' ', ''), '-', ''), '(', ''), ')', ''), '+', '')"
+)
+COLUMNS = 'full_name, phone_number, email, address, organization_name, inn'
+VALUES = (
+    f"new.id, coalesce(new.full_name, ''), {PHONE_DIGITS}, coalesce(new.email, ''), "
+    f"coalesce(new.address, ''), coalesce(new.organization_name, ''), coalesce(new.inn, '')"
+)
+
+CREATE_SQL = [
+    f"CREATE VIRTUAL TABLE IF NOT EXISTS ServiceRequest_search USING fts5({COLUMNS}, tokenize='trigram')",
+    f"""CREATE TRIGGER IF NOT EXISTS ServiceRequest_search_ai AFTER INSERT ON "ServiceRequest_servicerequest" BEGIN
+        INSERT INTO ServiceRequest_search(rowid, {COLUMNS}) VALUES ({VALUES});
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS ServiceRequest_search_ad AFTER DELETE ON "ServiceRequest_servicerequest" BEGIN
+        DELETE FROM ServiceRequest_search WHERE rowid = old.id;
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS ServiceRequest_search_au AFTER UPDATE OF {COLUMNS} ON "ServiceRequest_servicerequest" BEGIN
+        DELETE FROM ServiceRequest_search WHERE rowid = old.id;
+        INSERT INTO ServiceRequest_search(rowid, {COLUMNS}) VALUES ({VALUES});
+    END""",
+    f"""INSERT INTO ServiceRequest_search(rowid, {COLUMNS})
+        SELECT {VALUES.replace('new.', 'r.')} FROM "ServiceRequest_servicerequest" r""",
+]
+
+DROP_SQL = [
+    "DROP TRIGGER IF EXISTS ServiceRequest_search_ai",
+    "DROP TRIGGER IF EXISTS ServiceRequest_search_ad",
+    "DROP TRIGGER IF EXISTS ServiceRequest_search_au",
+    "DROP TABLE IF EXISTS ServiceRequest_search",
+]
+
+
+def create_index(apps, schema_editor):
+    # FTS5 есть только в SQLite; на других СУБД поиск работает через icontains
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    for statement in CREATE_SQL:
+        schema_editor.execute(statement)
+
+
+def drop_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    for statement in DROP_SQL:
+        schema_editor.execute(statement)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ServiceRequest', '0008_boardevent'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_index, drop_index),
+    ]
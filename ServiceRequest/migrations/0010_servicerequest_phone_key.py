@@ -0,0 +1,43 @@
+# Generated by Django 5.2.5 on 2026-10-18 01:30
+
+from django.conf import settings
+from django.db import migrations, models
+
+from core.phones import normalize_phone
+
+
+def fill_phone_keys(apps, schema_editor):
+    ServiceRequest = apps.get_model('ServiceRequest', 'ServiceRequest')
+    ServiceRequest.objects.bulk_update(
+        [
+            ServiceRequest(id=pk, phone_key=normalize_phone(phone))
+            for pk, phone in ServiceRequest.objects.values_list('id', 'phone_number').iterator()
+        ],
+        ['phone_key'],
+        batch_size=500,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ServiceRequest', '0009_search_index'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='servicerequest',
+            name='phone_key',
+            field=models.CharField(blank=True, default='', editable=False, max_length=16, verbose_name='Нормализованный телефон'),
+        ),
+        migrations.AddIndex(
+            model_name='servicerequest',
+            index=models.Index(fields=['phone_key', '-created_at'], name='sr_phone_key_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='servicerequest',
+            index=models.Index(fields=['email', '-created_at'], name='sr_email_created_idx'),
+        ),
+        migrations.RunPython(fill_phone_keys, migrations.RunPython.noop),
+    ]
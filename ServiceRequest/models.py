@@ -1,9 +1,12 @@
 # models.py
-from django.db import models
+from django.db import models, transaction
+from django.db.models import F
 from django.conf import settings
 from .models import *
 from django.core.validators import RegexValidator
 
+from core.phones import normalize_phone
+
 
 class Tag(models.Model):
     """
@@ -113,6 +116,15 @@ class ServiceRequest(models.Model):
         max_length=20,
         verbose_name="Номер заказчика"
     )
+    # Телефон в формате E.164 ('+79991234567') — для поиска истории клиента по индексу.
+    # Заполняется в save(), для старых данных — командой backfill_phone_keys.
+    phone_key = models.CharField(
+        max_length=16,
+        blank=True,
+        default='',
+        editable=False,
+        verbose_name="Нормализованный телефон"
+    )
     address = models.TextField(verbose_name="Адрес заказчика")
     external_links = models.TextField(
         blank=True,
@@ -170,6 +182,15 @@ class ServiceRequest(models.Model):
         help_text="Выберите один или несколько тегов"
     )
 
+    # Денормализованная копия тегов [{code, name, color}] для списков без лишних запросов.
+    # Поддерживается сигналами (см. signals.py), пересобирается командой rebuild_tag_snapshots.
+    tags_snapshot = models.JSONField(
+        default=list,
+        blank=True,
+        editable=False,
+        verbose_name="Снимок тегов"
+    )
+
     # Статус (один из)
     STATUS_CHOICES = [
         ('waiting', 'Ожидание'),
@@ -191,6 +212,13 @@ class ServiceRequest(models.Model):
         verbose_name = "Заявка в сервисный центр"
         verbose_name_plural = "Заявки в сервисный центр"
         ordering = ['-created_at']
+        indexes = [
+            # Колонки канбан-доски: WHERE status = ? ORDER BY created_at DESC, id DESC
+            models.Index(fields=['status', '-created_at', '-id'], name='sr_status_created_idx'),
+            # История клиента: WHERE phone_key = ? OR email = ? ORDER BY created_at DESC
+            models.Index(fields=['phone_key', '-created_at'], name='sr_phone_key_idx'),
+            models.Index(fields=['email', '-created_at'], name='sr_email_created_idx'),
+        ]
 
     def __str__(self):
         return f"Заявка #{self.id} от {self.full_name} — {self.get_device_type_display()}"
@@ -203,4 +231,120 @@ class ServiceRequest(models.Model):
         if self.customer_type == 'individual':
             self.organization_name = None
             self.inn = None
-        super().save(*args, **kwargs)
\ No newline at end of file
+        if 'phone_number' not in self.get_deferred_fields():
+            self.phone_key = normalize_phone(self.phone_number)
+            update_fields = kwargs.get('update_fields')
+            if update_fields is not None and 'phone_number' in update_fields:
+                kwargs['update_fields'] = {*update_fields, 'phone_key'}
+
+        with transaction.atomic():
+            old_key = None
+            if self.pk is not None and not self._state.adding:
+                # Старый ключ — из базы под блокировкой строки, а не загруженные значения:
+                # их мог устареть параллельный save(), update() или bulk_update_requests
+                old_key = (
+                    ServiceRequest.objects.select_for_update().filter(pk=self.pk)
+                    .values_list(*RequestCounter.KEY_FIELDS).first()
+                )
+            super().save(*args, **kwargs)
+            # Отложенные поля и поля вне update_fields в базе не менялись
+            update_fields = kwargs.get('update_fields')
+            deferred = self.get_deferred_fields()
+            new_key = tuple(
+                old_key[i] if old_key is not None and (
+                    field in deferred or (update_fields is not None and field not in update_fields)
+                ) else getattr(self, field)
+                for i, field in enumerate(RequestCounter.KEY_FIELDS)
+            )
+            if old_key != new_key:
+                RequestCounter.apply_change(old_key, new_key)
+
+
+class RequestCounter(models.Model):
+    """
+    Число заявок в разрезе (статус, тип устройства, тип заказчика).
+    Обновляется инкрементально в ServiceRequest.save() и при удалении заявок,
+    поэтому итоги для доски и админки читаются из пары десятков строк, а не
+    подсчётом по всей таблице заявок. Сверка: manage.py recount_request_counters.
+    """
+    KEY_FIELDS = ('status', 'device_type', 'customer_type')
+
+    status = models.CharField(max_length=20, choices=ServiceRequest.STATUS_CHOICES, verbose_name='Статус')
+    device_type = models.CharField(
+        max_length=20,
+        choices=ServiceRequest.DEVICE_TYPE_CHOICES,
+        verbose_name="Тип устройства"
+    )
+    customer_type = models.CharField(
+        max_length=20,
+        choices=ServiceRequest.CUSTOMER_TYPE_CHOICES,
+        verbose_name="Тип заказчика"
+    )
+    count = models.IntegerField(default=0, verbose_name="Количество")
+
+    class Meta:
+        verbose_name = "Счётчик заявок"
+        verbose_name_plural = "Счётчики заявок"
+        constraints = [
+            models.UniqueConstraint(fields=['status', 'device_type', 'customer_type'], name='request_counter_key'),
+        ]
+
+    def __str__(self):
+        return f"{self.get_status_display()} / {self.get_device_type_display()} / {self.get_customer_type_display()}: {self.count}"
+
+    @classmethod
+    def apply_change(cls, old_key, new_key):
+        """Переносит одну заявку из old_key в new_key (любой из них может быть None)."""
+        deltas = {}
+        if old_key is not None:
+            deltas[old_key] = deltas.get(old_key, 0) - 1
+        if new_key is not None:
+            deltas[new_key] = deltas.get(new_key, 0) + 1
+        cls.apply_deltas(deltas)
+
+    @classmethod
+    def apply_deltas(cls, deltas):
+        """
+        Применяет {ключ: изменение} атомарными UPDATE count = count + delta.
+        Строка ключа создаётся при первом обращении.
+        """
+        with transaction.atomic():
+            for key, delta in deltas.items():
+                if not delta:
+                    continue
+                lookup = dict(zip(cls.KEY_FIELDS, key))
+                if not cls.objects.filter(**lookup).update(count=F('count') + delta):
+                    cls.objects.get_or_create(**lookup)
+                    cls.objects.filter(**lookup).update(count=F('count') + delta)
+
+    @classmethod
+    def totals(cls):
+        """Итоги по каждому измерению, собранные из таблицы счётчиков."""
+        result = {
+            'total': 0,
+            'by_status': {value: 0 for value, _ in ServiceRequest.STATUS_CHOICES},
+            'by_device_type': {},
+            'by_customer_type': {},
+        }
+        for status, device_type, customer_type, count in cls.objects.values_list(*cls.KEY_FIELDS, 'count'):
+            result['total'] += count
+            result['by_status'][status] = result['by_status'].get(status, 0) + count
+            result['by_device_type'][device_type] = result['by_device_type'].get(device_type, 0) + count
+            result['by_customer_type'][customer_type] = result['by_customer_type'].get(customer_type, 0) + count
+        return result
+
+class BoardEvent(models.Model):
+    """
+    Журнал событий доски заявок для DatabaseBroker (см. events.py):
+    позволяет раздавать SSE из нескольких процессов и догонять клиентов по Last-Event-ID.
+    """
+    event_type = models.CharField(max_length=20, verbose_name="Тип события")
+    payload = models.JSONField(verbose_name="Данные")
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name="Дата создания")
+
+    class Meta:
+        verbose_name = "Событие доски заявок"
+        verbose_name_plural = "События доски заявок"
+
+    def __str__(self):
+        return f"{self.event_type} #{self.id}"
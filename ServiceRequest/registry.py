@@ -0,0 +1,74 @@
+# ServiceRequest/registry.py
+"""
+Справочники симптомов (IssueOption) и тегов (Tag) в памяти процесса.
+
+Таблицы маленькие и меняются только из админки, поэтому приём заявок не
+должен читать их на каждый запрос. Актуальность проверяется по версиям
+'tag_catalog' / 'issue_catalog' в общем кэше (их сбрасывают сигналы, см.
+signals.py): правка в одном воркере перезагружает справочник во всех.
+"""
+import threading
+
+from core.http_cache import bump_version, get_versions, version_key
+
+from .models import IssueOption, Tag
+
+GENERATION_KEYS = [version_key('tag_catalog'), version_key('issue_catalog')]
+
+
+class CatalogRegistry:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._generation = None
+        self._issues = []
+        self._issues_by_code = {}
+        self._tags = []
+        self._tags_by_code = {}
+
+    def _refresh(self):
+        """Перечитывает справочники, если поколение в кэше изменилось (один запрос к кэшу)."""
+        generation = get_versions(GENERATION_KEYS)
+        if generation == self._generation:
+            return
+        with self._lock:
+            if generation == self._generation:
+                return
+            issues = list(IssueOption.objects.all())
+            tags = list(Tag.objects.all())
+            self._issues, self._issues_by_code = issues, {i.code: i for i in issues}
+            self._tags, self._tags_by_code = tags, {t.code: t for t in tags}
+            self._generation = generation
+
+    def issues(self):
+        self._refresh()
+        return self._issues
+
+    def tags(self):
+        self._refresh()
+        return self._tags
+
+    def tag_ids(self, codes):
+        """Идентификаторы известных тегов по кодам; неизвестные коды пропускаются."""
+        self._refresh()
+        return [self._tags_by_code[code].id for code in codes if code in self._tags_by_code]
+
+    def issue_ids(self, codes):
+        """
+        Идентификаторы симптомов по кодам. Отсутствующие в базе симптомы создаются
+        одним bulk_create (как раньше делал get_or_create на каждый код).
+        """
+        self._refresh()
+        missing = [code for code in dict.fromkeys(codes) if code not in self._issues_by_code]
+        if missing:
+            descriptions = dict(IssueOption.CODE_CHOICES)
+            IssueOption.objects.bulk_create(
+                [IssueOption(code=code, description=descriptions.get(code, code)) for code in missing],
+                ignore_conflicts=True,
+            )
+            # bulk_create не шлёт сигналов — сбрасываем поколение сами
+            bump_version('issue_catalog')
+            self._refresh()
+        return [self._issues_by_code[code].id for code in codes if code in self._issues_by_code]
+
+
+catalog = CatalogRegistry()
@@ -0,0 +1,180 @@
+# ServiceRequest/search.py
+"""
+Полнотекстовый поиск заявок на SQLite FTS5.
+
+Индекс — виртуальная таблица SEARCH_TABLE с токенизатором trigram: он ищет
+любую подстроку от трёх символов, без учёта регистра (в том числе кириллицу),
+поэтому находятся и часть фамилии, и часть номера телефона. Телефон в индексе
+хранится только цифрами, и из запроса цифры выделяются так же.
+
+Индекс поддерживают триггеры базы (миграция 0009), поэтому он не отстаёт ни
+при save(), ни при bulk_create/update(). Миграции SQLite, пересоздающие таблицу
+заявок (AddField и т.п.), удаляют её триггеры — их восстанавливает
+ensure_triggers() по сигналу post_migrate. Для уже существующих данных или
+после сбоя — команда rebuild_search_index.
+
+На других СУБД (без FTS5) поиск деградирует до icontains по тем же полям.
+"""
+import re
+
+from django.db import connection, connections
+from django.db.models import Q
+from django.db.models.expressions import RawSQL
+
+from .models import ServiceRequest
+
+SEARCH_TABLE = 'ServiceRequest_search'
+SEARCH_FIELDS = ('full_name', 'phone_number', 'email', 'address', 'organization_name', 'inn')
+# Веса столбцов для bm25 в порядке SEARCH_FIELDS: совпадение в ФИО или телефоне важнее адреса
+SEARCH_WEIGHTS = (10.0, 8.0, 5.0, 1.0, 4.0, 6.0)
+MIN_TERM_LENGTH = 3
+
+_REQUEST_TABLE = ServiceRequest._meta.db_table
+_PHONE_TERM = re.compile(r'^\+?[\d\s()\-]+$')
+
+
+def _digits_sql(column):
+    """SQL-выражение: значение столбца без пробелов, скобок, дефисов и плюса."""
+    expression = column
+    for char in (' ', '-', '(', ')', '+'):
+        expression = f"replace({expression}, '{char}', '')"
+    return expression
+
+
+def _row_values_sql(prefix):
+    return ', '.join(
+        _digits_sql(f'{prefix}.phone_number') if field == 'phone_number'
+        else f"coalesce({prefix}.{field}, '')"
+        for field in SEARCH_FIELDS
+    )
+
+
+def schema_sql():
+    """Создание таблицы индекса и триггеров синхронизации (те же, что в миграции 0009)."""
+    columns = ', '.join(SEARCH_FIELDS)
+    return [
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS {SEARCH_TABLE} USING fts5({columns}, tokenize='trigram')",
+        f"""CREATE TRIGGER IF NOT EXISTS {SEARCH_TABLE}_ai AFTER INSERT ON "{_REQUEST_TABLE}" BEGIN
+            INSERT INTO {SEARCH_TABLE}(rowid, {columns}) VALUES (new.id, {_row_values_sql('new')});
+        END""",
+        f"""CREATE TRIGGER IF NOT EXISTS {SEARCH_TABLE}_ad AFTER DELETE ON "{_REQUEST_TABLE}" BEGIN
+            DELETE FROM {SEARCH_TABLE} WHERE rowid = old.id;
+        END""",
+        f"""CREATE TRIGGER IF NOT EXISTS {SEARCH_TABLE}_au AFTER UPDATE OF {columns} ON "{_REQUEST_TABLE}" BEGIN
+            DELETE FROM {SEARCH_TABLE} WHERE rowid = old.id;
+            INSERT INTO {SEARCH_TABLE}(rowid, {columns}) VALUES (new.id, {_row_values_sql('new')});
+        END""",
+    ]
+
+
+def fts_available():
+    return connection.vendor == 'sqlite'
+
+
+def ensure_triggers(using='default', **kwargs):
+    """Восстанавливает триггеры индекса, если таблица индекса есть (обработчик post_migrate)."""
+    db = connections[using]
+    if db.vendor != 'sqlite':
+        return
+    with db.cursor() as cursor:
+        cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = %s", [SEARCH_TABLE])
+        if cursor.fetchone() is None:
+            return
+        for statement in schema_sql()[1:]:
+            cursor.execute(statement)
+
+
+def rebuild_search_index():
+    """Заполняет индекс заново по таблице заявок; возвращает число проиндексированных заявок."""
+    columns = ', '.join(SEARCH_FIELDS)
+    with connection.cursor() as cursor:
+        for statement in schema_sql():
+            cursor.execute(statement)
+        cursor.execute(f"DELETE FROM {SEARCH_TABLE}")
+        cursor.execute(
+            f'INSERT INTO {SEARCH_TABLE}(rowid, {columns}) '
+            f'SELECT r.id, {_row_values_sql("r")} FROM "{_REQUEST_TABLE}" r'
+        )
+        cursor.execute(f"INSERT INTO {SEARCH_TABLE}({SEARCH_TABLE}) VALUES ('optimize')")
+        cursor.execute(f"SELECT count(*) FROM {SEARCH_TABLE}")
+        return cursor.fetchone()[0]
+
+
+def search_terms(query):
+    """
+    Разбивает запрос на термы для MATCH. Похожие на телефон части сводятся к цифрам
+    ('+7 (999) 12' → '799912'); термы короче трёх символов trigram найти не может.
+    """
+    query = (query or '').strip()
+    if _PHONE_TERM.match(query) and re.search(r'\d', query):
+        parts = [re.sub(r'\D', '', query)]
+    else:
+        parts = [
+            re.sub(r'\D', '', part) if _PHONE_TERM.match(part) else part
+            for part in query.split()
+        ]
+    return [part for part in parts if len(part) >= MIN_TERM_LENGTH]
+
+
+def match_expression(terms):
+    # Каждый терм — строка в кавычках: спецсимволы FTS5 в запросе пользователя не работают
+    return ' AND '.join('"{}"'.format(term.replace('"', '""')) for term in terms)
+
+
+def filter_queryset(queryset, query):
+    """
+    Ограничивает queryset заявками, подходящими под запрос (без сортировки по релевантности).
+    Возвращает None, если в запросе нет ни одного терма от трёх символов.
+    """
+    terms = search_terms(query)
+    if not terms:
+        return None
+    if not fts_available():
+        condition = Q()
+        for term in terms:
+            condition &= Q(*[Q(**{f'{field}__icontains': term}) for field in SEARCH_FIELDS], _connector=Q.OR)
+        return queryset.filter(condition)
+    return queryset.filter(id__in=RawSQL(
+        f"SELECT rowid FROM {SEARCH_TABLE} WHERE {SEARCH_TABLE} MATCH %s", [match_expression(terms)]
+    ))
+
+
+def search_requests(query, owner_id=None, page=1, page_size=20):
+    """
+    Ищет заявки, упорядоченные по релевантности (bm25), затем от новых к старым.
+    owner_id ограничивает поиск заявками одного пользователя.
+    Возвращает (заявки текущей страницы, общее число найденных).
+    """
+    terms = search_terms(query)
+    if not terms:
+        return [], 0
+    offset = (page - 1) * page_size
+
+    if not fts_available():
+        queryset = filter_queryset(ServiceRequest.objects.all(), query)
+        if owner_id is not None:
+            queryset = queryset.filter(created_by_id=owner_id)
+        return list(queryset.order_by('-created_at', '-id')[offset:offset + page_size]), queryset.count()
+
+    where = f"{SEARCH_TABLE} MATCH %s"
+    params = [match_expression(terms)]
+    if owner_id is not None:
+        where += " AND r.created_by_id = %s"
+        params.append(owner_id)
+    join = f'{SEARCH_TABLE} s JOIN "{_REQUEST_TABLE}" r ON r.id = s.rowid'
+    weights = ', '.join(str(weight) for weight in SEARCH_WEIGHTS)
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"SELECT s.rowid FROM {join} WHERE {where} "
+            f"ORDER BY bm25({SEARCH_TABLE}, {weights}), s.rowid DESC LIMIT %s OFFSET %s",
+            params + [page_size, offset],
+        )
+        ids = [row[0] for row in cursor.fetchall()]
+        if page == 1 and len(ids) < page_size:
+            total = len(ids)
+        else:
+            cursor.execute(f"SELECT count(*) FROM {join} WHERE {where}", params)
+            total = cursor.fetchone()[0]
+
+    found = ServiceRequest.objects.in_bulk(ids)
+    return [found[pk] for pk in ids if pk in found], total
@@ -0,0 +1,114 @@
+# ServiceRequest/signals.py
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete
+from django.dispatch import receiver
+
+from core.http_cache import bump_version, bump_versions
+
+from .models import IssueOption, RequestCounter, ServiceRequest, Tag
+from .tag_snapshot import rebuild_tag_snapshots, snapshot_for, tag_request_ids
+
+
+# ===========================
+# Снимок тегов (ServiceRequest.tags_snapshot)
+# ===========================
+
+@receiver(m2m_changed, sender=ServiceRequest.tags.through)
+def sync_tags_snapshot(sender, instance, action, reverse, pk_set, **kwargs):
+    if action == 'pre_clear' and reverse:
+        # После очистки со стороны тега pk_set пуст — запоминаем затронутые заявки заранее
+        instance._snapshot_request_ids = tag_request_ids([instance.pk])
+        return
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+
+    if reverse:
+        if action == 'post_clear':
+            request_ids = getattr(instance, '_snapshot_request_ids', [])
+        else:
+            request_ids = pk_set or []
+        rebuild_tag_snapshots(request_ids)
+        return
+
+    # Прямая сторона: обновляем и объект в памяти, иначе последующий save()
+    # перезапишет свежий снимок устаревшим значением.
+    snapshot = snapshot_for([instance.pk])[instance.pk]
+    ServiceRequest.objects.filter(pk=instance.pk).update(tags_snapshot=snapshot)
+    instance.tags_snapshot = snapshot
+
+
+@receiver(post_save, sender=Tag)
+def refresh_snapshots_on_tag_save(sender, instance, created, **kwargs):
+    if not created:
+        rebuild_tag_snapshots(tag_request_ids([instance.pk]))
+
+
+@receiver(pre_delete, sender=Tag)
+def remember_tag_requests(sender, instance, **kwargs):
+    # Связи удаляются каскадом до post_delete, поэтому список заявок нужен заранее
+    instance._snapshot_request_ids = tag_request_ids([instance.pk])
+
+
+@receiver(post_delete, sender=Tag)
+def refresh_snapshots_on_tag_delete(sender, instance, **kwargs):
+    rebuild_tag_snapshots(getattr(instance, '_snapshot_request_ids', []))
+
+
+# ===========================
+# Счётчики заявок (RequestCounter)
+# ===========================
+
+@receiver(pre_delete, sender=ServiceRequest)
+def remember_counter_key(sender, instance, **kwargs):
+    # Счётчик отражает состояние в базе, а не загруженные (возможно, устаревшие) значения.
+    # Удаление идёт в транзакции Collector — строку блокируем до post_delete
+    instance._counter_key = (
+        ServiceRequest.objects.select_for_update().filter(pk=instance.pk)
+        .values_list(*RequestCounter.KEY_FIELDS).first()
+    )
+
+
+@receiver(post_delete, sender=ServiceRequest)
+def decrement_counter_on_delete(sender, instance, **kwargs):
+    # Удаление выполняется внутри транзакции Collector, откат вернёт и счётчик
+    RequestCounter.apply_change(getattr(instance, '_counter_key', None), None)
+
+
+# ===========================
+# Версии для ETag и кэша JSON-ответов (core/http_cache.py)
+# ===========================
+
+@receiver(post_save, sender=ServiceRequest)
+@receiver(post_delete, sender=ServiceRequest)
+def bump_request_version(sender, instance, **kwargs):
+    bump_version('servicerequest', instance.pk)
+
+
+@receiver(m2m_changed, sender=ServiceRequest.tags.through)
+@receiver(m2m_changed, sender=ServiceRequest.issues.through)
+def bump_request_version_on_m2m(sender, instance, action, reverse, pk_set, **kwargs):
+    if action == 'pre_clear' and reverse:
+        instance._version_request_ids = list(
+            sender.objects.filter(**{f'{instance._meta.model_name}_id': instance.pk})
+            .values_list('servicerequest_id', flat=True)
+        )
+        return
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    if not reverse:
+        bump_version('servicerequest', instance.pk)
+    elif action == 'post_clear':
+        bump_versions('servicerequest', getattr(instance, '_version_request_ids', []))
+    else:
+        bump_versions('servicerequest', pk_set or [])
+
+
+@receiver(post_save, sender=Tag)
+@receiver(post_delete, sender=Tag)
+def bump_tag_catalog_version(sender, instance, **kwargs):
+    bump_version('tag_catalog')
+
+
+@receiver(post_save, sender=IssueOption)
+@receiver(post_delete, sender=IssueOption)
+def bump_issue_catalog_version(sender, instance, **kwargs):
+    bump_version('issue_catalog')
@@ -0,0 +1,61 @@
+# ServiceRequest/tag_snapshot.py
+from .models import ServiceRequest
+
+SNAPSHOT_BATCH_SIZE = 500
+
+
+def snapshot_for(request_ids):
+    """
+    Собирает снимки тегов для заявок одним запросом по through-таблице.
+    Возвращает {request_id: [{code, name, color}, ...]}; заявки без тегов получают [].
+    """
+    request_ids = list(request_ids)
+    snapshots = {pk: [] for pk in request_ids}
+    rows = (
+        ServiceRequest.tags.through.objects
+        .filter(servicerequest_id__in=request_ids)
+        .order_by('tag__name', 'tag_id')
+        .values_list('servicerequest_id', 'tag__code', 'tag__name', 'tag__color')
+    )
+    for request_id, code, name, color in rows:
+        snapshots[request_id].append({'code': code, 'name': name, 'color': color})
+    return snapshots
+
+
+def rebuild_tag_snapshots(request_ids=None, batch_size=SNAPSHOT_BATCH_SIZE):
+    """
+    Пересобирает tags_snapshot у указанных заявок (или у всех, если request_ids=None).
+    updated_at не трогается: содержимое заявки не менялось. Возвращает число заявок.
+    """
+    if request_ids is None:
+        request_ids = ServiceRequest.objects.order_by('id').values_list('id', flat=True).iterator()
+
+    total = 0
+    batch = []
+    for pk in request_ids:
+        batch.append(pk)
+        if len(batch) >= batch_size:
+            total += _write_snapshots(batch)
+            batch = []
+    if batch:
+        total += _write_snapshots(batch)
+    return total
+
+
+def _write_snapshots(request_ids):
+    snapshots = snapshot_for(request_ids)
+    ServiceRequest.objects.bulk_update(
+        [ServiceRequest(id=pk, tags_snapshot=tags) for pk, tags in snapshots.items()],
+        ['tags_snapshot'],
+    )
+    return len(snapshots)
+
+
+def tag_request_ids(tag_ids):
+    """Идентификаторы заявок, к которым привязан хотя бы один из тегов."""
+    return list(
+        ServiceRequest.tags.through.objects
+        .filter(tag_id__in=tag_ids)
+        .values_list('servicerequest_id', flat=True)
+        .distinct()
+    )
@@ -1,3 +1,473 @@
-from django.test import TestCase
+import asyncio
+import io
+import json
+from unittest import mock
 
-# Create your tests here.
+from django.apps import apps
+from django.contrib.auth import get_user_model
+from django.core.management import CommandError, call_command
+from django.core.cache import cache
+from django.db import connection
+from django.db.models.signals import post_migrate
+from django.test import SimpleTestCase, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from core.testing import _is_cache_query
+
+from . import search
+from .bulk import BULK_MAX_IDS, BulkUpdateError, bulk_update_requests
+from .events import InProcessBroker, sse_stream
+from .models import IssueOption, RequestCounter, ServiceRequest, Tag
+from .registry import CatalogRegistry
+from .tag_snapshot import rebuild_tag_snapshots
+
+User = get_user_model()
+
+
+def make_request(user, **fields):
+    values = {
+        'created_by': user, 'full_name': 'Иванов Иван', 'phone_number': '+7 999 123-45-67',
+        'address': 'Москва', 'device_type': 'laptop',
+    }
+    values.update(fields)
+    return ServiceRequest.objects.create(**values)
+
+
+class SseStreamTest(SimpleTestCase):
+    def test_event_after_heartbeat(self):
+        async def scenario():
+            broker = InProcessBroker()
+            stream = sse_stream(broker.subscribe(), heartbeat=0.05)
+            self.assertEqual(await stream.__anext__(), 'retry: 3000\n\n')
+            # Пинг не должен закрывать подписку
+            self.assertEqual(await stream.__anext__(), ': ping\n\n')
+            self.assertEqual(len(broker._subscribers), 1)
+            broker.publish('request_updated', {'id': 7})
+            message = await stream.__anext__()
+            while message == ': ping\n\n':
+                message = await stream.__anext__()
+            await stream.aclose()
+            self.assertEqual(len(broker._subscribers), 0)
+            return message
+
+        message = asyncio.run(scenario())
+        self.assertEqual(message, 'id: 1\nevent: request_updated\ndata: {"id": 7}\n\n')
+
+
+class RequestCounterTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(email='counter@example.org', password='x')
+
+    def count(self, status='waiting', device_type='laptop', customer_type='individual'):
+        counter = RequestCounter.objects.filter(
+            status=status, device_type=device_type, customer_type=customer_type,
+        ).first()
+        return counter.count if counter else 0
+
+    def assertMatchesTable(self):
+        self.assertEqual(RequestCounter.totals()['total'], ServiceRequest.objects.count())
+        out = io.StringIO()
+        call_command('recount_request_counters', '--check', stdout=out)
+        self.assertIn('совпадают', out.getvalue())
+
+    def test_create_status_change_and_delete(self):
+        waiting, working = self.count(), self.count('working')
+        request = make_request(self.user)
+        self.assertEqual(self.count(), waiting + 1)
+
+        request.status = 'working'
+        request.save()
+        self.assertEqual((self.count(), self.count('working')), (waiting, working + 1))
+
+        # Отложенные поля ключа: старое значение дочитывается из базы
+        deferred = ServiceRequest.objects.only('id').get(pk=request.pk)
+        deferred.status = 'waiting'
+        deferred.save(update_fields=['status'])
+        self.assertEqual((self.count(), self.count('working')), (waiting + 1, working))
+
+        # Поле вне update_fields в базе не меняется — счётчик тоже
+        request = ServiceRequest.objects.get(pk=request.pk)
+        request.device_type = 'tablet'
+        request.save(update_fields=['full_name'])
+        self.assertEqual(self.count(device_type='tablet'), 0)
+
+        request.delete()
+        self.assertEqual(self.count(), waiting)
+        self.assertMatchesTable()
+
+    def test_stale_instances(self):
+        request = make_request(self.user)
+        first = ServiceRequest.objects.get(pk=request.pk)
+        second = ServiceRequest.objects.get(pk=request.pk)
+        # Оба экземпляра загружены со статусом waiting; каждый переносит заявку по-своему
+        first.status = 'working'
+        first.save()
+        second.status = 'finish'
+        second.save()
+        self.assertMatchesTable()
+
+        # Строку сдвинули мимо save() уже после загрузки экземпляра
+        stale = ServiceRequest.objects.get(pk=request.pk)
+        bulk_update_requests([request.pk], status='waiting')
+        stale.device_type = 'tablet'
+        stale.save()
+        self.assertMatchesTable()
+
+        stale = ServiceRequest.objects.get(pk=request.pk)
+        bulk_update_requests([request.pk], status='working')
+        stale.delete()
+        self.assertMatchesTable()
+
+    def test_queryset_delete(self):
+        make_request(self.user)
+        make_request(self.user, status='finish')
+        ServiceRequest.objects.filter(created_by=self.user).delete()
+        self.assertMatchesTable()
+
+    def test_recount_fixes_drift(self):
+        make_request(self.user)
+        # Правка мимо save() — счётчик разъезжается с таблицей
+        ServiceRequest.objects.filter(created_by=self.user).update(status='finish')
+        RequestCounter.objects.create(status='working', device_type='tv', customer_type='legal_entity', count=3)
+
+        with self.assertRaisesMessage(CommandError, 'Найдено расхождений: 3'):
+            call_command('recount_request_counters', '--check', stdout=io.StringIO())
+        # --check ничего не меняет
+        self.assertEqual(self.count('working', 'tv', 'legal_entity'), 3)
+
+        call_command('recount_request_counters', stdout=io.StringIO())
+        self.assertFalse(RequestCounter.objects.filter(count=0).exists())
+        self.assertFalse(RequestCounter.objects.filter(device_type='tv', status='working').exists())
+        self.assertMatchesTable()
+
+
+class BulkUpdateTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.manager = User.objects.create_user(email='bulk-manager@example.org', password='x', role='manager')
+        cls.owner = User.objects.create_user(email='bulk-owner@example.org', password='x', role='client')
+        cls.stranger = User.objects.create_user(email='bulk-stranger@example.org', password='x', role='client')
+        cls.urgent = Tag.objects.create(code='bulk-urgent', name='Срочно')
+        cls.vip = Tag.objects.create(code='bulk-vip', name='VIP')
+
+    def setUp(self):
+        self.own = make_request(self.owner)
+        self.working = make_request(self.owner, status='working')
+        self.foreign = make_request(self.stranger)
+
+    def post(self, payload, user=None):
+        self.client.force_login(user or self.manager)
+        return self.client.post(
+            reverse('bulk_update_service_requests'), json.dumps(payload), content_type='application/json',
+        )
+
+    def test_results_per_id(self):
+        missing = self.foreign.pk + 1000
+        response = self.post({'ids': [self.own.pk, self.working.pk, missing, self.own.pk], 'status': 'working'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['results'], [
+            {'id': self.own.pk, 'result': 'updated'},
+            {'id': self.working.pk, 'result': 'unchanged'},
+            {'id': missing, 'result': 'not_found'},
+        ])
+        self.own.refresh_from_db()
+        self.assertEqual(self.own.status, 'working')
+        self.assertEqual(RequestCounter.totals()['by_status']['working'],
+                         ServiceRequest.objects.filter(status='working').count())
+
+    def test_tags_added_and_removed(self):
+        self.working.tags.add(self.vip)
+        results = bulk_update_requests([self.own.pk, self.working.pk], add_tags=['bulk-urgent'], remove_tags=['bulk-vip'])
+        self.assertEqual([row['result'] for row in results], ['updated', 'updated'])
+        self.working.refresh_from_db()
+        self.assertEqual(list(self.working.tags.all()), [self.urgent])
+        self.assertEqual([tag['code'] for tag in self.working.tags_snapshot], ['bulk-urgent'])
+
+        # Повторное добавление ничего не меняет
+        results = bulk_update_requests([self.own.pk], add_tags=['bulk-urgent'])
+        self.assertEqual(results, [{'id': self.own.pk, 'result': 'unchanged'}])
+
+    def test_client_edits_only_own_requests(self):
+        response = self.post({'ids': [self.own.pk, self.foreign.pk], 'status': 'finish'}, user=self.owner)
+        self.assertEqual(response.json()['results'], [
+            {'id': self.own.pk, 'result': 'updated'},
+            {'id': self.foreign.pk, 'result': 'forbidden'},
+        ])
+        self.foreign.refresh_from_db()
+        self.assertEqual(self.foreign.status, 'waiting')
+
+    def test_invalid_payloads(self):
+        payloads = [
+            {'ids': [True], 'status': 'working'},          # true из JSON не должен стать id=1
+            {'ids': [], 'status': 'working'},
+            {'ids': [str(self.own.pk)], 'status': 'working'},
+            {'ids': list(range(1, BULK_MAX_IDS + 2)), 'status': 'working'},
+            {'ids': [self.own.pk]},
+            {'ids': [self.own.pk], 'status': 'lost'},
+            {'ids': [self.own.pk], 'tags': {'add': ['no-such-tag']}},
+            {'ids': [self.own.pk], 'tags': {'add': ['bulk-vip'], 'remove': ['bulk-vip']}},
+            {'ids': [self.own.pk], 'tags': ['bulk-vip']},
+        ]
+        for payload in payloads:
+            with self.subTest(payload=str(payload)[:80]):
+                response = self.post(payload)
+                self.assertEqual(response.status_code, 400)
+                self.assertIn('error', response.json())
+        self.own.refresh_from_db()
+        self.assertEqual((self.own.status, list(self.own.tags.all())), ('waiting', []))
+
+    def test_limit_is_inclusive(self):
+        ids = [self.own.pk] + list(range(self.foreign.pk + 1, self.foreign.pk + BULK_MAX_IDS))
+        response = self.post({'ids': ids, 'status': 'finish'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()['results']), BULK_MAX_IDS)
+
+    def test_unknown_status_rejected_before_changes(self):
+        with self.assertRaises(BulkUpdateError):
+            bulk_update_requests([self.own.pk], status='lost', add_tags=['bulk-vip'])
+        self.assertFalse(self.own.tags.exists())
+
+
+class TagSnapshotTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(email='snapshot@example.org', password='x')
+        cls.bug = Tag.objects.create(code='snap-bug', name='Брак', color='#ff0000')
+        cls.vip = Tag.objects.create(code='snap-vip', name='VIP', color='#00ff00')
+
+    def setUp(self):
+        self.first = make_request(self.user)
+        self.second = make_request(self.user)
+
+    def codes(self, request):
+        return [tag['code'] for tag in ServiceRequest.objects.get(pk=request.pk).tags_snapshot]
+
+    def test_forward_add_remove_clear(self):
+        self.first.tags.add(self.bug, self.vip)
+        # Порядок — по имени тега; объект в памяти тоже обновлён
+        self.assertEqual(self.codes(self.first), ['snap-vip', 'snap-bug'])
+        self.assertEqual(self.first.tags_snapshot, ServiceRequest.objects.get(pk=self.first.pk).tags_snapshot)
+        self.assertEqual(self.first.tags_snapshot[1], {'code': 'snap-bug', 'name': 'Брак', 'color': '#ff0000'})
+
+        self.first.tags.remove(self.vip)
+        self.assertEqual(self.codes(self.first), ['snap-bug'])
+        # save() после правки тегов не возвращает старый снимок
+        self.first.full_name = 'Петров Пётр'
+        self.first.save()
+        self.assertEqual(self.codes(self.first), ['snap-bug'])
+
+        self.first.tags.clear()
+        self.assertEqual(self.codes(self.first), [])
+
+    def test_reverse_add_remove_clear(self):
+        self.bug.servicerequest_set.add(self.first, self.second)
+        self.assertEqual((self.codes(self.first), self.codes(self.second)), (['snap-bug'], ['snap-bug']))
+
+        self.bug.servicerequest_set.remove(self.first)
+        self.assertEqual((self.codes(self.first), self.codes(self.second)), ([], ['snap-bug']))
+
+        self.bug.servicerequest_set.clear()
+        self.assertEqual(self.codes(self.second), [])
+
+    def test_tag_rename_and_delete(self):
+        self.first.tags.add(self.bug, self.vip)
+        self.second.tags.add(self.bug)
+
+        self.bug.name = 'Гарантия'
+        self.bug.color = '#0000ff'
+        self.bug.save()
+        self.assertEqual(
+            ServiceRequest.objects.get(pk=self.second.pk).tags_snapshot,
+            [{'code': 'snap-bug', 'name': 'Гарантия', 'color': '#0000ff'}],
+        )
+        self.assertEqual(self.codes(self.first), ['snap-vip', 'snap-bug'])
+
+        self.bug.delete()
+        self.assertEqual((self.codes(self.first), self.codes(self.second)), (['snap-vip'], []))
+
+    def test_rebuild_repairs_stale_snapshot(self):
+        self.first.tags.add(self.vip)
+        ServiceRequest.objects.filter(pk__in=[self.first.pk, self.second.pk]).update(tags_snapshot=[{'code': 'old'}])
+        self.assertEqual(rebuild_tag_snapshots([self.first.pk, self.second.pk], batch_size=1), 2)
+        self.assertEqual((self.codes(self.first), self.codes(self.second)), (['snap-vip'], []))
+
+
+class SearchTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(email='search@example.org', password='x')
+        cls.ivanov = make_request(cls.user, full_name='Иванов Сергей', phone_number='+7 (912) 345-67-89',
+                                  address='Казань, ул. Баумана')
+        cls.petrova = make_request(cls.user, full_name='Петрова Анна', phone_number='8 800 555 35 35',
+                                   address='Москва, Тверская', email='anna@example.org')
+
+    def ids(self, query, **kwargs):
+        return [request.pk for request in search.search_requests(query, **kwargs)[0]]
+
+    def triggers(self):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT name FROM sqlite_master WHERE type = 'trigger' AND name LIKE %s ORDER BY name",
+                [search.SEARCH_TABLE + '%'],
+            )
+            return [row[0] for row in cursor.fetchall()]
+
+    def test_trigram_substring_any_case(self):
+        self.assertEqual(self.ids('ванов'), [self.ivanov.pk])
+        self.assertEqual(self.ids('ИВАНОВ серг'), [self.ivanov.pk])
+        self.assertEqual(self.ids('казань баумана'), [self.ivanov.pk])
+        self.assertEqual(self.ids('anna@exam'), [self.petrova.pk])
+        self.assertEqual(self.ids('Иванов Москва'), [])
+
+    def test_phone_matched_by_digits(self):
+        self.assertEqual(self.ids('+7 (912) 345'), [self.ivanov.pk])
+        self.assertEqual(self.ids('555-35'), [self.petrova.pk])
+        self.assertEqual(search.search_terms('+7 (912) 345-67'), ['791234567'])
+
+    def test_short_terms_are_dropped(self):
+        self.assertEqual(search.search_terms('Ив'), [])
+        self.assertEqual(search.search_requests('Ив'), ([], 0))
+        self.assertIsNone(search.filter_queryset(ServiceRequest.objects.all(), 'Ан 12'))
+        # Короткие термы отбрасываются, остальные работают
+        self.assertEqual(search.search_terms('Ан Петрова'), ['Петрова'])
+        self.assertEqual(self.ids('Ан Петрова'), [self.petrova.pk])
+
+    def test_special_characters_are_quoted(self):
+        self.assertEqual(self.ids('"Иванов" OR NEAR(*'), [])
+        self.assertEqual(search.match_expression(['a"b']), '"a""b"')
+
+    def test_owner_filter_and_paging(self):
+        other = User.objects.create_user(email='search-other@example.org', password='x')
+        mine = make_request(other, full_name='Иванова Ольга')
+        self.assertEqual(self.ids('Иванов', owner_id=other.pk), [mine.pk])
+        first, total = search.search_requests('Иванов', page_size=1)
+        self.assertEqual((len(first), total), (1, 2))
+
+    def test_index_follows_update_and_delete(self):
+        ServiceRequest.objects.filter(pk=self.ivanov.pk).update(full_name='Сидоров Сергей')
+        self.assertEqual(self.ids('Иванов'), [])
+        self.assertEqual(self.ids('Сидоров'), [self.ivanov.pk])
+        self.petrova.delete()
+        self.assertEqual(self.ids('Петрова'), [])
+
+    def test_icontains_fallback(self):
+        with mock.patch.object(search, 'fts_available', return_value=False):
+            self.assertEqual(self.ids('ванов'), [self.ivanov.pk])
+            queryset = search.filter_queryset(ServiceRequest.objects.all(), 'Петрова Москва')
+            self.assertEqual(list(queryset.values_list('pk', flat=True)), [self.petrova.pk])
+
+    def test_triggers_survive_table_remakes(self):
+        # Тестовая база собрана миграциями: 0010 пересоздала таблицу заявок после 0009
+        names = [f'{search.SEARCH_TABLE}_{suffix}' for suffix in ('ad', 'ai', 'au')]
+        self.assertEqual(self.triggers(), names)
+
+        # Следующая миграция с пересозданием таблицы снова удалит триггеры — их вернёт post_migrate
+        with connection.cursor() as cursor:
+            for name in names:
+                cursor.execute(f'DROP TRIGGER {name}')
+        self.assertEqual(self.triggers(), [])
+        app_config = apps.get_app_config('ServiceRequest')
+        post_migrate.send(sender=app_config, app_config=app_config, using='default', verbosity=0,
+                          interactive=False, plan=[], apps=apps)
+        self.assertEqual(self.triggers(), names)
+
+        created = make_request(self.user, full_name='Кузнецов Дмитрий')
+        self.assertEqual(self.ids('Кузнецов'), [created.pk])
+
+
+class CustomerHistoryTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.manager = User.objects.create_user(email='history-manager@example.org', password='x', role='manager')
+        cls.customer = User.objects.create_user(email='history@example.org', password='x')
+        cls.first = make_request(cls.customer, phone_number='+7 (921) 000-11-22')
+        cls.second = make_request(cls.customer, phone_number='8 921 000 11 22', email='other@example.org')
+        cls.by_email = make_request(cls.customer, phone_number='+7 921 999-99-99')
+        cls.stranger = make_request(cls.manager, phone_number='+7 921 000-11-23')
+
+    def setUp(self):
+        self.client.force_login(self.manager)
+
+    def history(self, **params):
+        return self.client.get(reverse('customer_history_api'), params)
+
+    def ids(self, response):
+        return sorted(row['id'] for row in response.json()['results'])
+
+    def test_phone_key_filled_on_save(self):
+        self.assertEqual((self.first.phone_key, self.second.phone_key), ('+79210001122', '+79210001122'))
+        self.second.phone_number = '9219999999'
+        self.second.save(update_fields=['phone_number'])
+        self.second.refresh_from_db()
+        self.assertEqual(self.second.phone_key, '+79219999999')
+
+    def test_any_phone_format_finds_history(self):
+        for phone in ('+79210001122', '8 (921) 000-11-22', '921 000 11 22'):
+            with self.subTest(phone=phone):
+                response = self.history(phone=phone)
+                self.assertEqual(response.json()['phone_key'], '+79210001122')
+                self.assertEqual(self.ids(response), sorted([self.first.pk, self.second.pk]))
+
+    def test_phone_or_email_and_exclude(self):
+        response = self.history(phone='89210001122', email='history@example.org', exclude=self.first.pk)
+        self.assertEqual(self.ids(response), sorted([self.second.pk, self.by_email.pk]))
+
+    def test_errors(self):
+        self.assertEqual(self.history(phone='12-34').status_code, 400)
+        self.assertEqual(self.history().status_code, 400)
+        self.client.force_login(self.customer)
+        self.assertEqual(self.history(phone='+79210001122').status_code, 403)
+
+
+class CatalogRegistryTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        # Отдельный экземпляр — как справочник в другом воркере
+        self.registry = CatalogRegistry()
+
+    def codes(self, items):
+        return {item.code for item in items}
+
+    def test_unchanged_catalog_is_not_reread(self):
+        self.registry.tags()
+        with CaptureQueriesContext(connection) as queries:
+            self.registry.tags()
+            self.registry.issues()
+            self.registry.tag_ids(['missing'])
+        self.assertEqual([q['sql'] for q in queries.captured_queries if not _is_cache_query(q['sql'])], [])
+
+    def test_tag_changes_invalidate(self):
+        self.assertNotIn('reg-new', self.codes(self.registry.tags()))
+        tag = Tag.objects.create(code='reg-new', name='Новый')
+        self.assertEqual(self.registry.tag_ids(['reg-new', 'unknown']), [tag.pk])
+
+        tag.name = 'Переименован'
+        tag.save()
+        self.assertEqual({t.code: t.name for t in self.registry.tags()}['reg-new'], 'Переименован')
+
+        tag.delete()
+        self.assertEqual(self.registry.tag_ids(['reg-new']), [])
+
+    def test_issue_changes_invalidate(self):
+        IssueOption.objects.filter(code='overheating').delete()
+        self.assertNotIn('overheating', self.codes(self.registry.issues()))
+        issue = IssueOption.objects.create(code='overheating', description='Греется')
+        self.assertIn(issue.pk, [i.pk for i in self.registry.issues()])
+
+        issue.description = 'Сильно греется'
+        issue.save()
+        self.assertEqual({i.code: i.description for i in self.registry.issues()}['overheating'], 'Сильно греется')
+
+    def test_issue_ids_create_missing_for_all_workers(self):
+        IssueOption.objects.filter(code__in=['no_power', 'other']).delete()
+        other_worker = CatalogRegistry()
+        other_worker.issues()
+
+        ids = self.registry.issue_ids(['no_power', 'other', 'no_power'])
+        self.assertEqual(len(ids), 3)
+        self.assertEqual(ids[0], ids[2])
+        self.assertEqual(IssueOption.objects.get(code='no_power').description, 'Не включается')
+        # bulk_create прошёл мимо сигналов — поколение сброшено вручную
+        self.assertIn('other', self.codes(other_worker.issues()))
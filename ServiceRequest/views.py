@@ -5,11 +5,22 @@ from django.contrib import messages
 from django.contrib.auth.decorators import login_required
 from django.views.decorators.csrf import csrf_protect, csrf_exempt
 from django.views.decorators.http import require_http_methods
-from django.http import HttpResponseForbidden, JsonResponse
+from django.core.handlers.asgi import ASGIRequest
+from django.http import HttpResponse, HttpResponseForbidden, JsonResponse, StreamingHttpResponse
 from django.contrib.auth.models import User
+from django.db.models import Q
 
-from .models import ServiceRequest, IssueOption, Tag
+from .models import ServiceRequest, Tag, RequestCounter
+from .bulk import BULK_MAX_IDS, BulkUpdateError, bulk_update_requests
+from .registry import catalog
+from .search import MIN_TERM_LENGTH, search_requests
+from .events import BOARD_CARD_FIELDS, board_card, get_broker, publish_request_event, sse_stream
 from core.models import Computer, ComputerImage
+from core.catalog_facets import facets_payload, get_facets
+from core.pagination import keyset_page, InvalidCursor
+from core.phones import normalize_phone
+from core.http_cache import cached_json_response, version_key
+from core.db_router import use_replica
 
 # Функция проверки доступа
 def has_permission(user):
@@ -140,25 +151,24 @@ def create_service_request(request):
                 issues_other=issues_other,
             )
 
-            for issue_code in selected_issues:
-                issue_obj, created = IssueOption.objects.get_or_create(
-                    code=issue_code,
-                    defaults={'description': dict(IssueOption.CODE_CHOICES).get(issue_code, issue_code)}
-                )
-                service_request.issues.add(issue_obj)
+            # Справочники берутся из памяти процесса; связи вставляются одним INSERT
+            issue_ids = catalog.issue_ids(selected_issues)
+            if issue_ids:
+                service_request.issues.add(*issue_ids)
 
-            selected_tag_codes = request.POST.getlist('tags')
-            if selected_tag_codes:
-                tags = Tag.objects.filter(code__in=selected_tag_codes)
-                service_request.tags.set(tags)
+            tag_ids = catalog.tag_ids(request.POST.getlist('tags'))
+            if tag_ids:
+                service_request.tags.add(*tag_ids)
+
+            publish_request_event('created', board_card(service_request))
 
             messages.success(request, "Ваша заявка успешно отправлена! Мы свяжемся с вами в ближайшее время.")
 
         except Exception as e:
             messages.error(request, f"Ошибка при создании заявки: {str(e)}")
 
-    issue_choices = IssueOption.objects.all()
-    all_tags = Tag.objects.all()
+    issue_choices = catalog.issues()
+    all_tags = catalog.tags()
     user_requests = ServiceRequest.objects.filter(created_by=request.user).order_by('-created_at')
 
     return render(request, 'request/request.html', {
@@ -168,25 +178,185 @@ def create_service_request(request):
         'user_requests': user_requests,
     })
 
+BOARD_PAGE_SIZE = 30
+BOARD_MAX_PAGE_SIZE = 100
 @login_required
+@use_replica
 def request_list(request):
     if not has_permission(request.user):
         return HttpResponseForbidden("У вас нет доступа к этой странице.")
 
-    requests = ServiceRequest.objects.all().select_related('created_by').order_by('-created_at')
+    # Карточки подгружаются по колонкам через request_board_api
     return render(request, 'system/requests.html', {
-        'service_requests': requests
+        'status_choices': ServiceRequest.STATUS_CHOICES,
+        'board_page_size': BOARD_PAGE_SIZE,
     })
 
+@login_required
+@use_replica
+def request_board_api(request):
+    """Одна колонка канбан-доски: keyset-пагинация по (created_at, id)"""
+    if not has_permission(request.user):
+        return JsonResponse({'error': 'Доступ запрещён'}, status=403)
+
+    status = request.GET.get('status')
+    if status not in dict(ServiceRequest.STATUS_CHOICES):
+        return JsonResponse({'error': 'Недопустимое значение статуса'}, status=400)
+
+    try:
+        limit = min(max(int(request.GET.get('limit', BOARD_PAGE_SIZE)), 1), BOARD_MAX_PAGE_SIZE)
+    except ValueError:
+        return JsonResponse({'error': 'Параметр "limit" должен быть числом'}, status=400)
+
+    queryset = (
+        ServiceRequest.objects
+        .filter(status=status)
+        .only(*BOARD_CARD_FIELDS)
+    )
+    try:
+        cards, next_cursor = keyset_page(
+            queryset, ('-created_at', '-id'), cursor=request.GET.get('cursor'), limit=limit
+        )
+    except InvalidCursor as e:
+        return JsonResponse({'error': str(e)}, status=400)
+
+    return JsonResponse({
+        'status': status,
+        'results': [board_card(req) for req in cards],
+        'next_cursor': next_cursor,
+    }, json_dumps_params={'ensure_ascii': False})
+
+SEARCH_PAGE_SIZE = 20
+SEARCH_MAX_PAGE_SIZE = 50
+
+@login_required
+def search_requests_api(request):
+    """Полнотекстовый поиск заявок (FTS5): по релевантности, постранично.
+    Сотрудники ищут по всем заявкам, клиенты — только по своим."""
+    query = request.GET.get('q', '').strip()
+    try:
+        page = max(int(request.GET.get('page', 1)), 1)
+        page_size = min(max(int(request.GET.get('page_size', SEARCH_PAGE_SIZE)), 1), SEARCH_MAX_PAGE_SIZE)
+    except ValueError:
+        return JsonResponse({'error': 'Параметры "page" и "page_size" должны быть числами'}, status=400)
+
+    owner_id = None if has_permission(request.user) else request.user.id
+    results, total = search_requests(query, owner_id=owner_id, page=page, page_size=page_size)
+
+    return JsonResponse({
+        'query': query,
+        'page': page,
+        'page_size': page_size,
+        'total': total,
+        'has_next': page * page_size < total,
+        'min_length': MIN_TERM_LENGTH,
+        'results': [
+            {
+                'id': req.id,
+                'full_name': req.full_name,
+                'organization_name': req.organization_name,
+                'phone_number': req.phone_number,
+                'email': req.email,
+                'address': req.address,
+                'device_type_display': req.get_device_type_display(),
+                'status': req.status,
+                'status_display': req.get_status_display(),
+                'created_at': req.created_at.isoformat(),
+            }
+            for req in results
+        ],
+    }, json_dumps_params={'ensure_ascii': False})
+
+HISTORY_LIMIT = 100
+HISTORY_FIELDS = ('id', 'full_name', 'phone_number', 'email', 'device_type', 'status', 'created_at', 'tags_snapshot')
+
+@login_required
+def customer_history_api(request):
+    """Все заявки клиента по телефону и/или email (одним запросом по индексам phone_key и email)"""
+    if not has_permission(request.user):
+        return JsonResponse({'error': 'Доступ запрещён'}, status=403)
+
+    phone = request.GET.get('phone', '').strip()
+    email = request.GET.get('email', '').strip()
+    phone_key = normalize_phone(phone)
+    if phone and not phone_key:
+        return JsonResponse({'error': 'Не удалось разобрать номер телефона'}, status=400)
+    if not (phone_key or email):
+        return JsonResponse({'error': 'Укажите "phone" или "email"'}, status=400)
+
+    condition = Q()
+    if phone_key:
+        condition |= Q(phone_key=phone_key)
+    if email:
+        condition |= Q(email=email)
+    queryset = ServiceRequest.objects.filter(condition)
+    exclude = request.GET.get('exclude')
+    if exclude and exclude.isdigit():
+        # Текущая заявка, для которой смотрят историю
+        queryset = queryset.exclude(id=int(exclude))
+    requests = list(queryset.order_by('-created_at', '-id').only(*HISTORY_FIELDS)[:HISTORY_LIMIT + 1])
+
+    return JsonResponse({
+        'phone_key': phone_key or None,
+        'email': email or None,
+        'truncated': len(requests) > HISTORY_LIMIT,
+        'results': [
+            {
+                'id': req.id,
+                'full_name': req.full_name,
+                'phone_number': req.phone_number,
+                'email': req.email,
+                'device_type_display': req.get_device_type_display(),
+                'status': req.status,
+                'status_display': req.get_status_display(),
+                'created_at': req.created_at.isoformat(),
+                'tags': req.tags_snapshot,
+            }
+            for req in requests[:HISTORY_LIMIT]
+        ],
+    }, json_dumps_params={'ensure_ascii': False})
+
+SSE_HEARTBEAT_SECONDS = 15
+
+@login_required
+async def request_events_stream(request):
+    """SSE-поток изменений заявок для открытой доски (работает под ASGI)"""
+    user = await request.auser()
+    if not has_permission(user):
+        return HttpResponseForbidden("У вас нет доступа к этой странице.")
+    if not isinstance(request, ASGIRequest):
+        # Под WSGI бесконечный поток занял бы воркер навсегда; 204 велит браузеру не переподключаться
+        return HttpResponse(status=204)
+
+    last_event_id = request.headers.get('Last-Event-ID')
+    last_event_id = int(last_event_id) if last_event_id and last_event_id.isdigit() else None
+
+    events = get_broker().subscribe(last_event_id=last_event_id)
+    response = StreamingHttpResponse(
+        sse_stream(events, SSE_HEARTBEAT_SECONDS), content_type='text/event-stream',
+    )
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+@login_required
+def request_counters_api(request):
+    """Итоги по статусам, типам устройств и заказчиков из таблицы счётчиков"""
+    if not has_permission(request.user):
+        return JsonResponse({'error': 'Доступ запрещён'}, status=403)
+
+    return JsonResponse(RequestCounter.totals())
+
 @login_required
 def service_request_api(request, request_id):
     allowed_roles = ['manager', 'admin', 'engineer']
-    
-    try:
-        req = ServiceRequest.objects.select_related('created_by').prefetch_related('issues', 'tags').get(id=request_id)
-        
-        if not request.user.is_staff and request.user.role not in allowed_roles and req.created_by != request.user:
-            return JsonResponse({'error': 'Доступ запрещён'}, status=403)
+
+    def build():
+        try:
+            # created_by не нужен: для проверки доступа достаточно created_by_id
+            req = ServiceRequest.objects.prefetch_related('issues').get(id=request_id)
+        except ServiceRequest.DoesNotExist:
+            return JsonResponse({'error': 'Заявка не найдена'}, status=404)
 
         data = {
             'id': req.id,
@@ -209,20 +379,31 @@ def service_request_api(request, request_id):
             'external_links': req.external_links or '',
             'status': req.status,
             'created_at': req.created_at.isoformat(),
-            'tags': [
-                {'code': tag.code, 'name': tag.name, 'color': tag.color}
-                for tag in req.tags.all()
-            ],
+            'tags': req.tags_snapshot,
             'available_tags': [
                 {'code': tag.code, 'name': tag.name, 'color': tag.color}
-                for tag in Tag.objects.all()
+                for tag in catalog.tags()
             ],
         }
+        return data, req.updated_at, {'owner_id': req.created_by_id}
 
-        return JsonResponse(data, json_dumps_params={'ensure_ascii': False, 'indent': 2})
-
-    except ServiceRequest.DoesNotExist:
-        return JsonResponse({'error': 'Заявка не найдена'}, status=404)
+    def authorize(context):
+        if not request.user.is_staff and request.user.role not in allowed_roles and context['owner_id'] != request.user.id:
+            return JsonResponse({'error': 'Доступ запрещён'}, status=403)
+        return None
+
+    # Ответ зависит от заявки (поля, теги, симптомы) и от справочников тегов и симптомов
+    return cached_json_response(
+        request,
+        'service_request',
+        [
+            version_key('servicerequest', request_id),
+            version_key('tag_catalog'),
+            version_key('issue_catalog'),
+        ],
+        build,
+        authorize=authorize,
+    )
 
 @csrf_protect
 @login_required
@@ -236,6 +417,7 @@ def update_service_request(request, pk):
                 return JsonResponse({'error': 'Доступ запрещён'}, status=403)
 
             data = json.loads(request.body)
+            old_status = req.status
 
             if 'status' in data:
                 if data['status'] in dict(ServiceRequest.STATUS_CHOICES):
@@ -244,7 +426,6 @@ def update_service_request(request, pk):
                     return JsonResponse({'error': 'Недопустимое значение статуса'}, status=400)
 
             if 'tags' in data:
-                req.tags.clear()
                 tag_codes = data['tags']
                 if isinstance(tag_codes, list):
                     tags = Tag.objects.filter(code__in=tag_codes)
@@ -254,6 +435,11 @@ def update_service_request(request, pk):
 
             req.save()
 
+            if req.status != old_status:
+                publish_request_event('status', board_card(req))
+            if 'tags' in data:
+                publish_request_event('tags', board_card(req))
+
             return JsonResponse({'success': True})
         except ServiceRequest.DoesNotExist:
             return JsonResponse({'error': 'Заявка не найдена'}, status=404)
@@ -261,7 +447,54 @@ def update_service_request(request, pk):
             return JsonResponse({'error': str(e)}, status=400)
     return JsonResponse({'error': 'Invalid method'}, status=405)
 
+@csrf_protect
+@login_required
+@require_http_methods(["POST"])
+def bulk_update_service_requests(request):
+    """Массовая смена статуса и тегов: {"ids": [...], "status": "...", "tags": {"add": [...], "remove": [...]}}"""
+    allowed_roles = ['manager', 'admin', 'engineer']
+    try:
+        data = json.loads(request.body)
+    except ValueError:
+        return JsonResponse({'error': 'Некорректный JSON'}, status=400)
+
+    ids = data.get('ids')
+    # bool — подкласс int: без явной проверки JSON true превратился бы в id=1
+    if not isinstance(ids, list) or not ids or not all(
+        isinstance(pk, int) and not isinstance(pk, bool) for pk in ids
+    ):
+        return JsonResponse({'error': 'Поле "ids" должно быть непустым списком чисел'}, status=400)
+    if len(ids) > BULK_MAX_IDS:
+        return JsonResponse({'error': f'Не более {BULK_MAX_IDS} заявок за раз'}, status=400)
+
+    tags = data.get('tags') or {}
+    if not isinstance(tags, dict) or not all(isinstance(tags.get(k, []), list) for k in ('add', 'remove')):
+        return JsonResponse({'error': 'Поле "tags" должно иметь вид {"add": [...], "remove": [...]}'}, status=400)
+    if 'status' not in data and not tags.get('add') and not tags.get('remove'):
+        return JsonResponse({'error': 'Нечего обновлять: укажите "status" и/или "tags"'}, status=400)
+
+    user = request.user
+    if user.is_staff or user.role in allowed_roles:
+        can_edit = None
+    else:
+        def can_edit(created_by_id):
+            return created_by_id == user.id
+
+    try:
+        results = bulk_update_requests(
+            list(dict.fromkeys(ids)),
+            status=data.get('status'),
+            add_tags=tags.get('add', []),
+            remove_tags=tags.get('remove', []),
+            can_edit=can_edit,
+        )
+    except BulkUpdateError as e:
+        return JsonResponse({'error': str(e)}, status=400)
+
+    return JsonResponse({'success': True, 'results': results})
+
 @login_required
+@use_replica
 def computer_dashboard(request):
     if not has_permission(request.user):
         return HttpResponseForbidden("У вас нет доступа к этой странице.")
@@ -272,6 +505,7 @@ def computer_dashboard(request):
     return render(request, 'system/catalog.html', {
         'computers': computers,
         'categories': categories,
+        'facets': facets_payload(get_facets()),
     })
 
 @csrf_exempt
@@ -352,12 +586,7 @@ def computer_save(request):
         if 'clear_images' in request.POST:
             computer.images.all().delete()
 
-        uploaded_files = request.FILES.getlist('images')
-        for uploaded_file in uploaded_files:
-            ComputerImage.objects.create(
-                computer=computer,
-                image=uploaded_file,
-            )
+        add_images(computer, request.FILES.getlist('images'))
 
         main_image = computer.images.first()
         return JsonResponse({
@@ -367,6 +596,7 @@ def computer_save(request):
             'price': computer.get_price_display(),
             'category': computer.get_category_display(),
             'image_url': main_image.image.url if main_image else None,
+            'image_srcset': main_image.srcset if main_image else '',
         })
 
     except Exception as e:
@@ -404,43 +634,64 @@ def computer_delete_image(request):
     except Exception as e:
         return JsonResponse({'success': False, 'error': str(e)})
 
+def add_images(computer, files):
+    """
+    Привязывает загруженные файлы к компьютеру. Хранилище складывает одинаковые
+    файлы в один (core/storage.py), а повторная загрузка того же фото к тому же
+    компьютеру не создаёт второй строки.
+    """
+    if not files:
+        return
+    existing = set(computer.images.values_list('image', flat=True))
+    for f in files:
+        image = ComputerImage(computer=computer)
+        image.image.save(f.name, f, save=False)
+        if image.image.name not in existing:
+            image.save()
+            existing.add(image.image.name)
+
 def handle_images(request, computer):
     if 'clear_images' in request.POST:
         computer.images.all().delete()
 
-    for f in request.FILES.getlist('images'):
-        ComputerImage.objects.create(computer=computer, image=f)
+    add_images(computer, request.FILES.getlist('images'))
 
 @login_required
 def computer_data(request, pk):
     if not has_permission(request.user):
         return JsonResponse({'error': 'Доступ запрещён'}, status=403)
-    
-    computer = get_object_or_404(Computer, pk=pk)
-    images = [
-        {
-            'id': img.id,
-            'url': img.image.url,
-            'is_main': img.is_main,
-            'order': img.order
-        }
-        for img in computer.images.all()
-    ]
-    return JsonResponse({
-        'id': computer.id,
-        'name': computer.name,
-        'category': computer.category,
-        'short_description': computer.short_description,
-        'full_description': computer.full_description,
-        'price': str(computer.price),
-        'is_available': computer.is_available,
-        'processor': computer.processor,
-        'graphics_card': computer.graphics_card,
-        'ram': computer.ram,
-        'storage': computer.storage,
-        'power_supply': computer.power_supply,
-        'case': computer.case,
-        'cooling': computer.cooling,
-        'operating_system': computer.operating_system,
-        'images': images,
-    })
\ No newline at end of file
+
+    def build():
+        computer = get_object_or_404(Computer, pk=pk)
+        images = [
+            {
+                'id': img.id,
+                'url': img.image.url,
+                'thumbnail': img.thumbnail_url,
+                'srcset': img.srcset,
+                'webp_srcset': img.webp_srcset,
+                'is_main': img.is_main,
+                'order': img.order
+            }
+            for img in computer.images.all()
+        ]
+        return {
+            'id': computer.id,
+            'name': computer.name,
+            'category': computer.category,
+            'short_description': computer.short_description,
+            'full_description': computer.full_description,
+            'price': str(computer.price),
+            'is_available': computer.is_available,
+            'processor': computer.processor,
+            'graphics_card': computer.graphics_card,
+            'ram': computer.ram,
+            'storage': computer.storage,
+            'power_supply': computer.power_supply,
+            'case': computer.case,
+            'cooling': computer.cooling,
+            'operating_system': computer.operating_system,
+            'images': images,
+        }, computer.updated_at, None
+
+    return cached_json_response(request, 'computer_data', [version_key('computer', pk)], build)
@@ -0,0 +1,263 @@
+# core/access_log.py
+"""
+Структурированный журнал запросов в формате JSONL для планирования нагрузки.
+
+AccessLogMiddleware на каждый запрос формирует запись (вьюха, статус,
+задержка, число SQL-запросов, роль пользователя, размер ответа) и кладёт её
+в ограниченную очередь — запрос никогда не ждёт диск. Пишет фоновый поток:
+забирает записи пачками, дописывает строки в файл и ротирует его по размеру
+и по времени. Если очередь переполнена (диск не успевает), запись
+отбрасывается, а в журнал позже попадает строка {"dropped": N} — так потери
+видны при разборе.
+
+Число запросов и время SQL берутся у ProfilingMiddleware (core/profiling.py),
+поэтому AccessLogMiddleware ставится перед ним. Оба middleware гибридные
+и под ASGI не добавляют переключений между потоком и циклом событий.
+
+Настройки (все необязательные):
+    ACCESS_LOG_ENABLED          — выключатель (по умолчанию True);
+    ACCESS_LOG_FILE             — путь (BASE_DIR/logs/access.{pid}.jsonl); «{pid}» в пути
+                                  заменяется номером процесса — у каждого воркера свой
+                                  файл, и ротирует его только он. Путь без {pid} годится
+                                  лишь для одного процесса: иначе воркеры ротируют общий
+                                  файл одновременно и теряют записи друг друга;
+    ACCESS_LOG_MAX_BYTES        — ротация по размеру (50 МБ, 0 — выключена);
+    ACCESS_LOG_ROTATE_INTERVAL  — ротация по времени, секунды (86400, 0 — выключена);
+    ACCESS_LOG_BACKUP_COUNT     — сколько ротированных файлов хранить (14);
+    ACCESS_LOG_QUEUE_SIZE       — ёмкость очереди записей (10000);
+    ACCESS_LOG_FLUSH_INTERVAL   — как часто поток сбрасывает буфер на диск, секунды (1).
+Разбор журналов — команда access_log_stats.
+"""
+import atexit
+import glob
+import json
+import os
+import queue
+import threading
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.utils import timezone
+
+ROTATED_SUFFIX = '%Y%m%d-%H%M%S'
+
+_writer = None
+_writer_lock = threading.Lock()
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+def _configured_path():
+    return _setting('ACCESS_LOG_FILE', os.path.join(settings.BASE_DIR, 'logs', 'access.{pid}.jsonl'))
+
+
+def log_path():
+    path = _configured_path()
+    return os.path.abspath(str(path).replace('{pid}', str(os.getpid())))
+
+
+def log_files(path=None):
+    """Текущий файл журнала и его ротированные копии (при {pid} в пути — всех процессов)."""
+    if path is None:
+        path = _configured_path()
+    pattern = str(path).replace('{pid}', '*')
+    return sorted(set(glob.glob(pattern) + glob.glob(pattern + '.*')))
+
+
+class AccessLogWriter:
+    """Фоновый поток, дописывающий записи из очереди в файл с ротацией."""
+
+    def __init__(self, path, max_bytes=50 * 1024 * 1024, rotate_interval=86400, backup_count=14,
+                 queue_size=10000, flush_interval=1.0):
+        self.path = path
+        self.pid = os.getpid()
+        self.max_bytes = max_bytes
+        self.rotate_interval = rotate_interval
+        self.backup_count = backup_count
+        self.flush_interval = flush_interval
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.dropped = 0
+        self._dropped_lock = threading.Lock()
+        self._stream = None
+        self._opened_at = 0.0
+        self._stopping = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='access-log-writer', daemon=True)
+        self._thread.start()
+
+    def write(self, record):
+        """Ставит запись в очередь; при переполнении отбрасывает её, не блокируя запрос."""
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            with self._dropped_lock:
+                self.dropped += 1
+
+    def close(self, timeout=5):
+        """Дописывает очередь и останавливает поток."""
+        self._stopping.set()
+        self._thread.join(timeout)
+
+    # --- фоновый поток -----------------------------------------------------
+
+    def _run(self):
+        while True:
+            batch = self._take_batch()
+            if batch:
+                self._write_batch(batch)
+            elif self._stopping.is_set():
+                break
+        if self._stream is not None:
+            self._stream.close()
+
+    def _take_batch(self):
+        try:
+            batch = [self.queue.get(timeout=self.flush_interval)]
+        except queue.Empty:
+            batch = []
+        while len(batch) < 1000:
+            try:
+                batch.append(self.queue.get_nowait())
+            except queue.Empty:
+                break
+        with self._dropped_lock:
+            dropped, self.dropped = self.dropped, 0
+        if dropped:
+            batch.append({'time': timezone.now().isoformat(), 'dropped': dropped})
+        return batch
+
+    def _write_batch(self, batch):
+        try:
+            if self._should_rotate():
+                self._rotate()
+            if self._stream is None:
+                self._open()
+            self._stream.write(''.join(json.dumps(record, ensure_ascii=False) + '\n' for record in batch))
+            self._stream.flush()
+        except OSError:
+            # Диск недоступен — теряем пачку, но поток не падает и продолжит со следующей
+            with self._dropped_lock:
+                self.dropped += len(batch)
+            if self._stream is not None:
+                self._stream.close()
+                self._stream = None
+
+    def _open(self):
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        self._stream = open(self.path, 'a', encoding='utf-8')
+        self._opened_at = time.time()
+
+    def _should_rotate(self):
+        if self._stream is None:
+            return False
+        if self.max_bytes and self._stream.tell() >= self.max_bytes:
+            return True
+        return bool(self.rotate_interval) and time.time() - self._opened_at >= self.rotate_interval
+
+    def _rotate(self):
+        self._stream.close()
+        self._stream = None
+        target = f"{self.path}.{time.strftime(ROTATED_SUFFIX)}"
+        if os.path.exists(target):
+            target += f".{time.time_ns()}"
+        os.replace(self.path, target)
+        if self.backup_count:
+            for old in sorted(glob.glob(glob.escape(self.path) + '.*'))[:-self.backup_count]:
+                os.remove(old)
+
+
+def get_writer():
+    """Писатель текущего процесса; после fork создаётся заново (потоки не наследуются)."""
+    global _writer
+    path = log_path()
+    if _writer is None or _writer.pid != os.getpid() or _writer.path != path:
+        with _writer_lock:
+            if _writer is None or _writer.pid != os.getpid() or _writer.path != path:
+                if _writer is not None and _writer.pid == os.getpid():
+                    _writer.close()
+                _writer = AccessLogWriter(
+                    path,
+                    max_bytes=_setting('ACCESS_LOG_MAX_BYTES', 50 * 1024 * 1024),
+                    rotate_interval=_setting('ACCESS_LOG_ROTATE_INTERVAL', 86400),
+                    backup_count=_setting('ACCESS_LOG_BACKUP_COUNT', 14),
+                    queue_size=_setting('ACCESS_LOG_QUEUE_SIZE', 10000),
+                    flush_interval=_setting('ACCESS_LOG_FLUSH_INTERVAL', 1.0),
+                )
+    return _writer
+
+
+@atexit.register
+def close_writer():
+    """Дописывает очередь и останавливает поток текущего процесса."""
+    global _writer
+    with _writer_lock:
+        if _writer is not None and _writer.pid == os.getpid():
+            _writer.close()
+        _writer = None
+
+
+def _user_role(request):
+    # Только уже загруженный пользователь: журнал не добавляет запросов к сессии.
+    # Если вьюха пользователя не загружала, роль известна лишь при отсутствии сессии.
+    user = getattr(request, '_cached_user', None) or getattr(request, '_acached_user', None)
+    if user is None:
+        return None if settings.SESSION_COOKIE_NAME in request.COOKIES else 'anonymous'
+    return user.role if user.is_authenticated else 'anonymous'
+
+
+def _response_bytes(response):
+    if response.has_header('Content-Length'):
+        return int(response['Content-Length'])
+    if getattr(response, 'streaming', False):
+        return None
+    return len(response.content)
+
+
+class AccessLogMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if not _setting('ACCESS_LOG_ENABLED', True):
+            return self.get_response(request)
+
+        started = time.perf_counter()
+        response = self.get_response(request)
+        self._log(request, response, time.perf_counter() - started)
+        return response
+
+    async def __acall__(self, request):
+        if not _setting('ACCESS_LOG_ENABLED', True):
+            return await self.get_response(request)
+
+        started = time.perf_counter()
+        response = await self.get_response(request)
+        # write() только кладёт запись в очередь — в цикле событий не блокирует
+        self._log(request, response, time.perf_counter() - started)
+        return response
+
+    @staticmethod
+    def _log(request, response, elapsed):
+        match = getattr(request, 'resolver_match', None)
+        profile = getattr(request, 'profile', None)
+        get_writer().write({
+            'time': timezone.now().isoformat(),
+            'method': request.method,
+            'path': request.path,
+            'view': match.view_name if match else None,
+            'status': response.status_code,
+            'ms': round(elapsed * 1000, 2),
+            'queries': profile.db_count if profile else None,
+            'db_ms': round(profile.db_time * 1000, 2) if profile else None,
+            'role': _user_role(request),
+            'bytes': _response_bytes(response),
+        })
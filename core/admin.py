@@ -2,7 +2,7 @@ from django.contrib import admin
 
 # Register your models here.
 from django.contrib import admin
-from core.models import Computer, ComputerImage
+from core.models import Computer, ComputerImage, OutgoingEmail
 
 class ComputerImageInline(admin.TabularInline):
     model = ComputerImage
@@ -18,4 +18,11 @@ class ComputerAdmin(admin.ModelAdmin):
 @admin.register(ComputerImage)
 class ComputerImageAdmin(admin.ModelAdmin):
     list_display = ['computer', 'is_main', 'order']
-    list_editable = ['is_main', 'order']
\ No newline at end of file
+    list_editable = ['is_main', 'order']
+
+@admin.register(OutgoingEmail)
+class OutgoingEmailAdmin(admin.ModelAdmin):
+    list_display = ['to', 'subject', 'status', 'attempts', 'next_attempt_at', 'sent_at']
+    list_filter = ['status']
+    search_fields = ['to']
+    readonly_fields = ['attempts', 'last_error', 'created_at', 'sent_at']
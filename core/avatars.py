@@ -0,0 +1,110 @@
+# core/avatars.py
+"""
+Нормализация аватаров при загрузке.
+
+Загруженный файл декодируется Pillow (с учётом ориентации из EXIF),
+обрезается по центру до квадрата и сохраняется в двух размерах в WebP:
+
+    blobs/3f/a2/3fa2...c1.webp        — User.avatar (большой, для профиля),
+                                        хранится по содержимому (core/storage.py)
+    blobs/3f/a2/3fa2...c1.s128.webp   — маленький, его отдают JSON API и списки
+
+Повторное кодирование не переносит EXIF и прочие метаданные (геометки,
+модель камеры). Файлы больше AVATAR_MAX_UPLOAD_BYTES и изображения больше
+AVATAR_MAX_PIXELS пикселей (декомпрессионные бомбы) отклоняются до
+декодирования — ValidationError с понятным сообщением.
+
+Аватары, загруженные до нормализации, отдаются как есть: у них нет
+маленькой копии, и small_avatar_url возвращает оригинал.
+
+Настройки (все необязательные):
+    AVATAR_SIZE               — сторона большого аватара, px (512);
+    AVATAR_SMALL_SIZE         — сторона маленького, px (128);
+    AVATAR_QUALITY            — качество WebP (82);
+    AVATAR_MAX_UPLOAD_BYTES   — предельный размер файла (10 МБ);
+    AVATAR_MAX_PIXELS         — предельное число пикселей (25 млн).
+"""
+import io
+import os
+import warnings
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from PIL import Image, ImageOps, UnidentifiedImageError
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+def _sizes():
+    return {'large': _setting('AVATAR_SIZE', 512), 'small': _setting('AVATAR_SMALL_SIZE', 128)}
+
+
+def process_avatar(uploaded):
+    """
+    Проверяет и перекодирует загруженный файл; возвращает {'large': bytes, 'small': bytes}.
+    Бросает ValidationError, если это не изображение, оно слишком велико или это бомба.
+    """
+    max_bytes = _setting('AVATAR_MAX_UPLOAD_BYTES', 10 * 1024 * 1024)
+    if uploaded.size is not None and uploaded.size > max_bytes:
+        raise ValidationError(f"Файл аватара больше {max_bytes // (1024 * 1024)} МБ.", code='avatar_too_large')
+
+    uploaded.seek(0)
+    max_pixels = _setting('AVATAR_MAX_PIXELS', 25_000_000)
+    try:
+        with warnings.catch_warnings():
+            # Предупреждение Pillow о бомбе — тоже отказ, а не просто запись в лог
+            warnings.simplefilter('error', Image.DecompressionBombWarning)
+            image = Image.open(uploaded)
+            # Размер известен из заголовка: огромное изображение отклоняем, не распаковывая
+            if image.width * image.height > max_pixels:
+                raise ValidationError(
+                    f"Изображение слишком большое ({image.width}×{image.height}).", code='avatar_too_many_pixels',
+                )
+            largest = max(_sizes().values())
+            # JPEG сразу декодируется в уменьшенном масштабе — быстрее и меньше памяти
+            image.draft(None, (largest, largest))
+            image = ImageOps.exif_transpose(image)
+            image.load()
+    except (Image.DecompressionBombError, Image.DecompressionBombWarning):
+        raise ValidationError("Изображение слишком большое.", code='avatar_too_many_pixels')
+    except (UnidentifiedImageError, OSError, SyntaxError, ValueError):
+        raise ValidationError("Файл аватара не является изображением.", code='avatar_invalid')
+
+    has_alpha = image.mode in ('RGBA', 'LA') or (image.mode == 'P' and 'transparency' in image.info)
+    image = image.convert('RGBA' if has_alpha else 'RGB')
+    rendered = {}
+    for label, size in _sizes().items():
+        square = ImageOps.fit(image, (size, size), Image.LANCZOS)
+        buffer = io.BytesIO()
+        square.save(buffer, 'WEBP', quality=_setting('AVATAR_QUALITY', 82), method=4)
+        rendered[label] = buffer.getvalue()
+    return rendered
+
+
+def store_avatar(user, rendered):
+    """Сохраняет оба размера и ставит user.avatar на большой; сохранить пользователя — забота вызывающего."""
+    field = user._meta.get_field('avatar')
+    name = field.storage.save(field.generate_filename(user, 'avatar.webp'), ContentFile(rendered['large']))
+    small = _small_name(name)
+    # Тот же аватар у другого пользователя — маленькая копия уже есть
+    if not default_storage.exists(small):
+        default_storage.save(small, ContentFile(rendered['small']))
+    user.avatar = name
+
+
+def _small_name(name):
+    return f"{os.path.splitext(name)[0]}.s{_sizes()['small']}.webp"
+
+
+def small_avatar_url(user):
+    """URL маленького аватара (у загруженных до нормализации — оригинала); None — аватара нет."""
+    if not user.avatar:
+        return None
+    small = _small_name(user.avatar.name)
+    if not default_storage.exists(small):
+        return user.avatar.url
+    return default_storage.url(small)
@@ -0,0 +1,309 @@
+# core/cache_backends.py
+"""
+Двухуровневый кэш: LRU в памяти процесса перед общим бэкендом (DatabaseCache).
+
+Настройка в CACHES:
+
+    'default': {
+        'BACKEND': 'core.cache_backends.TwoTierCache',
+        'OPTIONS': {
+            'SHARED': 'shared',         # алиас общего кэша в CACHES
+            'MAX_ENTRIES': 1000,        # размер LRU
+            'LOCAL_TIMEOUT': 5,         # сколько секунд запись живёт в памяти
+            'INVALIDATION_INTERVAL': 1, # как часто сверять эпоху инвалидации
+            'BYPASS_PREFIXES': (...),   # ключи, которые читаются только из общего кэша
+            'INVALIDATION_PREFIXES': (...), # удаление такого ключа сбрасывает LRU всех процессов
+        },
+    }
+
+Межпроцессная инвалидация: у общего кэша есть метка эпохи; процесс, заметивший
+новую эпоху, сбрасывает свой LRU. Эпоха сверяется не чаще раза в
+INVALIDATION_INTERVAL. Меняют её только явные инвалидации — invalidate(),
+clear() и удаление ключей из INVALIDATION_PREFIXES (по умолчанию 'ver:' —
+сброс версий в core/http_cache.bump_versions). Через версии адресуются все
+JSON-ответы и карточки каталога, так что изменение данных видно другим
+процессам с задержкой не больше INVALIDATION_INTERVAL.
+
+Обычные set/delete/set_many/incr эпоху не трогают: иначе каждая запись
+(ленивое создание версий в get_versions, коды входа, фасеты) сбрасывала бы
+LRU всех процессов и локальный уровень почти не работал бы. Чужая копия такого
+ключа живёт в LRU не дольше LOCAL_TIMEOUT. Ключам, где и эта задержка
+недопустима (одноразовые коды входа и регистрации), LRU не используется
+вовсе — см. BYPASS_PREFIXES.
+
+Значения в LRU хранятся сериализованными (pickle, как в LocMemCache): каждый
+get() возвращает свою копию, и правка полученного словаря не меняет значение
+для других запросов процесса.
+
+Общий кэш хранит метку эпохи и версии, поэтому его MAX_ENTRIES в settings
+поднят: при переполнении DatabaseCache удаляет треть записей подряд и мог бы
+выбросить их вместе с остальными.
+"""
+import pickle
+import threading
+import time
+import zlib
+from collections import OrderedDict
+
+from django.core.cache import caches
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+
+# Коды подтверждения должны сразу исчезать у всех воркеров после использования
+DEFAULT_BYPASS_PREFIXES = ('login_code_', 'registration_code_')
+# Сброс версий (core/http_cache.bump_versions) — явная инвалидация
+DEFAULT_INVALIDATION_PREFIXES = ('ver:',)
+
+EPOCH_KEY = 'twotier:epoch'
+LOCK_PREFIX = 'twotier:lock:'
+LOCK_STRIPES = 64
+
+_MISSING = object()
+
+
+class TwoTierCache(BaseCache):
+    def __init__(self, location, params):
+        super().__init__(params)
+        options = params.get('OPTIONS', {})
+        self._shared_alias = options.get('SHARED', 'shared')
+        self._max_entries = options.get('MAX_ENTRIES', 1000)
+        self._local_timeout = options.get('LOCAL_TIMEOUT', 5)
+        self._interval = options.get('INVALIDATION_INTERVAL', 1)
+        self._lock_timeout = options.get('LOCK_TIMEOUT', 30)
+        self._bypass = tuple(options.get('BYPASS_PREFIXES', DEFAULT_BYPASS_PREFIXES))
+        self._invalidating = tuple(options.get('INVALIDATION_PREFIXES', DEFAULT_INVALIDATION_PREFIXES))
+
+        self._local = OrderedDict()
+        self._lock = threading.Lock()
+        self._key_locks = [threading.Lock() for _ in range(LOCK_STRIPES)]
+        self._epoch = None
+        self._checked_at = 0.0
+        self._stats = dict.fromkeys(
+            ('local_hits', 'shared_hits', 'misses', 'sets', 'deletes', 'flushes', 'waits'), 0
+        )
+
+    @property
+    def shared(self):
+        return caches[self._shared_alias]
+
+    # --- локальный уровень -------------------------------------------------
+
+    def _count(self, name, n=1):
+        with self._lock:
+            self._stats[name] += n
+
+    def _local_allowed(self, key):
+        return not key.startswith(self._bypass)
+
+    def _check_epoch(self):
+        """Сбрасывает LRU, если другой процесс объявил инвалидацию."""
+        now = time.monotonic()
+        if now - self._checked_at < self._interval:
+            return
+        epoch = self.shared.get(EPOCH_KEY)
+        with self._lock:
+            self._checked_at = now
+            if epoch != self._epoch:
+                if self._local:
+                    self._stats['flushes'] += 1
+                self._local.clear()
+                self._epoch = epoch
+
+    def _bump_epoch(self):
+        self.shared.set(EPOCH_KEY, time.time_ns(), None)
+
+    def _local_get(self, local_key):
+        with self._lock:
+            item = self._local.get(local_key)
+            if item is None:
+                return _MISSING
+            value, expires_at = item
+            if expires_at <= time.monotonic():
+                del self._local[local_key]
+                return _MISSING
+            self._local.move_to_end(local_key)
+        return pickle.loads(value)
+
+    def _local_set(self, local_key, value, timeout):
+        ttl = self._local_timeout
+        if timeout is not DEFAULT_TIMEOUT and timeout is not None:
+            ttl = min(ttl, timeout)
+        if ttl <= 0:
+            return
+        value = pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+        with self._lock:
+            self._local[local_key] = (value, time.monotonic() + ttl)
+            self._local.move_to_end(local_key)
+            while len(self._local) > self._max_entries:
+                self._local.popitem(last=False)
+
+    def _local_delete(self, local_keys):
+        with self._lock:
+            for local_key in local_keys:
+                self._local.pop(local_key, None)
+
+    # --- API кэша Django ---------------------------------------------------
+
+    def get(self, key, default=None, version=None):
+        local_key = self.make_and_validate_key(key, version)
+        if self._local_allowed(key):
+            self._check_epoch()
+            value = self._local_get(local_key)
+            if value is not _MISSING:
+                self._count('local_hits')
+                return value
+        value = self.shared.get(key, _MISSING, version)
+        if value is _MISSING:
+            self._count('misses')
+            return default
+        self._count('shared_hits')
+        if self._local_allowed(key):
+            self._local_set(local_key, value, DEFAULT_TIMEOUT)
+        return value
+
+    def get_many(self, keys, version=None):
+        self._check_epoch()
+        found, remote = {}, []
+        for key in keys:
+            value = _MISSING
+            if self._local_allowed(key):
+                value = self._local_get(self.make_and_validate_key(key, version))
+            if value is _MISSING:
+                remote.append(key)
+            else:
+                found[key] = value
+        self._count('local_hits', len(found))
+        if remote:
+            fetched = self.shared.get_many(remote, version)
+            self._count('shared_hits', len(fetched))
+            self._count('misses', len(remote) - len(fetched))
+            for key, value in fetched.items():
+                if self._local_allowed(key):
+                    self._local_set(self.make_and_validate_key(key, version), value, DEFAULT_TIMEOUT)
+            found.update(fetched)
+        return found
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        self.shared.set(key, value, timeout, version)
+        self._forget([key], version, 'sets')
+        if self._local_allowed(key):
+            self._local_set(self.make_and_validate_key(key, version), value, timeout)
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        failed = self.shared.set_many(data, timeout, version)
+        self._forget(list(data), version, 'sets')
+        for key, value in data.items():
+            if key not in failed and self._local_allowed(key):
+                self._local_set(self.make_and_validate_key(key, version), value, timeout)
+        return failed
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        # Ключа не было в общем кэше — действующих копий в чужих LRU тоже нет
+        added = self.shared.add(key, value, timeout, version)
+        if added:
+            self._count('sets')
+        return added
+
+    def delete(self, key, version=None):
+        deleted = self.shared.delete(key, version)
+        self._forget([key], version, 'deletes')
+        if key.startswith(self._invalidating):
+            self._bump_epoch()
+        return deleted
+
+    def delete_many(self, keys, version=None):
+        keys = list(keys)
+        self.shared.delete_many(keys, version)
+        self._forget(keys, version, 'deletes')
+        if any(key.startswith(self._invalidating) for key in keys):
+            self._bump_epoch()
+
+    def invalidate(self, keys, version=None):
+        """Удаляет ключи и сразу сбрасывает их копии в LRU всех процессов."""
+        keys = list(keys)
+        self.shared.delete_many(keys, version)
+        self._forget(keys, version, 'deletes')
+        self._bump_epoch()
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        return self.shared.touch(key, timeout, version)
+
+    def has_key(self, key, version=None):
+        if self._local_allowed(key):
+            self._check_epoch()
+            if self._local_get(self.make_and_validate_key(key, version)) is not _MISSING:
+                return True
+        return self.shared.has_key(key, version)
+
+    def incr(self, key, delta=1, version=None):
+        value = self.shared.incr(key, delta, version)
+        self._forget([key], version, 'sets')
+        return value
+
+    def clear(self):
+        self.shared.clear()
+        with self._lock:
+            self._local.clear()
+        self._bump_epoch()
+
+    def close(self, **kwargs):
+        self.shared.close(**kwargs)
+
+    def _forget(self, keys, version, stat):
+        """Убирает ключи из своего LRU (копии в чужих истекут через LOCAL_TIMEOUT)."""
+        self._local_delete([self.make_and_validate_key(key, version) for key in keys])
+        self._count(stat, len(keys))
+
+    # --- защита от лавины промахов -----------------------------------------
+
+    def get_or_set(self, key, default, timeout=DEFAULT_TIMEOUT, version=None):
+        """
+        Как в Django, но вычисление default() выполняет один вызывающий:
+        внутри процесса — под блокировкой ключа, между процессами — под
+        блокировкой в общем кэше (add). Остальные ждут готового значения.
+        None из default() не сохраняется.
+        """
+        value = self.get(key, _MISSING, version)
+        if value is not _MISSING:
+            return value
+        if not callable(default):
+            self.add(key, default, timeout, version)
+            return self.get(key, default, version)
+
+        local_key = self.make_and_validate_key(key, version)
+        with self._key_locks[zlib.crc32(local_key.encode()) % LOCK_STRIPES]:
+            # Пока ждали блокировку, значение мог вычислить соседний поток
+            value = self.get(key, _MISSING, version)
+            if value is not _MISSING:
+                return value
+
+            lock_key = LOCK_PREFIX + key
+            acquired = self.shared.add(lock_key, 1, self._lock_timeout, version)
+            if not acquired:
+                # Значение вычисляет другой процесс — ждём его, но не дольше блокировки
+                self._count('waits')
+                deadline = time.monotonic() + self._lock_timeout
+                delay = 0.01
+                while time.monotonic() < deadline:
+                    time.sleep(delay)
+                    delay = min(delay * 2, 0.2)
+                    value = self.shared.get(key, _MISSING, version)
+                    if value is not _MISSING:
+                        return value
+                    if not self.shared.has_key(lock_key, version):
+                        break
+            try:
+                value = default()
+                if value is not None:
+                    self.set(key, value, timeout, version)
+                return value
+            finally:
+                if acquired:
+                    self.shared.delete(lock_key, version)
+
+    def stats(self):
+        """Счётчики попаданий и промахов этого процесса."""
+        with self._lock:
+            stats = dict(self._stats, local_entries=len(self._local))
+        lookups = stats['local_hits'] + stats['shared_hits'] + stats['misses']
+        stats['hit_ratio'] = round((stats['local_hits'] + stats['shared_hits']) / lookups, 4) if lookups else None
+        return stats
@@ -0,0 +1,179 @@
+# core/catalog_api.py
+"""
+Разбор параметров и сериализация для JSON API каталога (computer_list_api).
+
+    GET /api/computers/?category=gaming&category=office&min_price=50000
+        &max_price=150000&sort=price&limit=24&cursor=...
+    GET /api/computers/?ids=12,7,31          — пакетный режим (сравнение)
+
+Фильтры: category (можно несколько, в том числе через запятую), min_price,
+max_price, available (true — по умолчанию; false и all — только сотрудникам).
+По разобранным характеристикам (core/specs.py): min_ram и min_storage (ГБ),
+storage_type, cpu_vendor, cpu_family, gpu_vendor (можно несколько),
+min_gpu_tier (1..5), min_psu (Вт) — например, «от 32 ГБ и RTX»:
+?min_ram=32&gpu_vendor=nvidia&min_gpu_tier=3.
+Сортировки — CATALOG_SORTS; пагинация курсорная (core/pagination.py), поэтому
+порядок всегда дополняется уникальным id. Под каждую сортировку с фильтром
+доступности есть составной индекс (Computer.Meta.indexes).
+"""
+from decimal import Decimal, InvalidOperation
+
+from . import specs
+from .models import Computer
+
+CATALOG_SORTS = {
+    'newest': ('-created_at', '-id'),
+    'oldest': ('created_at', 'id'),
+    'price': ('price', 'id'),
+    '-price': ('-price', '-id'),
+    'name': ('name', 'id'),
+}
+AVAILABILITY = ('true', 'false', 'all')
+PAGE_SIZE = 24
+MAX_PAGE_SIZE = 100
+MAX_BATCH_IDS = 100
+
+
+class CatalogQueryError(ValueError):
+    """Недопустимый параметр запроса; текст — для ответа 400."""
+
+
+def _price(params, name):
+    raw = params.get(name, '').strip()
+    if not raw:
+        return None
+    try:
+        value = Decimal(raw)
+    except InvalidOperation:
+        raise CatalogQueryError(f'Параметр "{name}" должен быть числом')
+    if not value.is_finite() or value < 0:
+        raise CatalogQueryError(f'Параметр "{name}" должен быть неотрицательным числом')
+    return value
+
+
+def _choices(params, name, allowed=None):
+    values = sorted({value.strip() for raw in params.getlist(name) for value in raw.split(',') if value.strip()})
+    unknown = [value for value in values if allowed is not None and value not in allowed]
+    if unknown:
+        raise CatalogQueryError(f'Неизвестное значение "{name}": {", ".join(unknown)}')
+    return values
+
+
+def _minimum(params, name, upper=None):
+    raw = params.get(name, '').strip()
+    if not raw:
+        return None
+    try:
+        value = int(raw)
+    except ValueError:
+        raise CatalogQueryError(f'Параметр "{name}" должен быть целым числом')
+    if value < 0 or (upper is not None and value > upper):
+        raise CatalogQueryError(f'Параметр "{name}" вне допустимого диапазона')
+    return value
+
+
+# Параметр → (поле, lookup) для фильтров по разобранным характеристикам
+SPEC_FILTERS = {
+    'min_ram': ('ram_gb', 'gte'),
+    'min_storage': ('storage_gb', 'gte'),
+    'storage_type': ('storage_type', 'in'),
+    'cpu_vendor': ('cpu_vendor', 'in'),
+    'cpu_family': ('cpu_family', 'in'),
+    'gpu_vendor': ('gpu_vendor', 'in'),
+    'min_gpu_tier': ('gpu_tier', 'gte'),
+    'min_psu': ('psu_watts', 'gte'),
+}
+
+
+def parse_filters(params):
+    """Фильтры из QueryDict в нормализованном виде (одинаковые запросы — одинаковый результат)."""
+    categories = _choices(params, 'category', dict(Computer.CATEGORY_CHOICES))
+
+    available = params.get('available', 'true').lower()
+    if available not in AVAILABILITY:
+        raise CatalogQueryError('Параметр "available" принимает значения true, false или all')
+
+    min_price, max_price = _price(params, 'min_price'), _price(params, 'max_price')
+    if min_price is not None and max_price is not None and min_price > max_price:
+        raise CatalogQueryError('"min_price" больше "max_price"')
+    return {
+        'category': categories, 'min_price': min_price, 'max_price': max_price, 'available': available,
+        'min_ram': _minimum(params, 'min_ram'),
+        'min_storage': _minimum(params, 'min_storage'),
+        'storage_type': _choices(params, 'storage_type', dict(specs.STORAGE_TYPE_CHOICES)),
+        'cpu_vendor': _choices(params, 'cpu_vendor', dict(specs.CPU_VENDOR_CHOICES)),
+        'cpu_family': _choices(params, 'cpu_family'),
+        'gpu_vendor': _choices(params, 'gpu_vendor', dict(specs.GPU_VENDOR_CHOICES)),
+        'min_gpu_tier': _minimum(params, 'min_gpu_tier', upper=max(dict(specs.GPU_TIER_CHOICES))),
+        'min_psu': _minimum(params, 'min_psu'),
+    }
+
+
+def apply_filters(queryset, filters):
+    if filters['available'] != 'all':
+        queryset = queryset.filter(is_available=filters['available'] == 'true')
+    if filters['category']:
+        queryset = queryset.filter(category__in=filters['category'])
+    if filters['min_price'] is not None:
+        queryset = queryset.filter(price__gte=filters['min_price'])
+    if filters['max_price'] is not None:
+        queryset = queryset.filter(price__lte=filters['max_price'])
+    for name, (field, lookup) in SPEC_FILTERS.items():
+        # Пустой список или None — фильтра нет; неразобранные (NULL, '') отсекаются сравнением
+        if filters[name] not in (None, []):
+            queryset = queryset.filter(**{f'{field}__{lookup}': filters[name]})
+    return queryset
+
+
+def parse_ids(raw):
+    try:
+        ids = list(dict.fromkeys(int(value) for value in raw.split(',') if value.strip()))
+    except ValueError:
+        raise CatalogQueryError('Параметр "ids" — список чисел через запятую')
+    if not ids:
+        raise CatalogQueryError('Параметр "ids" пуст')
+    if len(ids) > MAX_BATCH_IDS:
+        raise CatalogQueryError(f'Не больше {MAX_BATCH_IDS} id за запрос')
+    return ids
+
+
+def parse_page(params):
+    sort = params.get('sort', 'newest')
+    if sort not in CATALOG_SORTS:
+        raise CatalogQueryError(f'Параметр "sort" принимает значения: {", ".join(CATALOG_SORTS)}')
+    try:
+        limit = min(max(int(params.get('limit', PAGE_SIZE)), 1), MAX_PAGE_SIZE)
+    except ValueError:
+        raise CatalogQueryError('Параметр "limit" должен быть числом')
+    return sort, limit, params.get('cursor') or None
+
+
+def serialize_computer(computer):
+    """Карточка компьютера для списка; изображения должны быть предзагружены (prefetch_related)."""
+    return {
+        'id': computer.id,
+        'name': computer.name,
+        'category': computer.category,
+        'category_display': computer.get_category_display(),
+        'price': str(computer.price),
+        'price_display': computer.get_price_display(),
+        'is_available': computer.is_available,
+        'short_description': computer.short_description,
+        'processor': computer.processor,
+        'graphics_card': computer.graphics_card,
+        'ram': computer.ram,
+        'storage': computer.storage,
+        'operating_system': computer.operating_system,
+        'specs': {field: getattr(computer, field) for field in specs.PARSED_FIELDS},
+        'images': [
+            {
+                'image': image.image.url,
+                'thumbnail': image.thumbnail_url,
+                'srcset': image.srcset,
+                'webp_srcset': image.webp_srcset,
+                'is_main': image.is_main,
+                'order': image.order,
+            }
+            for image in computer.images.all()
+        ],
+    }
@@ -0,0 +1,70 @@
+# core/catalog_cache.py
+"""
+Кэш публичного каталога компьютеров (computer_catalog).
+
+Три уровня, все по версиям из http_cache.py (сигналы core/signals.py
+сбрасывают их при save/delete Computer и ComputerImage — из дашборда,
+админки или кода):
+  - карточка — HTML одной карточки, по версии компьютера
+    version_key('computer', pk);
+  - список карточек — по версии каталога version_key('computer_catalog');
+    при промахе из базы читаются только id доступных компьютеров, а заново
+    рендерятся лишь карточки, чья версия сменилась;
+  - страница целиком — для анонимов без cookie сессии (пользователь известен
+    без запроса к базе, в шапке нет CSRF-токена), тоже по версии каталога.
+Сбрасывать что-либо вручную не нужно: ключи с устаревшей версией просто
+перестают читаться и вытесняются по таймауту.
+"""
+import hashlib
+
+from django.core.cache import cache
+from django.template.loader import render_to_string
+from django.utils.safestring import mark_safe
+
+from .http_cache import PAYLOAD_TIMEOUT, get_versions, version_key
+from .models import Computer
+
+CATALOG_VERSION_KEY = version_key('computer_catalog')
+CARD_TEMPLATE = 'catalog/_card.html'
+
+
+def catalog_etag():
+    """ETag текущей версии каталога (без запросов к базе)."""
+    version, = get_versions([CATALOG_VERSION_KEY])
+    return '"%s"' % hashlib.md5(repr(('computer_catalog', version)).encode()).hexdigest()
+
+
+def _card_key(pk, version):
+    return f'catalog:card:{pk}:{version}'
+
+
+def render_cards():
+    """HTML всех карточек доступных компьютеров; пустая строка, если их нет."""
+    def build():
+        ids = list(Computer.objects.filter(is_available=True).values_list('pk', flat=True))
+        card_keys = dict(zip(ids, (
+            _card_key(pk, version)
+            for pk, version in zip(ids, get_versions([version_key('computer', pk) for pk in ids]))
+        )))
+        cards = cache.get_many(list(card_keys.values()))
+        missing = [pk for pk in ids if card_keys[pk] not in cards]
+        if missing:
+            rendered = {
+                card_keys[computer.pk]: render_to_string(CARD_TEMPLATE, {'computer': computer})
+                for computer in Computer.objects.filter(pk__in=missing).prefetch_related('images')
+            }
+            cache.set_many(rendered, PAYLOAD_TIMEOUT)
+            cards.update(rendered)
+        return ''.join(cards.get(card_keys[pk], '') for pk in ids)
+
+    version, = get_versions([CATALOG_VERSION_KEY])
+    # get_or_set: при одновременных промахах список строит один запрос (см. TwoTierCache)
+    return mark_safe(cache.get_or_set(f'catalog:cards:{version}', build, PAYLOAD_TIMEOUT))
+
+
+def cached_page(etag):
+    return cache.get(f'catalog:page:{etag}')
+
+
+def store_page(etag, content):
+    cache.set(f'catalog:page:{etag}', content, PAYLOAD_TIMEOUT)
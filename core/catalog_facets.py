@@ -0,0 +1,178 @@
+# core/catalog_facets.py
+"""
+Фасеты каталога для панели фильтров: число доступных компьютеров по
+категориям, число доступных и снятых с продажи, гистограмма цен.
+
+Всё считается одним агрегирующим запросом (условные COUNT по каждой
+категории и корзине цен) и хранится в кэше под FACETS_KEY. Дальше
+пересчёт не нужен: сигналы core/signals.py при save/delete Computer
+применяют к закэшированным счётчикам разницу между старыми и новыми
+значениями category, price и is_available (старые запоминаются при
+загрузке строки, см. snapshot). Если разницу применить нельзя (удалили
+самый дешёвый компьютер, поле не было загружено и т.п.), запись просто
+удаляется и при следующем чтении считается заново. Изменения мимо сигналов
+(bulk_create, update()) должны вызывать invalidate_facets().
+
+Одновременные правки двух компьютеров могут потерять одну из разниц
+(чтение-изменение-запись в кэше без блокировки), поэтому у записи есть
+срок жизни CATALOG_FACETS_TIMEOUT — расхождение живёт не дольше него.
+
+Настройки (все необязательные):
+    CATALOG_PRICE_BUCKETS   — нижние границы корзин гистограммы цен, ₽
+                              ((0, 50000, 100000, 150000, 200000, 300000);
+                              последняя корзина не ограничена сверху);
+    CATALOG_FACETS_TIMEOUT  — срок жизни посчитанных фасетов, секунды (3600).
+"""
+import copy
+from bisect import bisect_right
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS
+from django.db.models import Count, Max, Min, Q
+
+from .models import Computer
+
+FACETS_KEY = 'catalog:facets'
+FACET_FIELDS = ('category', 'price', 'is_available')
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+def price_edges():
+    return list(_setting('CATALOG_PRICE_BUCKETS', (0, 50000, 100000, 150000, 200000, 300000)))
+
+
+def _bucket(price, edges):
+    # Цены ниже первой границы попадают в первую корзину — так же, как в запросе
+    return max(bisect_right(edges, price) - 1, 0)
+
+
+def compute_facets():
+    """Фасеты одним запросом (без кэша)."""
+    edges = price_edges()
+    available = Q(is_available=True)
+    aggregates = {
+        f'category_{value}': Count('pk', filter=available & Q(category=value))
+        for value, _ in Computer.CATEGORY_CHOICES
+    }
+    for index, low in enumerate(edges):
+        bounds = Q(price__gte=low) if index else Q()
+        if index + 1 < len(edges):
+            bounds &= Q(price__lt=edges[index + 1])
+        aggregates[f'bucket_{index}'] = Count('pk', filter=available & bounds)
+    # Кэш общий для всех: отстающая реплика (db_router.use_replica) записала бы в него старые числа.
+    # Именно алиас, а не router.db_for_write: тот пометил бы запрос как пишущий
+    row = Computer.objects.using(DEFAULT_DB_ALIAS).aggregate(
+        available=Count('pk', filter=available),
+        unavailable=Count('pk', filter=~available),
+        min_price=Min('price', filter=available),
+        max_price=Max('price', filter=available),
+        **aggregates,
+    )
+    return {
+        'categories': {value: row[f'category_{value}'] for value, _ in Computer.CATEGORY_CHOICES},
+        'available': row['available'],
+        'unavailable': row['unavailable'],
+        'edges': edges,
+        'buckets': [row[f'bucket_{index}'] for index in range(len(edges))],
+        'min_price': row['min_price'],
+        'max_price': row['max_price'],
+    }
+
+
+def get_facets():
+    """Фасеты из кэша; при промахе — compute_facets()."""
+    # get_or_set: при одновременных промахах считает один запрос (см. TwoTierCache)
+    return cache.get_or_set(FACETS_KEY, compute_facets, _setting('CATALOG_FACETS_TIMEOUT', 3600))
+
+
+def invalidate_facets():
+    cache.delete(FACETS_KEY)
+
+
+def snapshot(instance):
+    """
+    Значения полей фасетов, с которыми строка загружена из базы; None — какое-то
+    поле отложено (only/defer) и без лишнего запроса неизвестно.
+    """
+    values = [instance.__dict__.get(field) for field in FACET_FIELDS]
+    if None in values:
+        return None
+    # Дашборд присваивает цене float — в кэше и при сравнении всегда Decimal
+    values[1] = Computer._meta.get_field('price').to_python(values[1])
+    return tuple(values)
+
+
+def _apply(facets, values, sign):
+    category, price, is_available = values
+    if not is_available:
+        facets['unavailable'] += sign
+        return True
+    if sign < 0 and price in (facets['min_price'], facets['max_price']):
+        # Новый минимум или максимум без запроса не узнать
+        return False
+    facets['available'] += sign
+    if category in facets['categories']:
+        facets['categories'][category] += sign
+    facets['buckets'][_bucket(price, facets['edges'])] += sign
+    if sign > 0:
+        facets['min_price'] = price if facets['min_price'] is None else min(facets['min_price'], price)
+        facets['max_price'] = price if facets['max_price'] is None else max(facets['max_price'], price)
+    return True
+
+
+def apply_change(old, new):
+    """
+    Переносит в закэшированные фасеты изменение одной строки: old и new —
+    snapshot() до и после (None — строки не было / она удалена).
+    """
+    cached = cache.get(FACETS_KEY)
+    if cached is None or old == new:
+        return
+    # Правим копию: в кэш попадает только полностью применённое изменение
+    facets = copy.deepcopy(cached)
+    if facets['edges'] != price_edges():
+        invalidate_facets()
+        return
+    consistent = (old is None or _apply(facets, old, -1)) and (new is None or _apply(facets, new, +1))
+    counters = [facets['available'], facets['unavailable'], *facets['buckets'], *facets['categories'].values()]
+    if not consistent or min(counters) < 0:
+        invalidate_facets()
+        return
+    cache.set(FACETS_KEY, facets, _setting('CATALOG_FACETS_TIMEOUT', 3600))
+
+
+def _rubles(value):
+    return f"{value:,.0f}".replace(',', ' ')
+
+
+def _bucket_label(low, high):
+    if high is None:
+        return f"от {_rubles(low)} ₽"
+    if not low:
+        return f"до {_rubles(high)} ₽"
+    return f"{_rubles(low)} – {_rubles(high)} ₽"
+
+
+def facets_payload(facets):
+    """Компактный JSON для панели фильтров (цены — целыми рублями)."""
+    edges = facets['edges']
+    return {
+        'total': facets['available'],
+        'unavailable': facets['unavailable'],
+        'categories': [
+            {'value': value, 'label': label, 'count': facets['categories'].get(value, 0)}
+            for value, label in Computer.CATEGORY_CHOICES
+        ],
+        'price': {
+            'min': None if facets['min_price'] is None else int(facets['min_price']),
+            'max': None if facets['max_price'] is None else int(facets['max_price']),
+            'buckets': [
+                {'min': low, 'max': high, 'label': _bucket_label(low, high), 'count': count}
+                for low, high, count in zip(edges, edges[1:] + [None], facets['buckets'])
+            ],
+        },
+    }
@@ -0,0 +1,102 @@
+# core/db_backends/sqlite3/base.py
+"""
+SQLite для продакшена: стандартный бэкенд Django плюс повтор при блокировках
+и проверка постоянных соединений.
+
+Настройка в DATABASES:
+
+    'default': {
+        'ENGINE': 'core.db_backends.sqlite3',
+        'NAME': BASE_DIR / 'db.sqlite3',
+        'CONN_MAX_AGE': None,           # постоянные соединения
+        'CONN_HEALTH_CHECKS': True,     # проверять соединение перед запросом (is_usable)
+        'OPTIONS': {
+            'init_command': 'PRAGMA journal_mode=WAL; PRAGMA synchronous=NORMAL; ...',
+            'transaction_mode': 'IMMEDIATE',
+            'retry': {'attempts': 5, 'base_delay': 0.05, 'max_delay': 1.0},
+        },
+    }
+
+init_command и transaction_mode — штатные опции Django. IMMEDIATE берёт
+блокировку записи сразу в BEGIN: без него транзакция, начавшая с чтения,
+при первой записи получает SQLITE_BUSY немедленно, и busy_timeout не
+помогает. Эту ошибку (и любую другую «database is locked», пережившую
+busy_timeout) курсор повторяет с экспоненциальной задержкой и джиттером —
+неудавшаяся команда SQLite не меняет данных, так что повтор безопасен.
+executemany вне транзакции не повторяется: строки, вставленные до
+ошибки, уже зафиксированы.
+"""
+import random
+import sqlite3
+import time
+
+from django.db.backends.sqlite3.base import DatabaseWrapper as SQLiteDatabaseWrapper
+from django.db.backends.sqlite3.base import SQLiteCursorWrapper
+
+DEFAULT_RETRY = {'attempts': 5, 'base_delay': 0.05, 'max_delay': 1.0}
+
+_LOCK_ERRORS = (sqlite3.SQLITE_BUSY, sqlite3.SQLITE_LOCKED)
+
+
+def is_lock_error(error):
+    code = getattr(error, 'sqlite_errorcode', None)
+    if code is not None:
+        # Расширенные коды (SQLITE_BUSY_SNAPSHOT и т.п.) несут основной код в младшем байте
+        return code & 0xFF in _LOCK_ERRORS
+    return 'locked' in str(error) or 'busy' in str(error)
+
+
+class RetryingCursorWrapper(SQLiteCursorWrapper):
+    retry = DEFAULT_RETRY
+    # Вызывается перед каждым повтором (DatabaseWrapper считает их в lock_retries)
+    on_retry = None
+
+    def _with_retry(self, call, *args):
+        attempts = self.retry['attempts']
+        for attempt in range(attempts):
+            try:
+                return call(*args)
+            except sqlite3.OperationalError as e:
+                if attempt == attempts - 1 or not is_lock_error(e):
+                    raise
+                delay = min(self.retry['base_delay'] * 2 ** attempt, self.retry['max_delay'])
+                if self.on_retry is not None:
+                    self.on_retry()
+                time.sleep(delay * random.uniform(0.5, 1.0))
+
+    def execute(self, query, params=None):
+        return self._with_retry(super().execute, query, params)
+
+    def executemany(self, query, param_list):
+        if not self.connection.in_transaction:
+            return super().executemany(query, param_list)
+        return self._with_retry(super().executemany, query, param_list)
+
+
+class DatabaseWrapper(SQLiteDatabaseWrapper):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.lock_retries = 0
+
+    def get_connection_params(self):
+        kwargs = super().get_connection_params()
+        self.retry = {**DEFAULT_RETRY, **kwargs.pop('retry', {})}
+        return kwargs
+
+    def create_cursor(self, name=None):
+        cursor = self.connection.cursor(factory=RetryingCursorWrapper)
+        cursor.retry = self.retry
+        cursor.on_retry = self._count_retry
+        return cursor
+
+    def _count_retry(self):
+        self.lock_retries += 1
+
+    def is_usable(self):
+        # Стандартный бэкенд считает соединение SQLite всегда живым; с CONN_HEALTH_CHECKS
+        # закрытое или сломанное соединение заменится новым до первого запроса
+        try:
+            self.connection.execute('SELECT 1')
+        except sqlite3.Error:
+            return False
+        return True
@@ -0,0 +1,166 @@
+# core/db_router.py
+"""
+Чтение тяжёлых списков с реплики.
+
+Реплика — отдельное соединение REPLICA_DATABASE (по умолчанию 'replica'),
+для SQLite — копия основной базы, которую периодически обновляет команда
+refresh_replica. Время последней синхронизации лежит в кэше (SYNCED_AT_KEY).
+
+На реплику идут только чтения внутри вьюх с декоратором @use_replica и
+только если одновременно:
+  - реплика синхронизирована не дольше REPLICA_MAX_LAG секунд назад
+    (иначе или если синхронизации ещё не было — основная база);
+  - после последней записи этого пользователя реплика уже обновлялась:
+    ReplicaStickinessMiddleware после каждого POST/PUT/PATCH/DELETE ставит
+    cookie со временем записи, и пока реплика старше — читаем основную базу
+    («читаю свои записи»);
+  - в этом же запросе ещё ничего не записывалось.
+Кэш и сессии никогда не читаются с реплики (REPLICA_EXCLUDED_APPS).
+
+Настройки (все необязательные):
+    REPLICA_DATABASE        — алиас реплики в DATABASES ('replica');
+    REPLICA_MAX_LAG         — допустимое отставание, секунды (30);
+    REPLICA_EXCLUDED_APPS   — приложения, всегда читаемые с основной базы.
+"""
+import functools
+import os
+import time
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, connections
+
+SYNCED_AT_KEY = 'replica:synced_at'
+WRITE_COOKIE = 'last_write'
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS', 'TRACE')
+
+DEFAULT_EXCLUDED_APPS = ('django_cache', 'sessions', 'contenttypes', 'admin')
+
+# Состояние текущего запроса: {'not_before': время последней записи пользователя, 'wrote': bool}
+_state = ContextVar('replica_state', default=None)
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+def replica_alias():
+    alias = _setting('REPLICA_DATABASE', 'replica')
+    return alias if alias in settings.DATABASES else None
+
+
+def replica_lag():
+    """Секунды с последней синхронизации реплики; None — реплика ещё не синхронизировалась."""
+    synced_at = cache.get(SYNCED_AT_KEY)
+    return None if synced_at is None else max(time.time() - synced_at, 0.0)
+
+
+def replica_usable(not_before=0.0):
+    """Реплика свежая и уже содержит записи, сделанные до not_before."""
+    synced_at = cache.get(SYNCED_AT_KEY)
+    if synced_at is None or synced_at < not_before:
+        return False
+    return time.time() - synced_at <= _setting('REPLICA_MAX_LAG', 30)
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        state = _state.get()
+        if state is None or state['wrote'] or model._meta.app_label in self._excluded():
+            return None
+        if state['usable'] is None:
+            # Решение принимается один раз на запрос: все списки вьюхи читаются из одного источника
+            state['usable'] = replica_usable(state['not_before'])
+        return state['alias'] if state['usable'] else None
+
+    def db_for_write(self, model, **hints):
+        state = _state.get()
+        if state is not None and model._meta.app_label not in self._excluded():
+            state['wrote'] = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Реплика — копия основной базы: объекты из обеих связывать можно
+        return True
+
+    def allow_migrate(self, db, app_label, **hints):
+        return db != replica_alias()
+
+    @staticmethod
+    def _excluded():
+        return _setting('REPLICA_EXCLUDED_APPS', DEFAULT_EXCLUDED_APPS)
+
+
+def _last_write(request):
+    try:
+        return float(request.COOKIES.get(WRITE_COOKIE, 0))
+    except ValueError:
+        return 0.0
+
+
+def use_replica(view):
+    """Декоратор вьюхи, только читающей данные: списки берутся с реплики, если она это позволяет."""
+    @functools.wraps(view)
+    def wrapper(request, *args, **kwargs):
+        alias = replica_alias()
+        if alias is None:
+            return view(request, *args, **kwargs)
+        # Пользователь, загруженный внутри вьюхи, тоже читается с реплики: только что
+        # зарегистрированный туда ещё не попал, но его регистрация (POST) уже поставила cookie
+        token = _state.set({'alias': alias, 'not_before': _last_write(request), 'wrote': False, 'usable': None})
+        try:
+            return view(request, *args, **kwargs)
+        finally:
+            _state.reset(token)
+    return wrapper
+
+
+class ReplicaStickinessMiddleware:
+    """После изменяющего запроса помечает клиента: его чтения идут на основную базу, пока реплика не догонит."""
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        return self._mark(request, self.get_response(request))
+
+    async def __acall__(self, request):
+        return self._mark(request, await self.get_response(request))
+
+    @staticmethod
+    def _mark(request, response):
+        if request.method not in SAFE_METHODS and replica_alias() is not None:
+            response.set_cookie(
+                WRITE_COOKIE, f'{time.time():.3f}',
+                max_age=int(_setting('REPLICA_MAX_LAG', 30)) + 1, httponly=True, samesite='Lax',
+            )
+        return response
+
+
+def refresh_replica():
+    """
+    Копирует основную базу SQLite в реплику через backup API и отмечает время синхронизации.
+    Время берётся до начала копирования: всё, что записано раньше, в копию точно попало.
+    Возвращает это время или None, если реплики нет.
+    """
+    alias = replica_alias()
+    if alias is None:
+        return None
+    primary, replica = connections[DEFAULT_DB_ALIAS], connections[alias]
+    started = time.time()
+    if os.path.abspath(str(primary.settings_dict['NAME'])) != os.path.abspath(str(replica.settings_dict['NAME'])):
+        if primary.vendor != 'sqlite':
+            raise NotImplementedError("Копирование реплики реализовано только для SQLite")
+        primary.ensure_connection()
+        replica.ensure_connection()
+        primary.connection.backup(replica.connection)
+    cache.set(SYNCED_AT_KEY, started, None)
+    return started
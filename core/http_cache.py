@@ -0,0 +1,116 @@
+# core/http_cache.py
+"""
+Условные GET (ETag / Last-Modified) и кэш сериализованных JSON-ответов.
+
+Версия объекта — метка в кэше, которую сигналы меняют при любом изменении
+(save/delete, изменения m2m). ETag считается только из версий, поэтому ответ
+304 и повторная отдача готовых байтов не обращаются к ORM вообще.
+"""
+import hashlib
+import json
+import time
+
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.http import http_date
+
+PAYLOAD_TIMEOUT = 60 * 60 * 24
+
+
+class _BuildFailed(Exception):
+    """build() вернул готовый ответ с ошибкой — его не кэшируем."""
+
+    def __init__(self, response):
+        self.response = response
+
+
+def version_key(namespace, pk=None):
+    return f'ver:{namespace}' if pk is None else f'ver:{namespace}:{pk}'
+
+
+def bump_version(namespace, pk=None):
+    """Помечает объект (или целый набор, если pk=None) изменённым."""
+    bump_versions(namespace, [pk])
+
+
+def bump_versions(namespace, pks):
+    """
+    Сбрасывает версии: следующее чтение создаст новую метку, а значит и новый ETag.
+    Удаление — один запрос к кэшу на любое число ключей. Внутри транзакции сброс
+    повторяется после фиксации, чтобы читатель, успевший закэшировать данные до
+    коммита, не оставил их под новой версией.
+    """
+    keys = [version_key(namespace, pk) for pk in pks]
+    if not keys:
+        return
+    cache.delete_many(keys)
+    if connection.in_atomic_block:
+        transaction.on_commit(lambda: cache.delete_many(keys))
+
+
+def get_versions(keys):
+    """
+    Текущие версии по ключам; отсутствующие создаются одним set_many.
+    Метка времени, а не счётчик: после сброса или очистки кэша версии не повторятся.
+    """
+    found = cache.get_many(keys)
+    missing = {key: time.time_ns() for key in keys if key not in found}
+    if missing:
+        cache.set_many(missing, None)
+        found.update(missing)
+    return [found[key] for key in keys]
+
+
+def cached_json_response(request, name, version_keys, build, authorize=None):
+    """
+    Отдаёт JSON с ETag/Last-Modified, храня сериализованные байты по версии объекта.
+
+    build() вызывается только при промахе кэша и возвращает либо готовый
+    HttpResponse (ошибка — не кэшируется), либо кортеж
+    (data, last_modified: datetime, context: dict). context сохраняется вместе
+    с байтами и передаётся в authorize(context), который возвращает HttpResponse
+    с отказом или None — так проверка доступа работает и без запроса к базе.
+    """
+    versions = get_versions(version_keys)
+    digest = hashlib.md5(repr((name, versions)).encode()).hexdigest()
+    etag = f'"{digest}"'
+    payload_key = f'json:{name}:{digest}'
+
+    def build_entry():
+        result = build()
+        if isinstance(result, HttpResponse):
+            raise _BuildFailed(result)
+        data, last_modified, context = result
+        return {
+            'body': json.dumps(data, ensure_ascii=False).encode(),
+            'last_modified': int(last_modified.timestamp()) if last_modified else None,
+            'context': context or {},
+        }
+
+    # get_or_set: при одновременных промахах payload строит один запрос (см. TwoTierCache)
+    try:
+        entry = cache.get_or_set(payload_key, build_entry, PAYLOAD_TIMEOUT)
+    except _BuildFailed as e:
+        return e.response
+
+    if authorize is not None:
+        denied = authorize(entry['context'])
+        if denied is not None:
+            return denied
+
+    not_modified = get_conditional_response(
+        request, etag=etag, last_modified=entry['last_modified']
+    )
+    if not_modified is not None:
+        response = not_modified
+    else:
+        response = HttpResponse(entry['body'], content_type='application/json')
+    response['ETag'] = etag
+    if entry['last_modified'] is not None:
+        response['Last-Modified'] = http_date(entry['last_modified'])
+    # Ответы зависят от пользователя: браузер кэширует, но каждый раз сверяет ETag
+    response['Cache-Control'] = 'private, no-cache'
+    patch_vary_headers(response, ['Cookie'])
+    return response
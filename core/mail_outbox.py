@@ -0,0 +1,192 @@
+# core/mail_outbox.py
+"""
+Очередь исходящей почты: постановка из представлений и отправка воркером.
+
+Настройки (все необязательные):
+    MAIL_OUTBOX_BATCH_SIZE         — писем за один проход воркера;
+    MAIL_OUTBOX_MAX_ATTEMPTS       — после стольких неудач письмо помечается failed;
+    MAIL_OUTBOX_RETRY_BASE         — базовая задержка повтора, секунды (растёт вдвое);
+    MAIL_OUTBOX_BREAKER_THRESHOLD  — подряд неудачных подключений до размыкания;
+    MAIL_OUTBOX_BREAKER_COOLDOWN   — сколько секунд не трогать SMTP после размыкания.
+Таймаут SMTP задаёт стандартная настройка EMAIL_TIMEOUT.
+"""
+import logging
+import smtplib
+import socket
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMultiAlternatives, get_connection
+from django.utils import timezone
+
+from .models import OutgoingEmail
+
+logger = logging.getLogger(__name__)
+
+# Письмо, занятое воркером, освобождается через столько секунд (если воркер упал)
+SENDING_LEASE = 120
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+def enqueue_email(to, subject, body, html_body=''):
+    """Ставит письмо в очередь; сама отправка не блокирует запрос."""
+    return OutgoingEmail.objects.create(to=to, subject=subject, body=body, html_body=html_body)
+
+
+class CircuitBreaker:
+    """
+    Размыкатель: после threshold подряд неудачных подключений к SMTP воркер
+    перестаёт пытаться на cooldown секунд, не тратя попытки писем впустую.
+    """
+
+    def __init__(self, threshold, cooldown, clock=time.monotonic):
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.clock = clock
+        self.failures = 0
+        self.opened_at = None
+
+    @property
+    def is_open(self):
+        if self.opened_at is None:
+            return False
+        if self.clock() - self.opened_at >= self.cooldown:
+            # Полуоткрытое состояние: пропускаем одну попытку
+            self.opened_at = None
+            self.failures = self.threshold - 1
+            return False
+        return True
+
+    def record_success(self):
+        self.failures = 0
+        self.opened_at = None
+
+    def record_failure(self):
+        self.failures += 1
+        if self.failures >= self.threshold:
+            self.opened_at = self.clock()
+
+
+class OutboxWorker:
+    """Отправляет письма из очереди пачками через одно удерживаемое соединение."""
+
+    def __init__(self, connection_factory=None):
+        self.batch_size = _setting('MAIL_OUTBOX_BATCH_SIZE', 50)
+        self.max_attempts = _setting('MAIL_OUTBOX_MAX_ATTEMPTS', 5)
+        self.retry_base = _setting('MAIL_OUTBOX_RETRY_BASE', 30)
+        self.breaker = CircuitBreaker(
+            _setting('MAIL_OUTBOX_BREAKER_THRESHOLD', 3),
+            _setting('MAIL_OUTBOX_BREAKER_COOLDOWN', 60),
+        )
+        self.connection_factory = connection_factory or (
+            lambda: get_connection(timeout=_setting('EMAIL_TIMEOUT', None) or 10)
+        )
+        self.connection = None
+
+    def _open(self):
+        if self.connection is not None and getattr(self.connection, 'connection', None) is not None:
+            # Сервер мог закрыть простаивавшее соединение — проверяем его NOOP
+            try:
+                if self.connection.connection.noop()[0] == 250:
+                    return
+            except (smtplib.SMTPException, socket.error):
+                pass
+            self.close()
+        if self.connection is None:
+            self.connection = self.connection_factory()
+        self.connection.open()
+
+    def close(self):
+        if self.connection is not None:
+            try:
+                self.connection.close()
+            except Exception:
+                pass
+            self.connection = None
+
+    def claim_batch(self):
+        """Забирает пачку писем, готовых к отправке, помечая их как отправляемые."""
+        now = timezone.now()
+        due = OutgoingEmail.objects.filter(
+            status__in=('pending', 'sending'), next_attempt_at__lte=now
+        ).order_by('next_attempt_at', 'id').values_list('id', flat=True)[:self.batch_size]
+        ids = list(due)
+        if not ids:
+            return []
+        lease_until = now + timedelta(seconds=SENDING_LEASE)
+        # Условный UPDATE: параллельный воркер не заберёт те же письма
+        OutgoingEmail.objects.filter(
+            id__in=ids, status__in=('pending', 'sending'), next_attempt_at__lte=now
+        ).update(status='sending', next_attempt_at=lease_until)
+        return list(OutgoingEmail.objects.filter(id__in=ids, status='sending', next_attempt_at=lease_until))
+
+    def _retry_later(self, message, error):
+        message.attempts += 1
+        message.last_error = str(error)[:2000]
+        if message.attempts >= self.max_attempts:
+            message.status = 'failed'
+        else:
+            message.status = 'pending'
+            delay = self.retry_base * 2 ** (message.attempts - 1)
+            message.next_attempt_at = timezone.now() + timedelta(seconds=delay)
+        message.save(update_fields=['attempts', 'last_error', 'status', 'next_attempt_at'])
+
+    def _release(self, messages):
+        """Возвращает письма в очередь без траты попытки (SMTP недоступен)."""
+        delay = self.breaker.cooldown if self.breaker.opened_at is not None else 0
+        OutgoingEmail.objects.filter(id__in=[m.id for m in messages]).update(
+            status='pending', next_attempt_at=timezone.now() + timedelta(seconds=delay)
+        )
+
+    def run_once(self):
+        """Один проход: возвращает (отправлено, неудачно)."""
+        if self.breaker.is_open:
+            return 0, 0
+        batch = self.claim_batch()
+        if not batch:
+            return 0, 0
+
+        try:
+            self._open()
+        except (smtplib.SMTPException, socket.error) as e:
+            logger.warning("SMTP недоступен: %s", e)
+            self.close()
+            self.breaker.record_failure()
+            self._release(batch)
+            return 0, len(batch)
+
+        sent = failed = 0
+        for index, message in enumerate(batch):
+            email = EmailMultiAlternatives(
+                message.subject, message.body, settings.EMAIL_HOST_USER, [message.to],
+                connection=self.connection,
+            )
+            if message.html_body:
+                email.attach_alternative(message.html_body, 'text/html')
+            try:
+                email.send(fail_silently=False)
+            except smtplib.SMTPRecipientsRefused as e:
+                # Проблема адреса, а не сервера — соединение остаётся рабочим
+                self._retry_later(message, e)
+                failed += 1
+                continue
+            except (smtplib.SMTPException, socket.error) as e:
+                logger.warning("Ошибка отправки письма #%s: %s", message.id, e)
+                self.close()
+                self.breaker.record_failure()
+                self._retry_later(message, e)
+                # Остаток пачки вернётся в очередь и уйдёт со следующим подключением
+                self._release(batch[index + 1:])
+                return sent, failed + 1
+            # Код подтверждения не храним дольше необходимого
+            OutgoingEmail.objects.filter(id=message.id).update(
+                status='sent', sent_at=timezone.now(), body='', html_body='',
+                attempts=message.attempts + 1, last_error='',
+            )
+            sent += 1
+        self.breaker.record_success()
+        return sent, failed
@@ -0,0 +1,110 @@
+import json
+from collections import defaultdict
+from datetime import datetime, timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from core.access_log import log_files
+
+
+def percentile(ordered, percent):
+    """Перцентиль по ближайшему рангу из отсортированного списка."""
+    if not ordered:
+        return None
+    rank = max(int(-(-percent * len(ordered) // 100)), 1)
+    return ordered[rank - 1]
+
+
+class Command(BaseCommand):
+    help = (
+        "Сводка журнала запросов (core/access_log.py): число запросов, p50/p95/p99 задержки, "
+        "SQL-запросы и размер ответа по каждой вьюхе."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'paths', nargs='*',
+            help='Файлы журнала (по умолчанию — ACCESS_LOG_FILE и его ротированные копии).',
+        )
+        parser.add_argument('--since', type=float, help='Только записи за последние N часов.')
+        parser.add_argument('--view', help='Только эта вьюха (имя маршрута).')
+        parser.add_argument(
+            '--sort', choices=['count', 'p50', 'p95', 'p99', 'total'], default='total',
+            help='Сортировка: total — суммарное время (по умолчанию).',
+        )
+        parser.add_argument('--json', action='store_true', help='Вывести сводку в JSON.')
+
+    def handle(self, *args, **options):
+        paths = options['paths'] or log_files()
+        if not paths:
+            raise CommandError("Файлы журнала не найдены.")
+        since = timezone.now() - timedelta(hours=options['since']) if options['since'] else None
+
+        latencies = defaultdict(list)
+        totals = defaultdict(lambda: {'queries': 0, 'bytes': 0, 'errors': 0})
+        dropped = skipped = 0
+        for path in paths:
+            try:
+                handle = open(path, encoding='utf-8')
+            except OSError as e:
+                raise CommandError(f"Не удалось открыть {path}: {e}")
+            with handle:
+                for line in handle:
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        skipped += 1
+                        continue
+                    if since and datetime.fromisoformat(record['time']) < since:
+                        continue
+                    if 'dropped' in record:
+                        dropped += record['dropped']
+                        continue
+                    view = record.get('view') or '(не найдено)'
+                    if options['view'] and view != options['view']:
+                        continue
+                    latencies[view].append(record['ms'])
+                    total = totals[view]
+                    total['queries'] += record.get('queries') or 0
+                    total['bytes'] += record.get('bytes') or 0
+                    total['errors'] += record['status'] >= 500
+
+        rows = []
+        for view, samples in latencies.items():
+            samples.sort()
+            count = len(samples)
+            rows.append({
+                'view': view,
+                'count': count,
+                'p50': percentile(samples, 50),
+                'p95': percentile(samples, 95),
+                'p99': percentile(samples, 99),
+                'max': samples[-1],
+                'total': round(sum(samples), 2),
+                'avg_queries': round(totals[view]['queries'] / count, 1),
+                'avg_bytes': round(totals[view]['bytes'] / count),
+                'errors': totals[view]['errors'],
+            })
+        rows.sort(key=lambda row: row[options['sort']], reverse=True)
+
+        if options['json']:
+            self.stdout.write(json.dumps(
+                {'views': rows, 'dropped': dropped, 'unreadable_lines': skipped}, ensure_ascii=False, indent=2,
+            ))
+            return
+
+        header = f"{'Вьюха':<40} {'Кол-во':>8} {'p50 мс':>9} {'p95 мс':>9} {'p99 мс':>9} {'макс мс':>9} " \
+                 f"{'SQL':>6} {'байт':>9} {'5xx':>5}"
+        self.stdout.write(header)
+        self.stdout.write('-' * len(header))
+        for row in rows:
+            self.stdout.write(
+                f"{row['view'][:40]:<40} {row['count']:>8} {row['p50']:>9.1f} {row['p95']:>9.1f} "
+                f"{row['p99']:>9.1f} {row['max']:>9.1f} {row['avg_queries']:>6} {row['avg_bytes']:>9} "
+                f"{row['errors']:>5}"
+            )
+        if dropped:
+            self.stderr.write(f"Записей отброшено при переполнении очереди: {dropped}")
+        if skipped:
+            self.stderr.write(f"Нечитаемых строк: {skipped}")
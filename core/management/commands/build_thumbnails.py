@@ -0,0 +1,34 @@
+import os
+import time
+
+from django.core.management.base import BaseCommand
+
+from core.thumbnails import backfill
+
+
+class Command(BaseCommand):
+    help = (
+        "Строит уменьшенные копии JPEG и WebP (core/thumbnails.py) для изображений "
+        "компьютеров, у которых их ещё нет."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers', type=int, default=os.cpu_count() or 1,
+            help='Сколько процессов обрабатывают изображения (по умолчанию — число ядер).',
+        )
+        parser.add_argument('--force', action='store_true', help='Перестроить копии и для обработанных изображений.')
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+
+        def progress(done, total):
+            if done % 100 == 0 or done == total:
+                self.stdout.write(f"  {done}/{total}")
+
+        built, failed = backfill(workers=max(options['workers'], 1), force=options['force'], progress=progress)
+        for error in failed:
+            self.stderr.write(f"Ошибка: {error}")
+        self.stdout.write(self.style.SUCCESS(
+            f"Готово за {time.monotonic() - started:.1f} с: обработано {built}, ошибок {len(failed)}"
+        ))
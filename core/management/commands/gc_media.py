@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+
+from core.storage import collect_garbage
+
+
+class Command(BaseCommand):
+    help = (
+        "Удаляет медиафайлы, на которые не ссылаются ComputerImage.image и User.avatar, "
+        "вместе с их уменьшенными копиями (core/storage.py)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--grace', type=int,
+            help='Не трогать файлы моложе N секунд (по умолчанию MEDIA_GC_GRACE, сутки).',
+        )
+        parser.add_argument('--dry-run', action='store_true', help='Только показать, сколько будет удалено.')
+
+    def handle(self, *args, **options):
+        removed, freed = collect_garbage(dry_run=options['dry_run'], grace=options['grace'])
+        verb = 'Будет удалено' if options['dry_run'] else 'Удалено'
+        self.stdout.write(self.style.SUCCESS(f"{verb} файлов: {removed}, {freed / (1024 * 1024):.1f} МБ"))
@@ -0,0 +1,76 @@
+import csv
+import itertools
+import json
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+
+class Command(BaseCommand):
+    help = (
+        "Импортирует пользователей из CSV (с заголовком) или JSONL. "
+        "Уже существующие email пропускаются, поэтому прерванный импорт можно просто запустить снова."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Путь к файлу .csv или .jsonl')
+        parser.add_argument(
+            '--format',
+            choices=['csv', 'jsonl'],
+            help='Формат файла (по умолчанию — по расширению).',
+        )
+        parser.add_argument('--batch-size', type=int, default=1000, help='Пользователей в одном bulk_create.')
+        parser.add_argument(
+            '--skip',
+            type=int,
+            default=0,
+            help='Пропустить первые N строк данных (продолжение прерванного импорта без их перечитывания из базы).',
+        )
+
+    def handle(self, *args, **options):
+        path = options['path']
+        file_format = options['format'] or ('jsonl' if path.endswith(('.jsonl', '.ndjson')) else 'csv')
+        try:
+            handle = open(path, encoding='utf-8-sig', newline='')
+        except OSError as e:
+            raise CommandError(f"Не удалось открыть файл: {e}")
+
+        started = time.monotonic()
+
+        def report(stats):
+            elapsed = time.monotonic() - started
+            rate = stats['processed'] / elapsed if elapsed else 0
+            self.stdout.write(
+                f"Строк: {options['skip'] + stats['processed']}, создано: {stats['created']}, "
+                f"пропущено: {stats['skipped']}, ошибок: {len(stats['errors'])} — {rate:.0f} строк/с"
+            )
+
+        with handle:
+            if file_format == 'csv':
+                rows = csv.DictReader(handle)
+                if not rows.fieldnames or 'email' not in rows.fieldnames:
+                    raise CommandError("В CSV нет колонки email.")
+            else:
+                rows = (self._parse_json(line) for line in handle if line.strip())
+            rows = itertools.islice(rows, options['skip'], None)
+
+            stats = get_user_model().objects.bulk_import(
+                rows, batch_size=options['batch_size'], start=options['skip'], progress=report,
+            )
+
+        for line, message in stats['errors']:
+            self.stderr.write(f"Строка {line}: {message}")
+        elapsed = time.monotonic() - started
+        self.stdout.write(self.style.SUCCESS(
+            f"Готово за {elapsed:.1f} с: создано {stats['created']}, пропущено {stats['skipped']}, "
+            f"ошибок {len(stats['errors'])} ({stats['processed'] / elapsed if elapsed else 0:.0f} строк/с)."
+        ))
+
+    @staticmethod
+    def _parse_json(line):
+        try:
+            row = json.loads(line)
+        except json.JSONDecodeError:
+            return {}
+        return row if isinstance(row, dict) else {}
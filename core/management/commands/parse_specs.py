@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+
+from core.specs import backfill
+
+
+class Command(BaseCommand):
+    help = (
+        "Разбирает текстовые характеристики компьютеров (core/specs.py) в столбцы "
+        "для фильтров каталога: для строк, сохранённых до их появления или мимо save()."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500, help='Размер пачки чтения и bulk_update.')
+
+    def handle(self, *args, **options):
+        checked, updated = backfill(
+            batch_size=max(options['batch_size'], 1),
+            progress=lambda done: self.stdout.write(f"  проверено {done}"),
+        )
+        self.stdout.write(self.style.SUCCESS(f"Готово: проверено {checked}, обновлено {updated}"))
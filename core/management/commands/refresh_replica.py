@@ -0,0 +1,30 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core.db_router import refresh_replica
+
+
+class Command(BaseCommand):
+    help = (
+        "Копирует основную базу в реплику (core/db_router.py) и отмечает время синхронизации. "
+        "С --interval работает непрерывно."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--interval', type=float,
+            help='Повторять каждые N секунд (должно быть заметно меньше REPLICA_MAX_LAG).',
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            started = time.monotonic()
+            if refresh_replica() is None:
+                raise CommandError("Реплика не настроена (REPLICA_DATABASE нет в DATABASES).")
+            self.stdout.write(self.style.SUCCESS(
+                f"Реплика обновлена за {time.monotonic() - started:.2f} с"
+            ))
+            if not options['interval']:
+                return
+            time.sleep(max(options['interval'] - (time.monotonic() - started), 0))
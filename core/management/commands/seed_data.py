@@ -0,0 +1,34 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from core.seed import seed_database
+
+
+class Command(BaseCommand):
+    help = (
+        "Заполняет базу синтетическими пользователями, заявками (с симптомами и тегами), "
+        "компьютерами и изображениями для нагрузочных проверок."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=200, help='Сколько пользователей создать.')
+        parser.add_argument('--requests', type=int, default=2000, help='Сколько заявок создать.')
+        parser.add_argument('--computers', type=int, default=60, help='Сколько компьютеров создать.')
+        parser.add_argument('--images', type=int, default=3, help='Изображений на компьютер.')
+        parser.add_argument('--seed', type=int, help='Зерно генератора — для воспроизводимого набора данных.')
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        summary = seed_database(
+            users=options['users'],
+            requests=options['requests'],
+            computers=options['computers'],
+            images_per_computer=options['images'],
+            seed=options['seed'],
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f"Готово за {time.monotonic() - started:.1f} с: пользователей {summary['users']}, "
+            f"заявок {summary['requests']}, компьютеров {summary['computers']}, "
+            f"изображений {summary['images']}."
+        ))
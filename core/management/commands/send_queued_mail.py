@@ -0,0 +1,36 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from core.mail_outbox import OutboxWorker
+
+
+class Command(BaseCommand):
+    help = "Отправляет письма из очереди OutgoingEmail через удерживаемое SMTP-соединение."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help='Разобрать очередь один раз и выйти.')
+        parser.add_argument(
+            '--interval',
+            type=float,
+            default=1.0,
+            help='Пауза между проверками пустой очереди, секунды.',
+        )
+
+    def handle(self, *args, **options):
+        worker = OutboxWorker()
+        try:
+            while True:
+                sent, failed = worker.run_once()
+                if sent or failed:
+                    self.stdout.write(f"Отправлено: {sent}, с ошибкой: {failed}")
+                if options['once']:
+                    if not (sent or failed):
+                        break
+                    continue
+                if not (sent or failed):
+                    time.sleep(options['interval'])
+        except KeyboardInterrupt:
+            pass
+        finally:
+            worker.close()
@@ -0,0 +1,188 @@
+# core/media.py
+"""
+Раздача MEDIA_ROOT (фото компьютеров, аватары).
+
+Вьюха serve_media сама отвечает на условные запросы (ETag, Last-Modified →
+304) и ставит заголовки кэширования, а передачу байтов по возможности
+отдаёт фронтовому серверу:
+
+    MEDIA_SERVE_MODE = 'accel'     — nginx, заголовок X-Accel-Redirect;
+    MEDIA_SERVE_MODE = 'sendfile'  — Apache mod_xsendfile / lighttpd, X-Sendfile;
+    MEDIA_SERVE_MODE = None        — сам воркер (по умолчанию).
+
+В режиме воркера файл отдаётся FileResponse: gunicorn передаёт его через
+sendfile() без копирования в Python; запросы Range (одним диапазоном)
+получают 206 и тоже идут через sendfile со смещением. Несколько
+диапазонов в одном запросе не поддерживаются — отдаётся файл целиком
+(это допускает RFC 9110).
+
+Файлы, хранящиеся по содержимому (blobs/aa/bb/<sha256>.<ext>, core/storage.py),
+под своим именем никогда не меняются — им ставится Cache-Control: immutable
+на год. Остальным, в том числе уменьшенным копиям blobs (<sha256>.w320.webp —
+build_thumbnails --force перекодирует их под тем же именем), — MEDIA_MAX_AGE
+с перепроверкой по ETag.
+
+Путь в X-Accel-Redirect и X-Sendfile передаётся в процентной кодировке:
+старые загрузки бывают с кириллицей и пробелами в имени, а заголовок с
+не-ASCII Django закодировал бы по RFC 2047, чего nginx и Apache не понимают.
+
+Пример для nginx (MEDIA_SERVE_MODE = 'accel'):
+
+    location /protected-media/ {
+        internal;
+        alias /srv/compdog/media/;
+    }
+
+Настройки (все необязательные):
+    MEDIA_SERVE_MODE    — см. выше (None);
+    MEDIA_ACCEL_PREFIX  — внутренний location nginx ('/protected-media/');
+    MEDIA_MAX_AGE       — max-age для изменяемых файлов, секунды (3600).
+"""
+import mimetypes
+import os
+import re
+import stat
+from urllib.parse import quote
+
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.http import FileResponse, Http404, HttpResponse
+from django.utils._os import safe_join
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+from django.views.decorators.http import require_safe
+
+from .storage import BLOB_PREFIX
+
+IMMUTABLE_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+
+_RANGE = re.compile(r'^bytes=(\d*)-(\d*)$')
+# Имя, которое само является хэшем содержимого: blobs/aa/bb/aabb…(64 символа).ext
+_BLOB_NAME = re.compile(
+    rf'^{BLOB_PREFIX}/([0-9a-f]{{2}})/([0-9a-f]{{2}})/(\1\2[0-9a-f]{{60}})\.[0-9A-Za-z]+$'
+)
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+class _RangeFile:
+    """
+    Файл, читаемый от текущей позиции не дальше length байт. fileno() отдаёт
+    настоящий дескриптор: gunicorn отправит ровно Content-Length байт через sendfile.
+    """
+
+    def __init__(self, handle, length):
+        self._handle = handle
+        self._remaining = length
+
+    def read(self, size=-1):
+        if self._remaining <= 0:
+            return b''
+        if size < 0 or size > self._remaining:
+            size = self._remaining
+        data = self._handle.read(size)
+        self._remaining -= len(data)
+        return data
+
+    def fileno(self):
+        return self._handle.fileno()
+
+    def close(self):
+        self._handle.close()
+
+
+def parse_range(header, size):
+    """(start, end) включительно для одного диапазона; None — заголовка нет или он не поддерживается."""
+    match = _RANGE.match(header.strip()) if header else None
+    if not match or not any(match.groups()):
+        return None
+    first, last = match.groups()
+    if not first:
+        # bytes=-N — последние N байт
+        start, end = max(size - int(last), 0), size - 1
+    else:
+        start = int(first)
+        end = min(int(last), size - 1) if last else size - 1
+    return start, end
+
+
+def _etag(name, st):
+    blob = _BLOB_NAME.match(name)
+    if blob:
+        return quote_etag(f'{blob.group(3)[:32]}-{st.st_size:x}')
+    return quote_etag(f'{st.st_mtime_ns:x}-{st.st_size:x}')
+
+
+@require_safe
+def serve_media(request, path):
+    try:
+        full_path = safe_join(settings.MEDIA_ROOT, path)
+        st = os.stat(full_path)
+    except (OSError, ValueError, SuspiciousFileOperation):
+        raise Http404("Файл не найден")
+    if not stat.S_ISREG(st.st_mode):
+        raise Http404("Файл не найден")
+
+    name = path.replace(os.sep, '/')
+    etag = _etag(name, st)
+    headers = {
+        'ETag': etag,
+        'Last-Modified': http_date(st.st_mtime),
+        'Cache-Control': (IMMUTABLE_CACHE_CONTROL if _BLOB_NAME.match(name)
+                          else f"public, max-age={_setting('MEDIA_MAX_AGE', 3600)}"),
+    }
+    response = get_conditional_response(request, etag=etag, last_modified=int(st.st_mtime))
+    if response is not None:
+        for header, value in headers.items():
+            response[header] = value
+        return response
+
+    content_type, encoding = mimetypes.guess_type(full_path)
+    content_type = content_type or 'application/octet-stream'
+    mode = _setting('MEDIA_SERVE_MODE', None)
+    if mode in ('accel', 'sendfile'):
+        # Диапазоны, HEAD и саму передачу обслуживает фронтовой сервер
+        response = HttpResponse(content_type=content_type)
+        if mode == 'accel':
+            response['X-Accel-Redirect'] = _setting('MEDIA_ACCEL_PREFIX', '/protected-media/') + quote(name)
+        else:
+            response['X-Sendfile'] = quote(full_path)
+    else:
+        response = _worker_response(request, full_path, st.st_size, etag, content_type)
+    for header, value in headers.items():
+        response[header] = value
+    if encoding:
+        response['Content-Encoding'] = encoding
+    return response
+
+
+def _worker_response(request, full_path, size, etag, content_type):
+    byte_range = parse_range(request.headers.get('Range'), size)
+    if_range = request.headers.get('If-Range')
+    if byte_range is not None and if_range and if_range != etag:
+        # Файл изменился с момента первого куска — отдаём целиком
+        byte_range = None
+    if byte_range is not None and (byte_range[0] >= size or byte_range[0] > byte_range[1]):
+        response = HttpResponse(status=416, content_type=content_type)
+        response['Content-Range'] = f'bytes */{size}'
+        return response
+
+    if request.method == 'HEAD':
+        response = HttpResponse(content_type=content_type)
+        response['Content-Length'] = size
+        response['Accept-Ranges'] = 'bytes'
+        return response
+
+    handle = open(full_path, 'rb')
+    if byte_range is None:
+        response = FileResponse(handle, content_type=content_type)
+    else:
+        start, end = byte_range
+        handle.seek(start)
+        response = FileResponse(_RangeFile(handle, end - start + 1), status=206, content_type=content_type)
+        response['Content-Length'] = end - start + 1
+        response['Content-Range'] = f'bytes {start}-{end}/{size}'
+    response['Accept-Ranges'] = 'bytes'
+    return response
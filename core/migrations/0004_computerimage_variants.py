@@ -0,0 +1,18 @@
+# Generated by Django 5.2.5 on 2026-10-18 01:47
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0003_outgoingemail'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='computerimage',
+            name='variants',
+            field=models.JSONField(blank=True, default=dict, editable=False, verbose_name='Уменьшенные копии'),
+        ),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 5.2.5 on 2026-10-18 01:51
+
+import core.storage
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0004_computerimage_variants'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='computerimage',
+            name='image',
+            field=models.ImageField(storage=core.storage.blob_storage, upload_to='computers/%Y/%m/%d/', verbose_name='Изображение'),
+        ),
+        migrations.AlterField(
+            model_name='user',
+            name='avatar',
+            field=models.ImageField(blank=True, null=True, storage=core.storage.blob_storage, upload_to='avatars/'),
+        ),
+    ]
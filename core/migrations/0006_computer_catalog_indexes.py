@@ -0,0 +1,25 @@
+# Generated by Django 5.2.5 on 2026-10-18 01:56
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0005_blob_storage'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='computer',
+            index=models.Index(fields=['is_available', '-created_at', '-id'], name='computer_avail_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='computer',
+            index=models.Index(fields=['is_available', 'price', 'id'], name='computer_avail_price_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='computer',
+            index=models.Index(fields=['is_available', 'category', 'price', 'id'], name='computer_avail_cat_price_idx'),
+        ),
+    ]
@@ -0,0 +1,73 @@
+# Generated by Django 5.2.5 on 2026-10-18 02:03
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0006_computer_catalog_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='computer',
+            name='cpu_family',
+            field=models.CharField(blank=True, editable=False, max_length=30, verbose_name='Семейство процессора'),
+        ),
+        migrations.AddField(
+            model_name='computer',
+            name='cpu_vendor',
+            field=models.CharField(blank=True, choices=[('intel', 'Intel'), ('amd', 'AMD'), ('apple', 'Apple')], editable=False, max_length=10, verbose_name='Производитель процессора'),
+        ),
+        migrations.AddField(
+            model_name='computer',
+            name='gpu_tier',
+            field=models.PositiveSmallIntegerField(blank=True, choices=[(1, 'Встроенная'), (2, 'Начальная'), (3, 'Средняя'), (4, 'Высокая'), (5, 'Топовая')], editable=False, null=True, verbose_name='Класс видеокарты'),
+        ),
+        migrations.AddField(
+            model_name='computer',
+            name='gpu_vendor',
+            field=models.CharField(blank=True, choices=[('nvidia', 'NVIDIA'), ('amd', 'AMD'), ('intel', 'Intel')], editable=False, max_length=10, verbose_name='Производитель видеокарты'),
+        ),
+        migrations.AddField(
+            model_name='computer',
+            name='psu_watts',
+            field=models.PositiveIntegerField(blank=True, editable=False, null=True, verbose_name='Блок питания, Вт'),
+        ),
+        migrations.AddField(
+            model_name='computer',
+            name='ram_gb',
+            field=models.PositiveIntegerField(blank=True, editable=False, null=True, verbose_name='ОЗУ, ГБ'),
+        ),
+        migrations.AddField(
+            model_name='computer',
+            name='storage_gb',
+            field=models.PositiveIntegerField(blank=True, editable=False, null=True, verbose_name='Накопители, ГБ'),
+        ),
+        migrations.AddField(
+            model_name='computer',
+            name='storage_type',
+            field=models.CharField(blank=True, choices=[('nvme', 'NVMe SSD'), ('ssd', 'SSD'), ('hdd', 'HDD')], editable=False, max_length=10, verbose_name='Тип накопителя'),
+        ),
+        migrations.AddIndex(
+            model_name='computer',
+            index=models.Index(fields=['is_available', 'ram_gb'], name='computer_avail_ram_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='computer',
+            index=models.Index(fields=['is_available', 'storage_type', 'storage_gb'], name='computer_avail_storage_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='computer',
+            index=models.Index(fields=['is_available', 'cpu_vendor', 'cpu_family'], name='computer_avail_cpu_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='computer',
+            index=models.Index(fields=['is_available', 'gpu_vendor', 'gpu_tier'], name='computer_avail_gpu_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='computer',
+            index=models.Index(fields=['is_available', 'psu_watts'], name='computer_avail_psu_idx'),
+        ),
+    ]
@@ -1,6 +1,11 @@
-from django.db import models
+from django.db import IntegrityError, models, transaction
 from django.contrib.auth.models import AbstractBaseUser, BaseUserManager, PermissionsMixin
-from django.core.validators import MinValueValidator
+from django.core.exceptions import ValidationError
+from django.core.validators import MinValueValidator, validate_email
+from django.utils import timezone
+
+from . import specs, thumbnails
+from .storage import blob_storage
 
 class Computer(models.Model):
     CATEGORY_CHOICES = [
@@ -28,14 +33,48 @@ class Computer(models.Model):
     case = models.CharField(max_length=255, verbose_name="Корпус")
     cooling = models.CharField(max_length=255, verbose_name="Охлаждение")
     operating_system = models.CharField(max_length=100, blank=True, verbose_name="Операционная система")
+
+    # Разобранные характеристики (core/specs.py): заполняются в save() для фильтров каталога
+    ram_gb = models.PositiveIntegerField(null=True, blank=True, editable=False, verbose_name="ОЗУ, ГБ")
+    storage_gb = models.PositiveIntegerField(null=True, blank=True, editable=False, verbose_name="Накопители, ГБ")
+    storage_type = models.CharField(max_length=10, choices=specs.STORAGE_TYPE_CHOICES, blank=True, editable=False,
+                                    verbose_name="Тип накопителя")
+    cpu_vendor = models.CharField(max_length=10, choices=specs.CPU_VENDOR_CHOICES, blank=True, editable=False,
+                                  verbose_name="Производитель процессора")
+    cpu_family = models.CharField(max_length=30, blank=True, editable=False, verbose_name="Семейство процессора")
+    gpu_vendor = models.CharField(max_length=10, choices=specs.GPU_VENDOR_CHOICES, blank=True, editable=False,
+                                  verbose_name="Производитель видеокарты")
+    gpu_tier = models.PositiveSmallIntegerField(null=True, blank=True, choices=specs.GPU_TIER_CHOICES,
+                                                editable=False, verbose_name="Класс видеокарты")
+    psu_watts = models.PositiveIntegerField(null=True, blank=True, editable=False, verbose_name="Блок питания, Вт")
     
     class Meta:
         verbose_name = "Компьютер"
         verbose_name_plural = "Компьютеры"
         ordering = ['-created_at']
+        # Под фильтры и сортировки computer_list_api (core/catalog_api.py)
+        indexes = [
+            models.Index(fields=['is_available', '-created_at', '-id'], name='computer_avail_created_idx'),
+            models.Index(fields=['is_available', 'price', 'id'], name='computer_avail_price_idx'),
+            models.Index(fields=['is_available', 'category', 'price', 'id'], name='computer_avail_cat_price_idx'),
+            models.Index(fields=['is_available', 'ram_gb'], name='computer_avail_ram_idx'),
+            models.Index(fields=['is_available', 'storage_type', 'storage_gb'], name='computer_avail_storage_idx'),
+            models.Index(fields=['is_available', 'cpu_vendor', 'cpu_family'], name='computer_avail_cpu_idx'),
+            models.Index(fields=['is_available', 'gpu_vendor', 'gpu_tier'], name='computer_avail_gpu_idx'),
+            models.Index(fields=['is_available', 'psu_watts'], name='computer_avail_psu_idx'),
+        ]
     
     def __str__(self):
         return self.name
+
+    def save(self, *args, **kwargs):
+        # Разбираем характеристики, только если все текстовые поля загружены
+        if not self.get_deferred_fields().intersection(specs.SOURCE_FIELDS):
+            specs.apply_specs(self)
+            update_fields = kwargs.get('update_fields')
+            if update_fields is not None and set(update_fields).intersection(specs.SOURCE_FIELDS):
+                kwargs['update_fields'] = {*update_fields, *specs.PARSED_FIELDS}
+        super().save(*args, **kwargs)
     
     def get_price_display(self):
         return f"{self.price:,.0f} ₽".replace(',', ' ')
@@ -43,9 +82,12 @@ class Computer(models.Model):
 
 class ComputerImage(models.Model):
     computer = models.ForeignKey(Computer, on_delete=models.CASCADE, related_name='images', verbose_name="Компьютер")
-    image = models.ImageField(upload_to='computers/%Y/%m/%d/', verbose_name="Изображение")
+    # Хранится по содержимому (core/storage.py): одинаковые фото разных сборок — один файл
+    image = models.ImageField(upload_to='computers/%Y/%m/%d/', storage=blob_storage, verbose_name="Изображение")
     is_main = models.BooleanField(default=False, verbose_name="Основное изображение")
     order = models.PositiveIntegerField(default=0, verbose_name="Порядок")
+    # Готовые уменьшенные копии (core/thumbnails.py): {'name': оригинал, 'widths': [320, 640, ...]}
+    variants = models.JSONField(default=dict, blank=True, editable=False, verbose_name="Уменьшенные копии")
     
     class Meta:
         verbose_name = "Изображение компьютера"
@@ -55,7 +97,49 @@ class ComputerImage(models.Model):
     def __str__(self):
         return f"Изображение для {self.computer.name}"
 
+    @property
+    def srcset(self):
+        return thumbnails.srcset(self, 'jpeg')
+
+    @property
+    def webp_srcset(self):
+        return thumbnails.srcset(self, 'webp')
+
+    @property
+    def thumbnail_url(self):
+        return thumbnails.thumbnail_url(self, 'webp')
+
+class PersonNameAllocator:
+    """
+    Выдаёт уникальные person_name по правилу create_user: base, base1, base2, ...
+    Занятые имена передаются один раз (одним запросом), дальше всё считается
+    в памяти; для каждой основы запоминается следующий свободный суффикс.
+    """
+
+    def __init__(self, taken):
+        self.taken = set(taken)
+        self._next_suffix = {}
+
+    def allocate(self, base):
+        if base not in self.taken:
+            self.taken.add(base)
+            return base
+        counter = self._next_suffix.get(base, 1)
+        while f"{base}{counter}" in self.taken:
+            counter += 1
+        self._next_suffix[base] = counter + 1
+        person_name = f"{base}{counter}"
+        self.taken.add(person_name)
+        return person_name
+
+
 class CustomUserManager(BaseUserManager):
+    # Поля, которые принимает bulk_import (остальные колонки файла игнорируются)
+    IMPORT_FIELDS = (
+        'email', 'person_name', 'phone_number', 'address', 'role',
+        'job_title', 'department', 'preferred_contact_method',
+    )
+
     def create_user(self, email, password=None, person_name=None, **extra_fields):
         if not email:
             raise ValueError('The Email field must be set')
@@ -63,13 +147,12 @@ class CustomUserManager(BaseUserManager):
 
         if not person_name:
             # Генерируем person_name из email (до символа @)
-            person_name = email.split('@')[0]
-            # Делаем его уникальным, если такой уже существует
-            base_person_name = person_name
-            counter = 1
-            while User.objects.filter(person_name=person_name).exists():
-                person_name = f"{base_person_name}{counter}"
-                counter += 1
+            base_person_name = email.split('@')[0]
+            # Делаем его уникальным: все занятые варианты base, base1, ... — одним запросом
+            taken = self.model.objects.filter(
+                person_name__startswith=base_person_name
+            ).values_list('person_name', flat=True)
+            person_name = PersonNameAllocator(taken).allocate(base_person_name)
 
         user = self.model(email=email, person_name=person_name, **extra_fields)
         user.set_password(password)
@@ -91,6 +174,89 @@ class CustomUserManager(BaseUserManager):
 
         return self.create_user(email, password, person_name=person_name, **extra_fields)
 
+    def bulk_import(self, rows, batch_size=1000, start=0, progress=None):
+        """
+        Массовое создание пользователей из словарей (строк CSV/JSONL).
+
+        Уже существующие email пропускаются, поэтому повторный запуск на том же
+        файле безопасен и продолжает с места остановки. person_name подбираются
+        в памяти по одному сканированию таблицы, пользователи вставляются
+        bulk_create пачками по batch_size, каждая пачка — своя транзакция.
+        Пароли не переносятся: вход у импортированных — по коду на почту.
+
+        start — номер строки, с которой начинается rows (для сообщений об ошибках).
+        progress(stats) вызывается после каждой пачки.
+        Возвращает stats: processed, created, skipped, errors [(строка, текст)].
+        """
+        allocator = PersonNameAllocator(self.model.objects.values_list('person_name', flat=True).iterator())
+        roles = {value for value, _ in self.model._meta.get_field('role').choices}
+        contact_methods = {value for value, _ in self.model._meta.get_field('preferred_contact_method').choices}
+        stats = {'processed': 0, 'created': 0, 'skipped': 0, 'errors': []}
+        seen = set()
+        batch = []
+
+        for line, row in enumerate(rows, start=start + 1):
+            stats['processed'] += 1
+            data = {
+                field: str(row[field]).strip()
+                for field in self.IMPORT_FIELDS
+                if row.get(field) not in (None, '')
+            }
+            if 'email' not in data:
+                stats['errors'].append((line, "не указан email"))
+                continue
+            try:
+                email = self.normalize_email(data.pop('email'))
+                validate_email(email)
+            except ValidationError:
+                stats['errors'].append((line, f"некорректный email: {row.get('email')!r}"))
+                continue
+            if data.get('role', 'client') not in roles:
+                stats['errors'].append((line, f"неизвестная роль: {data['role']!r}"))
+                continue
+            if data.get('preferred_contact_method', 'email') not in contact_methods:
+                stats['errors'].append((line, f"неизвестный способ связи: {data['preferred_contact_method']!r}"))
+                continue
+            if email in seen:
+                stats['skipped'] += 1
+                continue
+            seen.add(email)
+
+            base = data.pop('person_name', None) or email.split('@')[0]
+            user = self.model(email=email, **data)
+            user._person_name_base = base[:140]
+            user.set_unusable_password()
+            batch.append(user)
+
+            if len(batch) >= batch_size:
+                self._import_batch(batch, allocator, stats)
+                batch = []
+                if progress:
+                    progress(stats)
+        if batch:
+            self._import_batch(batch, allocator, stats)
+            if progress:
+                progress(stats)
+        return stats
+
+    def _import_batch(self, batch, allocator, stats, retry=True):
+        existing = set(self.filter(email__in=[user.email for user in batch]).values_list('email', flat=True))
+        new_users = [user for user in batch if user.email not in existing]
+        for user in new_users:
+            user.person_name = allocator.allocate(user._person_name_base)
+        try:
+            with transaction.atomic(using=self.db):
+                self.bulk_create(new_users)
+        except IntegrityError:
+            if not retry:
+                raise
+            stats['skipped'] += len(batch) - len(new_users)
+            # Параллельная регистрация заняла email или имя: перечитываем и пробуем снова
+            allocator.taken.update(self.values_list('person_name', flat=True).iterator())
+            return self._import_batch(new_users, allocator, stats, retry=False)
+        stats['created'] += len(new_users)
+        stats['skipped'] += len(batch) - len(new_users)
+
 
 class User(AbstractBaseUser, PermissionsMixin):
     # Основные идентификаторы пользователя
@@ -103,8 +269,8 @@ class User(AbstractBaseUser, PermissionsMixin):
     phone_number = models.CharField(max_length=20, blank=True, null=True)  # Номер телефона для связи (необязательно)
     address = models.TextField(blank=True,
                                null=True)  # Полный адрес (улица, дом, квартира) — полезно для курьерской доставки или выезда
-    avatar = models.ImageField(upload_to='avatars/', blank=True,
-                               null=True)  # Фото профиля пользователя, сохраняется в папке media/avatars/
+    avatar = models.ImageField(upload_to='avatars/', blank=True, storage=blob_storage,
+                               null=True)  # Фото профиля пользователя, хранится по содержимому (core/storage.py)
 
     # Системные флаги доступа (используются Django)
     is_active = models.BooleanField(default=True)  # Активен ли аккаунт (False — заблокирован)
@@ -148,4 +314,41 @@ class User(AbstractBaseUser, PermissionsMixin):
     USERNAME_FIELD = 'email'  # Вход в систему осуществляется по email
 
     # Поля, обязательные при создании через команду createsuperuser
-    REQUIRED_FIELDS = ['person_name']  # При создании суперпользователя нужно указать person_name
\ No newline at end of file
+    REQUIRED_FIELDS = ['person_name']  # При создании суперпользователя нужно указать person_name
+
+
+class OutgoingEmail(models.Model):
+    """
+    Очередь исходящих писем (коды входа и регистрации).
+    Представления только ставят письмо в очередь, отправляет воркер
+    manage.py send_queued_mail через одно переиспользуемое SMTP-соединение.
+    """
+    STATUS_CHOICES = [
+        ('pending', 'В очереди'),
+        ('sending', 'Отправляется'),
+        ('sent', 'Отправлено'),
+        ('failed', 'Ошибка'),
+    ]
+
+    to = models.EmailField(verbose_name="Получатель")
+    subject = models.CharField(max_length=255, verbose_name="Тема")
+    body = models.TextField(verbose_name="Текст")
+    html_body = models.TextField(blank=True, verbose_name="HTML")
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='pending', verbose_name="Статус")
+    attempts = models.PositiveIntegerField(default=0, verbose_name="Попыток")
+    # Для pending — когда можно пробовать снова, для sending — до какого момента письмо занято воркером
+    next_attempt_at = models.DateTimeField(default=timezone.now, verbose_name="Следующая попытка")
+    last_error = models.TextField(blank=True, verbose_name="Последняя ошибка")
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name="Дата создания")
+    sent_at = models.DateTimeField(blank=True, null=True, verbose_name="Дата отправки")
+
+    class Meta:
+        verbose_name = "Исходящее письмо"
+        verbose_name_plural = "Исходящие письма"
+        ordering = ['id']
+        indexes = [
+            models.Index(fields=['status', 'next_attempt_at'], name='outbox_due_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.subject} → {self.to} ({self.get_status_display()})"
@@ -0,0 +1,83 @@
+# core/pagination.py
+import base64
+import datetime
+import json
+from decimal import Decimal
+
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+
+
+class InvalidCursor(ValueError):
+    """Курсор повреждён или не относится к этой выборке."""
+
+
+def encode_cursor(values):
+    """
+    Упаковывает значения ключа последней записи страницы в непрозрачную строку.
+    Даты и Decimal сериализуются строками (даты — с микросекундами, иначе сравнение
+    на границе страницы даст пропуски) и восстанавливаются через to_python поля.
+    """
+    payload = [
+        v.isoformat() if isinstance(v, datetime.datetime)
+        else str(v) if isinstance(v, Decimal) else v
+        for v in values
+    ]
+    raw = json.dumps(payload, separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(cursor, count):
+    """
+    Распаковывает курсор, созданный encode_cursor. Возвращает список из count значений.
+    """
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except (ValueError, TypeError) as e:
+        raise InvalidCursor(f"Некорректный курсор: {e}")
+    if not isinstance(values, list) or len(values) != count:
+        raise InvalidCursor("Некорректный курсор.")
+    return values
+
+
+def keyset_page(queryset, ordering, cursor=None, limit=20):
+    """
+    Keyset-пагинация по набору полей сортировки, например ('-created_at', '-id').
+
+    В отличие от OFFSET, база не перебирает пропущенные строки: следующая страница
+    начинается строго «после» последней записи предыдущей, поэтому стоимость
+    запроса не растёт с номером страницы. Последнее поле должно быть уникальным.
+
+    Возвращает (objects, next_cursor); next_cursor = None, если страниц больше нет.
+    """
+    fields = [f.lstrip('-') for f in ordering]
+    if cursor:
+        values = decode_cursor(cursor, len(fields))
+        opts = queryset.model._meta
+        try:
+            values = [opts.get_field(f).to_python(v) for f, v in zip(fields, values)]
+        except (ValidationError, TypeError, ValueError) as e:
+            # Курсор приходит от клиента: to_python полей дат падает на {} и [] с TypeError
+            raise InvalidCursor(f"Некорректный курсор: {e}")
+        if None in values:
+            # encode_cursor не выдаёт null, а сравнение lt/gt с None база не умеет
+            raise InvalidCursor("Некорректный курсор.")
+
+        # (a, b) после (x, y)  <=>  a после x OR (a = x AND b после y)
+        condition = Q()
+        for i, spec in enumerate(ordering):
+            lookup = 'lt' if spec.startswith('-') else 'gt'
+            step = Q(**{f'{fields[i]}__{lookup}': values[i]})
+            for prev_field, prev_value in zip(fields[:i], values[:i]):
+                step &= Q(**{prev_field: prev_value})
+            condition |= step
+        queryset = queryset.filter(condition)
+
+    objects = list(queryset.order_by(*ordering)[:limit + 1])
+    next_cursor = None
+    if len(objects) > limit:
+        objects = objects[:limit]
+        last = objects[-1]
+        next_cursor = encode_cursor([getattr(last, f) for f in fields])
+    return objects, next_cursor
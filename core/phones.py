@@ -0,0 +1,28 @@
+# core/phones.py
+import re
+
+# Код страны по умолчанию: номера без него считаются российскими
+DEFAULT_COUNTRY_CODE = '7'
+
+
+def normalize_phone(raw, country_code=DEFAULT_COUNTRY_CODE):
+    """
+    Приводит телефон к виду E.164 ('+79991234567') для поиска и сравнения.
+
+    '+7 (999) 123-45-67', '8 999 123 45 67', '9991234567' → '+79991234567'.
+    Номер с явным '+' берётся как есть. Если цифр слишком мало или много
+    для E.164, возвращается пустая строка — такой номер ни с чем не совпадёт.
+    """
+    if not raw:
+        return ''
+    raw = raw.strip()
+    digits = re.sub(r'\D', '', raw)
+    if not raw.startswith('+'):
+        if len(digits) == 11 and digits[0] == '8' and country_code == '7':
+            # Российский внутренний формат: 8 вместо +7
+            digits = country_code + digits[1:]
+        elif len(digits) == 10:
+            digits = country_code + digits
+    if not 8 <= len(digits) <= 15:
+        return ''
+    return '+' + digits
@@ -0,0 +1,294 @@
+# core/profiling.py
+"""
+Профилирование запросов: сколько времени ушло на SQL, шаблоны и Python.
+
+ProfilingMiddleware (ставится первым в MIDDLEWARE) на каждый запрос считает
+число и время SQL-запросов (execute_wrapper на всех соединениях), время
+рендера шаблонов и общее время. Сотрудникам (is_staff) итог отдаётся
+заголовком Server-Timing — его показывает вкладка Network в DevTools:
+
+    Server-Timing: db;dur=12.4;desc="7 queries", tpl;dur=5.1, app;dur=20.3, total;dur=37.8
+
+app — время Python без SQL и шаблонов.
+
+Middleware гибридный: под ASGI с асинхронной цепочкой он не переключает
+запрос в поток. SQL-обёртки ставятся на соединения того потока, где
+sync_to_async выполняет синхронный код запроса (у соединений Django свой
+экземпляр на поток).
+
+Часть медленных запросов (дольше PROFILING_SLOW_MS, с вероятностью
+PROFILING_SAMPLE_RATE) пишется в ротируемый лог одной JSON-строкой: SQL
+в нормализованном виде (параметры не попадают в лог, списки IN (...) и
+VALUES схлопнуты), число повторов и время каждого, а для самых долгих
+SELECT — план EXPLAIN QUERY PLAN. EXPLAIN выполняется уже после ответа
+и в замеры не входит.
+
+Настройки (все необязательные):
+    PROFILING_ENABLED           — выключатель (по умолчанию True);
+    PROFILING_SLOW_MS           — порог медленного запроса, мс (500);
+    PROFILING_SAMPLE_RATE       — доля медленных запросов, попадающих в лог (0.1);
+    PROFILING_EXPLAIN_LIMIT     — сколько самых долгих SELECT объяснять (5);
+    PROFILING_LOG_FILE          — путь к логу (BASE_DIR/logs/slow_requests.log);
+    PROFILING_LOG_MAX_BYTES     — размер файла до ротации (5 МБ);
+    PROFILING_LOG_BACKUP_COUNT  — сколько старых файлов хранить (5).
+"""
+import json
+import logging
+import os
+import random
+import re
+import time
+from contextvars import ContextVar
+from contextlib import ExitStack
+from logging.handlers import RotatingFileHandler
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.db import connections
+from django.template.backends.django import Template as DjangoTemplate
+from django.utils import timezone
+
+_current = ContextVar('request_profile', default=None)
+_slow_log_handler = None
+
+_WHITESPACE = re.compile(r'\s+')
+_PLACEHOLDER_LIST = re.compile(r'\((?:\s*%s\s*,)+\s*%s\s*\)')
+_VALUES_ROWS = re.compile(r'(VALUES\s*\([^()]*\))(?:\s*,\s*\([^()]*\))+', re.IGNORECASE)
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+def normalize_sql(sql):
+    """SQL без лишних пробелов, со схлопнутыми списками параметров: IN (%s, %s, %s) → IN (...)."""
+    sql = _WHITESPACE.sub(' ', sql).strip()
+    sql = _VALUES_ROWS.sub(r'\1, ...', sql)
+    return _PLACEHOLDER_LIST.sub('(...)', sql)
+
+
+class RequestProfile:
+    """Замеры одного запроса; заполняются обёрткой SQL и таймером шаблонов."""
+
+    def __init__(self):
+        self.db_time = 0.0
+        self.db_count = 0
+        self.template_time = 0.0
+        self.template_depth = 0
+        # нормализованный SQL → {'count', 'time', 'slowest', 'sample': (alias, sql, params) самого долгого}
+        self.statements = {}
+
+    def query_wrapper(self, alias):
+        def wrapper(execute, sql, params, many, context):
+            started = time.perf_counter()
+            try:
+                return execute(sql, params, many, context)
+            finally:
+                elapsed = time.perf_counter() - started
+                self.db_time += elapsed
+                self.db_count += 1
+                stat = self.statements.setdefault(
+                    normalize_sql(sql), {'count': 0, 'time': 0.0, 'slowest': 0.0, 'sample': None}
+                )
+                stat['count'] += 1
+                stat['time'] += elapsed
+                if elapsed >= stat['slowest'] and not many:
+                    stat['slowest'] = elapsed
+                    stat['sample'] = (alias, sql, params)
+        return wrapper
+
+    def server_timing(self, total):
+        app = max(total - self.db_time - self.template_time, 0.0)
+        return ', '.join([
+            f'db;dur={self.db_time * 1000:.1f};desc="{self.db_count} queries"',
+            f'tpl;dur={self.template_time * 1000:.1f}',
+            f'app;dur={app * 1000:.1f}',
+            f'total;dur={total * 1000:.1f}',
+        ])
+
+
+def _timed_render(render):
+    def wrapper(self, *args, **kwargs):
+        profile = _current.get()
+        if profile is None:
+            return render(self, *args, **kwargs)
+        # render_to_string внутри шаблонного тега не должен считаться дважды
+        profile.template_depth += 1
+        started = time.perf_counter()
+        try:
+            return render(self, *args, **kwargs)
+        finally:
+            profile.template_depth -= 1
+            if profile.template_depth == 0:
+                profile.template_time += time.perf_counter() - started
+    wrapper.profiled = True
+    return wrapper
+
+
+def install_template_timer():
+    """Оборачивает рендер шаблонов бэкенда Django; повторный вызов ничего не делает."""
+    if not getattr(DjangoTemplate.render, 'profiled', False):
+        DjangoTemplate.render = _timed_render(DjangoTemplate.render)
+
+
+def slow_log():
+    """Логгер медленных запросов; файл открывается при первой записи (и заново, если сменился путь)."""
+    global _slow_log_handler
+    logger = logging.getLogger('core.profiling.slow')
+    path = os.path.abspath(
+        _setting('PROFILING_LOG_FILE', os.path.join(settings.BASE_DIR, 'logs', 'slow_requests.log'))
+    )
+    if _slow_log_handler is None or _slow_log_handler.baseFilename != path:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        handler = RotatingFileHandler(
+            path,
+            maxBytes=_setting('PROFILING_LOG_MAX_BYTES', 5 * 1024 * 1024),
+            backupCount=_setting('PROFILING_LOG_BACKUP_COUNT', 5),
+            encoding='utf-8',
+        )
+        handler.setFormatter(logging.Formatter('%(message)s'))
+        if _slow_log_handler is not None:
+            logger.removeHandler(_slow_log_handler)
+            _slow_log_handler.close()
+        logger.addHandler(handler)
+        logger.setLevel(logging.INFO)
+        logger.propagate = False
+        _slow_log_handler = handler
+    return logger
+
+
+def explain(alias, sql, params):
+    """План запроса на том же соединении (строки вывода EXPLAIN) или текст ошибки."""
+    connection = connections[alias]
+    prefix = 'EXPLAIN QUERY PLAN ' if connection.vendor == 'sqlite' else 'EXPLAIN '
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute(prefix + sql, params)
+            return [' '.join(str(value) for value in row) for row in cursor.fetchall()]
+    except Exception as e:
+        return [f'EXPLAIN не выполнен: {e}']
+
+
+def capture_slow_request(request, response, profile, total):
+    statements = sorted(profile.statements.items(), key=lambda item: item[1]['time'], reverse=True)
+    explained = 0
+    entries = []
+    for sql, stat in statements:
+        entry = {
+            'sql': sql,
+            'count': stat['count'],
+            'ms': round(stat['time'] * 1000, 2),
+        }
+        sample = stat['sample']
+        if (sample and explained < _setting('PROFILING_EXPLAIN_LIMIT', 5)
+                and sql.lstrip('( ').upper().startswith(('SELECT', 'WITH'))):
+            entry['plan'] = explain(*sample)
+            explained += 1
+        entries.append(entry)
+
+    slow_log().info(json.dumps({
+        'time': timezone.now().isoformat(),
+        'method': request.method,
+        'path': request.path,
+        'status': response.status_code,
+        'total_ms': round(total * 1000, 1),
+        'db_ms': round(profile.db_time * 1000, 1),
+        'queries': profile.db_count,
+        'template_ms': round(profile.template_time * 1000, 1),
+        'statements': entries,
+    }, ensure_ascii=False))
+
+
+def _is_staff(request):
+    # Только уже загруженный пользователь (request.user или await request.auser()):
+    # профилировщик не должен добавлять запросов к сессии и пользователю сам
+    user = getattr(request, '_cached_user', None) or getattr(request, '_acached_user', None)
+    return bool(user is not None and user.is_authenticated and user.is_staff)
+
+
+def _query_wrappers(profile):
+    """ExitStack с обёртками SQL профиля на всех соединениях текущего потока; close() их снимает."""
+    stack = ExitStack()
+    for connection in connections.all():
+        stack.enter_context(connection.execute_wrapper(profile.query_wrapper(connection.alias)))
+    return stack
+
+
+class ProfilingMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+        install_template_timer()
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if not _setting('PROFILING_ENABLED', True):
+            return self.get_response(request)
+
+        profile = self._start(request)
+        token = _current.set(profile)
+        started = time.perf_counter()
+        try:
+            with _query_wrappers(profile):
+                response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        total = time.perf_counter() - started
+
+        self._add_timing(request, response, profile, total)
+        if self._sampled(total):
+            self._capture(request, response, profile, total)
+        return response
+
+    async def __acall__(self, request):
+        if not _setting('PROFILING_ENABLED', True):
+            return await self.get_response(request)
+
+        profile = self._start(request)
+        token = _current.set(profile)
+        started = time.perf_counter()
+        try:
+            # Запросы к базе идут в потоке sync_to_async — обёртки ставим там же
+            stack = await sync_to_async(_query_wrappers)(profile)
+            try:
+                response = await self.get_response(request)
+            finally:
+                await sync_to_async(stack.close)()
+        finally:
+            _current.reset(token)
+        total = time.perf_counter() - started
+
+        self._add_timing(request, response, profile, total)
+        if self._sampled(total):
+            # EXPLAIN и запись в файл — синхронные
+            await sync_to_async(self._capture)(request, response, profile, total)
+        return response
+
+    @staticmethod
+    def _start(request):
+        profile = RequestProfile()
+        # Замеры нужны и внешним middleware (журнал запросов, core/access_log.py)
+        request.profile = profile
+        return profile
+
+    @staticmethod
+    def _add_timing(request, response, profile, total):
+        if _is_staff(request):
+            response['Server-Timing'] = profile.server_timing(total)
+
+    @staticmethod
+    def _sampled(total):
+        return (total * 1000 >= _setting('PROFILING_SLOW_MS', 500)
+                and random.random() < _setting('PROFILING_SAMPLE_RATE', 0.1))
+
+    @staticmethod
+    def _capture(request, response, profile, total):
+        try:
+            capture_slow_request(request, response, profile, total)
+        except Exception:
+            logging.getLogger(__name__).exception("Не удалось записать медленный запрос")
@@ -0,0 +1,191 @@
+# core/seed.py
+"""
+Синтетические данные для нагрузочных проверок: пользователи, заявки
+(с симптомами и тегами), компьютеры и их изображения.
+
+Всё вставляется через bulk_create, поэтому сигналы моделей не срабатывают —
+счётчики заявок, снимки тегов и версия каталога обновляются здесь явно,
+телефоны сразу нормализуются, а поисковый индекс заполняют триггеры базы.
+"""
+import io
+import random
+from collections import Counter
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.core.files.base import ContentFile
+from django.db import transaction
+from django.utils import timezone
+
+from .catalog_facets import invalidate_facets
+from .http_cache import bump_version
+from .models import Computer, ComputerImage
+from .phones import normalize_phone
+from .specs import apply_specs
+
+FIRST_NAMES = ['Иван', 'Пётр', 'Анна', 'Мария', 'Сергей', 'Ольга', 'Дмитрий', 'Елена', 'Алексей', 'Наталья']
+LAST_NAMES = ['Иванов', 'Петров', 'Сидоров', 'Смирнов', 'Кузнецов', 'Попов', 'Волков', 'Фёдоров', 'Морозов', 'Соколов']
+STREETS = ['Ленина', 'Гагарина', 'Мира', 'Советская', 'Садовая', 'Молодёжная', 'Школьная', 'Лесная']
+ORGANIZATIONS = ['Рога и копыта', 'Вектор', 'Альфа-Сервис', 'ТехноПарк', 'Северный ветер']
+EMAIL_PREFIXES = ['info', 'office', 'mail', 'admin', 'support']
+EMAIL_DOMAINS = ['mail.ru', 'yandex.ru', 'gmail.com', 'example.org']
+PHONE_FORMATS = ['+7 ({a}) {b}-{c}-{d}', '8{a}{b}{c}{d}', '8 {a} {b} {c} {d}', '{a}{b}{c}{d}']
+TAGS = [
+    ('urgent', 'Срочно', '#e11d48'),
+    ('warranty', 'Гарантия', '#2563eb'),
+    ('vip', 'VIP', '#ca8a04'),
+    ('parts', 'Ждёт запчасти', '#7c3aed'),
+    ('callback', 'Перезвонить', '#16a34a'),
+]
+PROCESSORS = ['Intel Core i5-12400F', 'Intel Core i7-13700K', 'AMD Ryzen 5 5600X', 'AMD Ryzen 7 7800X3D']
+GRAPHICS = ['NVIDIA RTX 3060 12GB', 'NVIDIA RTX 4070 12GB', 'AMD RX 7800 XT 16GB', 'Intel UHD 730']
+RAM = ['16GB DDR4 3200MHz', '32GB DDR5 6000MHz', '8GB DDR4 2666MHz', '64GB DDR5 5600MHz']
+STORAGE = ['SSD 512GB NVMe', 'SSD 1TB NVMe', 'SSD 2TB NVMe + HDD 2TB', 'SSD 256GB SATA']
+
+
+def _phone(rng):
+    a, b = rng.randint(900, 999), rng.randint(100, 999)
+    c, d = rng.randint(10, 99), rng.randint(10, 99)
+    return rng.choice(PHONE_FORMATS).format(a=a, b=b, c=c, d=d)
+
+
+def _image_bytes(rng, size=(320, 240)):
+    from PIL import Image
+
+    image = Image.new('RGB', size, tuple(rng.randint(0, 255) for _ in range(3)))
+    buffer = io.BytesIO()
+    image.save(buffer, 'JPEG', quality=70)
+    return buffer.getvalue()
+
+
+def seed_users(count, rng):
+    """Пользователи через bulk_import; общие префиксы email, как у реальной базы (info@, office@)."""
+    roles = ['client'] * 17 + ['engineer', 'manager', 'admin']
+    rows = (
+        {
+            'email': f"{rng.choice(EMAIL_PREFIXES)}.seed{index}@{rng.choice(EMAIL_DOMAINS)}",
+            'phone_number': _phone(rng),
+            'address': f"ул. {rng.choice(STREETS)}, д. {rng.randint(1, 120)}",
+            'role': rng.choice(roles),
+        }
+        for index in range(count)
+    )
+    return get_user_model().objects.bulk_import(rows)['created']
+
+
+@transaction.atomic
+def seed_requests(count, rng, batch_size=500):
+    from ServiceRequest.models import IssueOption, RequestCounter, ServiceRequest, Tag
+    from ServiceRequest.tag_snapshot import rebuild_tag_snapshots
+
+    users = list(get_user_model().objects.values_list('id', 'email'))
+    if not users:
+        return 0
+    issue_ids = []
+    for code, description in IssueOption.CODE_CHOICES:
+        issue, _ = IssueOption.objects.get_or_create(code=code, defaults={'description': description})
+        issue_ids.append(issue.id)
+    tag_ids = [
+        Tag.objects.get_or_create(code=code, defaults={'name': name, 'color': color})[0].id
+        for code, name, color in TAGS
+    ]
+
+    statuses = [value for value, _ in ServiceRequest.STATUS_CHOICES]
+    device_types = [value for value, _ in ServiceRequest.DEVICE_TYPE_CHOICES]
+    now = timezone.now()
+    created = 0
+    counters = Counter()
+    for start in range(0, count, batch_size):
+        batch = []
+        for _ in range(min(batch_size, count - start)):
+            user_id, email = rng.choice(users)
+            legal = rng.random() < 0.2
+            phone = _phone(rng)
+            batch.append(ServiceRequest(
+                created_by_id=user_id,
+                customer_type='legal_entity' if legal else 'individual',
+                full_name=f"{rng.choice(LAST_NAMES)} {rng.choice(FIRST_NAMES)}",
+                organization_name=f"ООО «{rng.choice(ORGANIZATIONS)}»" if legal else None,
+                inn=str(rng.randint(10 ** 9, 10 ** 10 - 1)) if legal else None,
+                phone_number=phone,
+                phone_key=normalize_phone(phone),
+                address=f"г. Москва, ул. {rng.choice(STREETS)}, д. {rng.randint(1, 120)}, кв. {rng.randint(1, 300)}",
+                email=email,
+                device_type=rng.choice(device_types),
+                description='Синтетическая заявка',
+                status=rng.choice(statuses),
+            ))
+        requests = ServiceRequest.objects.bulk_create(batch)
+
+        # auto_now_add в bulk_create ставит текущее время — разносим даты на год назад
+        for req in requests:
+            req.created_at = req.updated_at = now - timedelta(minutes=rng.randint(0, 60 * 24 * 365))
+        ServiceRequest.objects.bulk_update(requests, ['created_at', 'updated_at'])
+
+        ServiceRequest.issues.through.objects.bulk_create([
+            ServiceRequest.issues.through(servicerequest_id=req.id, issueoption_id=issue_id)
+            for req in requests
+            for issue_id in rng.sample(issue_ids, rng.randint(1, 3))
+        ])
+        ServiceRequest.tags.through.objects.bulk_create([
+            ServiceRequest.tags.through(servicerequest_id=req.id, tag_id=tag_id)
+            for req in requests
+            for tag_id in rng.sample(tag_ids, rng.randint(0, 2))
+        ])
+        rebuild_tag_snapshots([req.id for req in requests])
+        counters.update(tuple(getattr(req, field) for field in RequestCounter.KEY_FIELDS) for req in requests)
+        created += len(requests)
+
+    RequestCounter.apply_deltas(counters)
+    return created
+
+
+@transaction.atomic
+def seed_computers(count, images_per_computer, rng):
+    categories = [value for value, _ in Computer.CATEGORY_CHOICES]
+    computers = [
+        Computer(
+            name=f"CompDog {rng.choice(['Start', 'Pro', 'Ultra', 'Work'])} {index + 1}",
+            category=rng.choice(categories),
+            short_description='Сборка для игр и работы',
+            full_description='Синтетическое описание сборки для нагрузочных проверок.',
+            price=rng.randint(30, 400) * 1000,
+            is_available=rng.random() < 0.85,
+            processor=rng.choice(PROCESSORS),
+            graphics_card=rng.choice(GRAPHICS),
+            ram=rng.choice(RAM),
+            storage=rng.choice(STORAGE),
+            power_supply=f"{rng.choice([500, 650, 750, 850])}W 80+ Gold",
+            case='Midi-Tower',
+            cooling=rng.choice(['Воздушное', 'Жидкостное 240мм', 'Жидкостное 360мм']),
+            operating_system=rng.choice(['Windows 11 Pro', 'Windows 11 Home', '']),
+        )
+        for index in range(count)
+    ]
+    # bulk_create минует save(): разобранные характеристики заполняем сами
+    for computer in computers:
+        apply_specs(computer)
+    computers = Computer.objects.bulk_create(computers)
+
+    image_storage = ComputerImage._meta.get_field('image').storage
+    images = []
+    for computer in computers:
+        for order in range(images_per_computer):
+            name = image_storage.save(
+                f"computers/seed/{computer.id}_{order}.jpg", ContentFile(_image_bytes(rng))
+            )
+            images.append(ComputerImage(computer=computer, image=name, is_main=order == 0, order=order))
+    ComputerImage.objects.bulk_create(images)
+    # Новые компьютеры появятся в закэшированном каталоге (catalog_cache.py) и фасетах
+    bump_version('computer_catalog')
+    invalidate_facets()
+    return len(computers), len(images)
+
+
+def seed_database(users=200, requests=2000, computers=60, images_per_computer=3, seed=None):
+    """Заполняет базу синтетическими данными; возвращает число созданных объектов по видам."""
+    rng = random.Random(seed)
+    summary = {'users': seed_users(users, rng)}
+    summary['requests'] = seed_requests(requests, rng)
+    summary['computers'], summary['images'] = seed_computers(computers, images_per_computer, rng)
+    return summary
@@ -0,0 +1,71 @@
+# core/signals.py
+from django.db import transaction
+from django.db.models.signals import post_delete, post_init, post_save
+from django.dispatch import receiver
+
+from . import catalog_facets, thumbnails
+from .http_cache import bump_version
+from .models import Computer, ComputerImage, User
+
+
+# ===========================
+# Фасеты каталога (см. catalog_facets.py)
+# ===========================
+
+@receiver(post_init, sender=Computer)
+def remember_facet_values(sender, instance, **kwargs):
+    instance._facet_values = catalog_facets.snapshot(instance)
+
+
+@receiver(post_save, sender=Computer)
+@receiver(post_delete, sender=Computer)
+def update_catalog_facets(sender, instance, signal, created=False, raw=False, **kwargs):
+    # Подключён раньше сброса версий: страница каталога новой версии уже видит новые счётчики
+    old = None if created else instance._facet_values
+    new = catalog_facets.snapshot(instance) if signal is post_save else None
+    if raw or (old is None and not created) or (new is None and signal is post_save):
+        # Прежние или новые значения неизвестны — фасеты пересчитаются при чтении
+        transaction.on_commit(catalog_facets.invalidate_facets)
+    else:
+        transaction.on_commit(lambda: catalog_facets.apply_change(old, new))
+    instance._facet_values = new
+
+
+# ===========================
+# Версии объектов для ETag и кэша JSON-ответов (см. http_cache.py)
+# ===========================
+
+@receiver(post_save, sender=Computer)
+@receiver(post_delete, sender=Computer)
+def bump_computer_version(sender, instance, **kwargs):
+    bump_version('computer', instance.pk)
+    # Публичный каталог (catalog_cache.py): список карточек и страница анонимов
+    bump_version('computer_catalog')
+
+
+@receiver(post_save, sender=ComputerImage)
+def build_image_variants(sender, instance, raw=False, **kwargs):
+    # Новое или заменённое изображение (дашборд, админка): уменьшенные копии для srcset
+    if raw or not instance.image or thumbnails.ready_widths(instance):
+        return
+    # Файлы хранятся по содержимому: у того же фото другой сборки копии уже построены
+    for variants in (ComputerImage.objects.filter(image=instance.image.name).exclude(pk=instance.pk)
+                     .values_list('variants', flat=True)):
+        if variants.get('name') == instance.image.name:
+            ComputerImage.objects.filter(pk=instance.pk).update(variants=variants)
+            instance.variants = variants
+            return
+    thumbnails.build_for(instance)
+
+
+@receiver(post_save, sender=ComputerImage)
+@receiver(post_delete, sender=ComputerImage)
+def bump_computer_version_on_image(sender, instance, **kwargs):
+    bump_version('computer', instance.computer_id)
+    bump_version('computer_catalog')
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def bump_user_version(sender, instance, **kwargs):
+    bump_version('user', instance.pk)
@@ -0,0 +1,212 @@
+# core/specs.py
+"""
+Структурированные характеристики компьютера из текстовых полей.
+
+Computer.processor, graphics_card, ram, storage и power_supply заполняются
+вручную ('Intel Core i7-13700K', '2x16GB DDR5', 'SSD 1TB NVMe + HDD 2TB',
+'750W 80+ Gold'). parse_specs разбирает их в нормализованные значения,
+которые Computer.save() кладёт в индексированные столбцы (PARSED_FIELDS) —
+по ним computer_list_api фильтрует обычным SQL:
+
+    ram_gb        — объём памяти, ГБ (2x16GB → 32);
+    storage_gb    — суммарный объём накопителей, ГБ (1 ТБ = 1000 ГБ);
+    storage_type  — самый быстрый из накопителей: nvme, ssd или hdd;
+    cpu_vendor    — intel, amd или apple;
+    cpu_family    — 'core-i7', 'core-ultra-7', 'ryzen-7', 'threadripper', 'xeon', 'm2'...;
+    gpu_vendor    — nvidia, amd или intel;
+    gpu_tier      — класс видеокарты 1..5 (GPU_TIER_CHOICES), по номеру модели;
+    psu_watts     — мощность блока питания, Вт.
+
+Что разобрать не удалось, остаётся пустым (None или '') — такие компьютеры
+просто не проходят соответствующий фильтр. Строки, сохранённые до появления
+столбцов или обновлённые мимо save() (bulk_create, update()), заполняет
+команда parse_specs.
+"""
+import re
+
+from .http_cache import bump_version, bump_versions
+
+SOURCE_FIELDS = ('processor', 'graphics_card', 'ram', 'storage', 'power_supply')
+PARSED_FIELDS = (
+    'ram_gb', 'storage_gb', 'storage_type', 'cpu_vendor', 'cpu_family', 'gpu_vendor', 'gpu_tier', 'psu_watts',
+)
+
+STORAGE_TYPE_CHOICES = [('nvme', 'NVMe SSD'), ('ssd', 'SSD'), ('hdd', 'HDD')]
+CPU_VENDOR_CHOICES = [('intel', 'Intel'), ('amd', 'AMD'), ('apple', 'Apple')]
+GPU_VENDOR_CHOICES = [('nvidia', 'NVIDIA'), ('amd', 'AMD'), ('intel', 'Intel')]
+GPU_TIER_CHOICES = [
+    (1, 'Встроенная'),
+    (2, 'Начальная'),
+    (3, 'Средняя'),
+    (4, 'Высокая'),
+    (5, 'Топовая'),
+]
+
+_GB = r'(?:gb|гб|g)(?![a-zа-я])'
+_RAM_KITS = re.compile(r'(\d+)\s*[x×х*]\s*(\d+)\s*' + _GB, re.I)
+_RAM = re.compile(r'(\d+)\s*' + _GB, re.I)
+_CAPACITY = re.compile(r'(?:(\d+)\s*[x×х*]\s*)?(\d+(?:[.,]\d+)?)\s*(tb|тб|gb|гб)(?![a-zа-я])', re.I)
+_WATTS = re.compile(r'(\d{3,4})\s*(?:w|вт|ватт)(?![a-zа-я])', re.I)
+
+_CPU_FAMILIES = [
+    # (шаблон, производитель, семейство; {0} — номер из шаблона)
+    (re.compile(r'threadripper', re.I), 'amd', 'threadripper'),
+    (re.compile(r'ryzen\s*([3579])', re.I), 'amd', 'ryzen-{0}'),
+    (re.compile(r'athlon', re.I), 'amd', 'athlon'),
+    (re.compile(r'epyc', re.I), 'amd', 'epyc'),
+    (re.compile(r'core\s*ultra\s*([3579])', re.I), 'intel', 'core-ultra-{0}'),
+    (re.compile(r'core\s*i([3579])', re.I), 'intel', 'core-i{0}'),
+    (re.compile(r'xeon', re.I), 'intel', 'xeon'),
+    (re.compile(r'pentium', re.I), 'intel', 'pentium'),
+    (re.compile(r'celeron', re.I), 'intel', 'celeron'),
+    (re.compile(r'(?<![a-z])m([1-4])(?!\d)', re.I), 'apple', 'm{0}'),
+]
+_CPU_VENDORS = [
+    (re.compile(r'intel', re.I), 'intel'),
+    (re.compile(r'amd', re.I), 'amd'),
+    (re.compile(r'apple', re.I), 'apple'),
+]
+
+_NVIDIA_MODEL = re.compile(r'(?:rtx|gtx|gt)\s*(\d{3,4})', re.I)
+_NVIDIA_PRO = re.compile(r'rtx\s*a(\d)\d{3}', re.I)
+_RADEON_MODEL = re.compile(r'rx\s*(\d{3,4})', re.I)
+_ARC_MODEL = re.compile(r'arc\s*[ab](\d)\d{2}', re.I)
+_INTEGRATED = re.compile(r'integrated|встро|uhd|iris|vega|radeon\s+graphics', re.I)
+_GPU_VENDORS = [
+    (re.compile(r'nvidia|geforce|quadro', re.I), 'nvidia'),
+    (re.compile(r'amd|radeon', re.I), 'amd'),
+    (re.compile(r'intel|\barc\b', re.I), 'intel'),
+]
+
+
+def parse_ram(text):
+    if not text:
+        return None
+    kit = _RAM_KITS.search(text)
+    if kit:
+        return int(kit.group(1)) * int(kit.group(2))
+    match = _RAM.search(text)
+    return int(match.group(1)) if match else None
+
+
+def parse_storage(text):
+    """(объём в ГБ или None, тип или '')."""
+    if not text:
+        return None, ''
+    total = 0
+    for count, size, unit in _CAPACITY.findall(text):
+        size = float(size.replace(',', '.')) * (int(count) if count else 1)
+        total += size * 1000 if unit.lower() in ('tb', 'тб') else size
+    lowered = text.lower()
+    if 'nvme' in lowered or 'm.2' in lowered or 'pcie' in lowered:
+        kind = 'nvme'
+    elif 'ssd' in lowered:
+        kind = 'ssd'
+    elif 'hdd' in lowered or 'rpm' in lowered or 'жёстк' in lowered or 'жестк' in lowered:
+        kind = 'hdd'
+    else:
+        kind = ''
+    return (round(total) or None), kind
+
+
+def parse_cpu(text):
+    """(производитель, семейство); '' — не распознано."""
+    if not text:
+        return '', ''
+    for pattern, vendor, family in _CPU_FAMILIES:
+        match = pattern.search(text)
+        if match:
+            return vendor, family.format(*match.groups())
+    for pattern, vendor in _CPU_VENDORS:
+        if pattern.search(text):
+            return vendor, ''
+    return '', ''
+
+
+def _tier_from_number(digit, table):
+    for limit, tier in table:
+        if digit <= limit:
+            return tier
+    return table[-1][1]
+
+
+def parse_gpu(text):
+    """(производитель или '', класс 1..5 или None)."""
+    if not text:
+        return '', None
+    match = _NVIDIA_MODEL.search(text)
+    if match:
+        # GeForce: последние две цифры номера — позиция в линейке (4060 → 60, 970 → 70)
+        return 'nvidia', _tier_from_number(int(match.group(1)) % 100, [(50, 2), (60, 3), (70, 4), (99, 5)])
+    match = _NVIDIA_PRO.search(text)
+    if match:
+        return 'nvidia', 4 if int(match.group(1)) >= 4 else 3
+    match = _RADEON_MODEL.search(text)
+    if match:
+        # Radeon: вторая цифра четырёхзначного номера (7800 → 8), у трёхзначных — средняя (580 → 8)
+        digit = (int(match.group(1)) // 10) % 10 if len(match.group(1)) == 3 else (int(match.group(1)) // 100) % 10
+        return 'amd', _tier_from_number(digit, [(5, 2), (6, 3), (8, 4), (9, 5)])
+    match = _ARC_MODEL.search(text)
+    if match:
+        return 'intel', _tier_from_number(int(match.group(1)), [(3, 2), (5, 3), (9, 4)])
+
+    vendor = next((vendor for pattern, vendor in _GPU_VENDORS if pattern.search(text)), '')
+    if _INTEGRATED.search(text):
+        if not vendor:
+            vendor = 'amd' if re.search(r'vega', text, re.I) else 'intel'
+        return vendor, 1
+    return vendor, None
+
+
+def parse_psu(text):
+    match = _WATTS.search(text) if text else None
+    return int(match.group(1)) if match else None
+
+
+def parse_specs(processor, graphics_card, ram, storage, power_supply):
+    """Значения PARSED_FIELDS для текстовых характеристик."""
+    storage_gb, storage_type = parse_storage(storage)
+    cpu_vendor, cpu_family = parse_cpu(processor)
+    gpu_vendor, gpu_tier = parse_gpu(graphics_card)
+    return {
+        'ram_gb': parse_ram(ram),
+        'storage_gb': storage_gb,
+        'storage_type': storage_type,
+        'cpu_vendor': cpu_vendor,
+        'cpu_family': cpu_family,
+        'gpu_vendor': gpu_vendor,
+        'gpu_tier': gpu_tier,
+        'psu_watts': parse_psu(power_supply),
+    }
+
+
+def apply_specs(computer):
+    """Заполняет PARSED_FIELDS компьютера (без сохранения); True — что-то изменилось."""
+    parsed = parse_specs(*(getattr(computer, field) for field in SOURCE_FIELDS))
+    changed = any(getattr(computer, field) != value for field, value in parsed.items())
+    for field, value in parsed.items():
+        setattr(computer, field, value)
+    return changed
+
+
+def backfill(batch_size=500, progress=None):
+    """
+    Разбирает характеристики всех компьютеров и записывает изменившиеся
+    пачками bulk_update. Возвращает (сколько проверено, сколько обновлено).
+    """
+    from .models import Computer  # models импортирует этот модуль
+
+    checked, changed = 0, []
+    for computer in Computer.objects.only('id', *SOURCE_FIELDS, *PARSED_FIELDS).order_by('pk').iterator(batch_size):
+        checked += 1
+        if apply_specs(computer):
+            changed.append(computer)
+        if progress is not None and checked % batch_size == 0:
+            progress(checked)
+    Computer.objects.bulk_update(changed, PARSED_FIELDS, batch_size=batch_size)
+
+    # bulk_update не шлёт сигналов: JSON компьютеров и карточки каталога сбрасываем сами
+    if changed:
+        bump_versions('computer', [computer.pk for computer in changed])
+        bump_version('computer_catalog')
+    return checked, len(changed)
@@ -0,0 +1,166 @@
+# core/storage.py
+"""
+Медиафайлы по содержимому: каждый уникальный файл хранится один раз.
+
+ContentAddressedStorage (поля ComputerImage.image и User.avatar) при
+сохранении читает загрузку кусками, одновременно считая SHA-256 и
+записывая во временный файл, и кладёт результат под именем из хэша:
+
+    blobs/3f/a2/3fa2...c1.jpg
+
+Если такой файл уже есть (то же фото для другой сборки, повторная
+загрузка), временный файл удаляется, а поле получает имя существующего.
+Переименование атомарно, поэтому параллельные загрузки одного файла
+безопасны. Производные файлы (уменьшенные копии, маленький аватар) лежат
+рядом с оригиналом под именем <хэш>.<суффикс>.<расширение>.
+
+Удаление строк файлы не трогает: один файл может быть нужен нескольким
+строкам. Число ссылок считается по самим полям (reference_counts), а
+файлы без ссылок вместе с их производными удаляет команда gc_media.
+
+Настройки (все необязательные):
+    MEDIA_GC_DIRS   — каталоги MEDIA_ROOT, которые обходит сборщик
+                      (('blobs', 'computers', 'avatars') — включая файлы,
+                      загруженные до хранения по содержимому);
+    MEDIA_GC_GRACE  — возраст файла, моложе которого он не удаляется, секунды
+                      (86400: строка для только что загруженного файла может
+                      быть ещё не зафиксирована).
+"""
+import hashlib
+import os
+import posixpath
+import tempfile
+import time
+from collections import Counter
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.files.storage import FileSystemStorage
+from django.db.models import Count
+from django.utils.deconstruct import deconstructible
+
+BLOB_PREFIX = 'blobs'
+TMP_DIR = '.tmp'
+CHUNK_SIZE = 64 * 1024
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+@deconstructible
+class ContentAddressedStorage(FileSystemStorage):
+    """Файловое хранилище MEDIA_ROOT, где имя файла — SHA-256 содержимого."""
+
+    def get_available_name(self, name, max_length=None):
+        # Имя, предложенное upload_to, не используется — важно только расширение
+        return name
+
+    def _save(self, name, content):
+        tmp_dir = os.path.join(self.location, BLOB_PREFIX, TMP_DIR)
+        os.makedirs(tmp_dir, exist_ok=True)
+        digest = hashlib.sha256()
+        if hasattr(content, 'seek'):
+            content.seek(0)
+        with tempfile.NamedTemporaryFile(dir=tmp_dir, delete=False) as tmp:
+            try:
+                for chunk in content.chunks(CHUNK_SIZE):
+                    if isinstance(chunk, str):
+                        chunk = chunk.encode()
+                    digest.update(chunk)
+                    tmp.write(chunk)
+            except BaseException:
+                tmp.close()
+                os.remove(tmp.name)
+                raise
+
+        blob = blob_name(digest.hexdigest(), os.path.splitext(name)[1])
+        path = self.path(blob)
+        if os.path.exists(path):
+            os.remove(tmp.name)
+            # Файл мог остаться без ссылок: свежее время изменения защищает его от gc_media
+            os.utime(path)
+        else:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            if self.file_permissions_mode is not None:
+                os.chmod(tmp.name, self.file_permissions_mode)
+            os.replace(tmp.name, path)
+        return blob
+
+
+def blob_name(hexdigest, ext):
+    ext = ext.lower()
+    if not ext[1:].isalnum() or len(ext) > 6:
+        ext = ''
+    return f'{BLOB_PREFIX}/{hexdigest[:2]}/{hexdigest[2:4]}/{hexdigest}{ext}'
+
+
+_blob_storage = ContentAddressedStorage()
+
+
+def blob_storage():
+    """Хранилище для storage= полей модели (вызываемое — чтобы миграции не зависели от настроек)."""
+    return _blob_storage
+
+
+def reference_counts():
+    """
+    Число ссылок на каждый файл из ComputerImage.image и User.avatar:
+    по одному агрегирующему запросу на поле.
+    """
+    from .models import ComputerImage  # models импортирует этот модуль
+
+    counts = Counter()
+    for model, field in ((ComputerImage, 'image'), (get_user_model(), 'avatar')):
+        rows = (model.objects.exclude(**{f'{field}__isnull': True}).exclude(**{field: ''})
+                .values(field).annotate(n=Count('pk')).values_list(field, 'n').order_by())
+        counts.update(dict(rows))
+    return counts
+
+
+def _is_referenced(name, referenced, roots):
+    if name in referenced:
+        return True
+    # Производные: <корень оригинала>.<суффикс>.<расширение>
+    directory, base = posixpath.split(name)
+    parts = base.split('.')
+    return any(posixpath.join(directory, '.'.join(parts[:i])) in roots for i in range(1, len(parts)))
+
+
+def collect_garbage(dry_run=False, grace=None):
+    """
+    Удаляет из MEDIA_GC_DIRS файлы без ссылок (и производные таких файлов),
+    а также брошенные временные файлы загрузок. Возвращает (число файлов, байт).
+    """
+    grace = _setting('MEDIA_GC_GRACE', 86400) if grace is None else grace
+    referenced = {name for name, count in reference_counts().items() if count > 0}
+    roots = {posixpath.splitext(name)[0] for name in referenced}
+    root = os.path.abspath(settings.MEDIA_ROOT)
+    cutoff = time.time() - grace
+
+    removed = freed = 0
+    for directory in _setting('MEDIA_GC_DIRS', (BLOB_PREFIX, 'computers', 'avatars')):
+        top = os.path.join(root, directory)
+        for dirpath, dirnames, filenames in os.walk(top, topdown=False):
+            for filename in filenames:
+                path = os.path.join(dirpath, filename)
+                name = os.path.relpath(path, root).replace(os.sep, '/')
+                try:
+                    stat = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                if stat.st_mtime > cutoff or _is_referenced(name, referenced, roots):
+                    continue
+                if not dry_run:
+                    try:
+                        os.remove(path)
+                    except FileNotFoundError:
+                        continue
+                removed += 1
+                freed += stat.st_size
+            if not dry_run and dirpath != top:
+                try:
+                    os.rmdir(dirpath)  # удаляется только опустевший каталог
+                except OSError:
+                    pass
+    return removed, freed
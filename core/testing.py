@@ -0,0 +1,192 @@
+# core/testing.py
+"""
+Основа нагрузочных тестов эндпоинтов.
+
+EndpointBenchmarkTestCase заполняет тестовую базу синтетическими данными
+(core/seed.py), а benchmark() для каждого вызова:
+
+1. выполняет «холодный» запрос (кэш очищен) и проверяет статус ответа
+   и число SQL-запросов против бюджета — превышение роняет тест. В бюджет
+   не входят обращения к таблице DatabaseCache и точки сохранения: их
+   число зависит от устройства кэша, а не от кода вьюхи, и в отчёт они
+   пишутся отдельно (cache_queries);
+2. повторяет запрос PERF_REPEAT раз и замеряет задержку (медиана, p95);
+3. измеряет пик выделенной памяти одного запроса (tracemalloc).
+
+Результаты всех тестов процесса пишутся в JSON-отчёт (переменная окружения
+PERF_REPORT, по умолчанию perf_report.json в корне проекта), ключи
+отсортированы — отчёты разных релизов удобно сравнивать обычным diff.
+
+make_computer() — общая фабрика компьютеров для остальных тестов.
+"""
+import json
+import os
+import platform
+import shutil
+import statistics
+import tempfile
+import time
+import tracemalloc
+
+import django
+from django.conf import settings
+from django.core.cache import cache, caches
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from .access_log import close_writer
+from .models import Computer
+from .seed import seed_database
+
+REPEAT = int(os.environ.get('PERF_REPEAT', 5))
+
+# Общий для всех тестовых классов процесса: отчёт пишется целиком после каждого класса
+_results = {}
+
+
+COMPUTER_SPECS = {
+    'category': 'gaming', 'short_description': 'Кратко', 'full_description': 'Полно', 'price': 1000,
+    'processor': 'Ryzen 5', 'graphics_card': 'RTX 4060', 'ram': '16GB', 'storage': '1TB',
+    'power_supply': '650W', 'case': 'Midi', 'cooling': 'Air',
+}
+
+
+def make_computer(name='Тестовый', **overrides):
+    """Компьютер со всеми обязательными полями; тест передаёт только то, что проверяет."""
+    return Computer.objects.create(name=name, **{**COMPUTER_SPECS, **overrides})
+
+
+def _percentile(samples, percent):
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, round(percent / 100 * (len(ordered) - 1)))
+    return ordered[index]
+
+
+def _is_cache_query(sql):
+    if sql.startswith(('SAVEPOINT', 'RELEASE SAVEPOINT', 'ROLLBACK TO SAVEPOINT')):
+        return True
+    return any(f'"{table}"' in sql for table in _cache_tables())
+
+
+def _cache_tables():
+    return {
+        caches[alias]._table for alias in settings.CACHES
+        if getattr(caches[alias], '_table', None)
+    }
+
+
+def report_path():
+    return os.environ.get('PERF_REPORT') or os.path.join(settings.BASE_DIR, 'perf_report.json')
+
+
+def write_report():
+    report = {
+        'generated_at': timezone.now().isoformat(),
+        'python': platform.python_version(),
+        'django': django.get_version(),
+        'database': connections[DEFAULT_DB_ALIAS].vendor,
+        'repeat': REPEAT,
+        'endpoints': _results,
+    }
+    with open(report_path(), 'w', encoding='utf-8') as handle:
+        json.dump(report, handle, ensure_ascii=False, indent=2, sort_keys=True)
+
+
+class EndpointBenchmarkTestCase(TestCase):
+    """Тесты эндпоинтов с бюджетом запросов; данные — SEED, медиафайлы и журналы — во временном каталоге.
+
+    Журнал запросов включён: бюджет и задержки меряются с ним, как в работе."""
+
+    SEED = {'users': 200, 'requests': 2000, 'computers': 30, 'images_per_computer': 2, 'seed': 13}
+
+    @classmethod
+    def setUpClass(cls):
+        cls._media_root = tempfile.mkdtemp(prefix='perf-media-')
+        cls._media_override = override_settings(
+            MEDIA_ROOT=cls._media_root,
+            PROFILING_LOG_FILE=os.path.join(cls._media_root, 'slow_requests.log'),
+            ACCESS_LOG_FILE=os.path.join(cls._media_root, 'access.jsonl'),
+            ACCESS_LOG_ENABLED=True,
+        )
+        cls._media_override.enable()
+        try:
+            super().setUpClass()
+        except Exception:
+            cls._media_override.disable()
+            shutil.rmtree(cls._media_root, ignore_errors=True)
+            raise
+
+    @classmethod
+    def tearDownClass(cls):
+        try:
+            super().tearDownClass()
+        finally:
+            close_writer()
+            cls._media_override.disable()
+            shutil.rmtree(cls._media_root, ignore_errors=True)
+            if _results:
+                write_report()
+
+    @classmethod
+    def setUpTestData(cls):
+        seed_database(**cls.SEED)
+
+    def setUp(self):
+        # Локальный LRU не откатывается вместе с транзакцией теста
+        cache.clear()
+
+    def benchmark(self, name, path, *, max_queries, method='get', status=200, repeat=None, **kwargs):
+        """
+        Прогоняет запрос и записывает замеры в отчёт под именем name.
+        repeat=1 — для запросов, которые нельзя повторить (удаление и т.п.).
+        Возвращает ответ холодного запроса.
+        """
+        send = getattr(self.client, method)
+        repeat = REPEAT if repeat is None else repeat
+
+        with CaptureQueriesContext(connections[DEFAULT_DB_ALIAS]) as queries:
+            started = time.perf_counter()
+            response = send(path, **kwargs)
+            cold = time.perf_counter() - started
+        # Журнал запросов соединения очищается в начале каждого запроса — копируем сразу
+        captured = [query['sql'] for query in queries.captured_queries]
+        self.assertEqual(
+            response.status_code, status,
+            f"{name}: {method.upper()} {path} вернул {response.status_code}, ожидался {status}",
+        )
+        app_queries = [sql for sql in captured if not _is_cache_query(sql)]
+        self.assertLessEqual(
+            len(app_queries), max_queries,
+            f"{name}: {len(app_queries)} SQL-запросов при бюджете {max_queries}:\n" + '\n'.join(app_queries),
+        )
+
+        samples = [cold]
+        peak = 0
+        if repeat > 1:
+            tracemalloc.start()
+            try:
+                send(path, **kwargs)
+                peak = tracemalloc.get_traced_memory()[1]
+            finally:
+                tracemalloc.stop()
+            for _ in range(repeat - 1):
+                started = time.perf_counter()
+                send(path, **kwargs)
+                samples.append(time.perf_counter() - started)
+
+        _results[name] = {
+            'method': method.upper(),
+            'path': path,
+            'status': response.status_code,
+            'queries': len(app_queries),
+            'cache_queries': len(captured) - len(app_queries),
+            'max_queries': max_queries,
+            'runs': len(samples),
+            'cold_ms': round(cold * 1000, 2),
+            'p50_ms': round(statistics.median(samples) * 1000, 2),
+            'p95_ms': round(_percentile(samples, 95) * 1000, 2),
+            'peak_kib': round(peak / 1024, 1) if peak else None,
+        }
+        return response
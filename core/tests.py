@@ -1,3 +1,1365 @@
-from django.test import TestCase
+import copy
+import hashlib
+import io
+import json
+import os
+import smtplib
+import sqlite3
+import tempfile
+import threading
+import time
+from decimal import Decimal
+from unittest import mock
 
-# Create your tests here.
+from asgiref.sync import iscoroutinefunction, sync_to_async
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache, caches
+from django.core.files.base import ContentFile
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import CommandError, call_command
+from django.db import connection
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import URLPattern, URLResolver, reverse
+from django.utils import timezone
+from PIL import Image
+
+from DjangoProject import urls as project_urls
+from ServiceRequest.models import IssueOption, ServiceRequest
+
+from . import catalog_facets, specs
+from . import urls as auth_urls
+from .access_log import AccessLogMiddleware, AccessLogWriter, get_writer, log_files, log_path
+from .cache_backends import EPOCH_KEY, LOCK_PREFIX, TwoTierCache
+from .db_backends.sqlite3.base import RetryingCursorWrapper
+from .db_router import SYNCED_AT_KEY, WRITE_COOKIE, ReplicaRouter, ReplicaStickinessMiddleware, use_replica
+from .mail_outbox import OutboxWorker, enqueue_email
+from .models import Computer, ComputerImage, OutgoingEmail, PersonNameAllocator
+from .pagination import InvalidCursor, decode_cursor, encode_cursor, keyset_page
+from .phones import normalize_phone
+from .profiling import ProfilingMiddleware, normalize_sql
+from .storage import blob_storage
+from .testing import EndpointBenchmarkTestCase, make_computer
+
+User = get_user_model()
+
+MAIL_SETTINGS = {
+    'EMAIL_HOST': 'smtp.example.org',
+    'EMAIL_HOST_USER': 'robot@example.org',
+    'EMAIL_HOST_PASSWORD': 'secret',
+}
+
+
+def route_names(patterns):
+    """Имена маршрутов модуля urls без вложенных include()."""
+    return {p.name for p in patterns if isinstance(p, URLPattern) and p.name}
+
+
+class ProjectEndpointsTest(EndpointBenchmarkTestCase):
+    """Маршруты DjangoProject/urls.py и core/urls.py (вход и регистрация)."""
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.admin = User.objects.create_superuser(email='perf-admin@example.org', password='x')
+        cls.client_user = User.objects.filter(role='client').first()
+        cls.computer = Computer.objects.filter(is_available=True).first()
+
+    def test_every_route_is_benchmarked(self):
+        names = route_names(project_urls.urlpatterns) | route_names(auth_urls.urlpatterns)
+        missing = sorted(name for name in names if not hasattr(self, f'test_{name}'))
+        self.assertEqual(missing, [], "Для этих маршрутов нет нагрузочного теста")
+        # admin/ подключён через include() — его проверяют тесты test_admin_*
+        self.assertTrue(any(isinstance(p, URLResolver) and p.pattern.describe() == "'admin/'"
+                            for p in project_urls.urlpatterns))
+
+    def test_admin_index(self):
+        self.client.force_login(self.admin)
+        self.benchmark('admin:index', reverse('admin:index'), max_queries=3)
+
+    def test_admin_servicerequest_changelist(self):
+        self.client.force_login(self.admin)
+        self.benchmark(
+            'admin:ServiceRequest_servicerequest_changelist',
+            reverse('admin:ServiceRequest_servicerequest_changelist'), max_queries=6,
+        )
+
+    def test_admin_servicerequest_search(self):
+        self.client.force_login(self.admin)
+        self.benchmark(
+            'admin:ServiceRequest_servicerequest_changelist?q',
+            reverse('admin:ServiceRequest_servicerequest_changelist') + '?q=Иванов', max_queries=6,
+        )
+
+    def test_home(self):
+        self.benchmark('home', reverse('home'), max_queries=0)
+
+    def test_media(self):
+        image = ComputerImage.objects.filter(computer=self.computer).first()
+        response = self.benchmark('media', image.image.url, max_queries=0)
+        response.close()
+
+    def test_computer_catalog(self):
+        # Холодный кэш: id доступных компьютеров, компьютеры и их изображения, фасеты
+        self.benchmark('computer_catalog', reverse('computer_catalog'), max_queries=4)
+
+    def test_computer_catalog_cached(self):
+        self.client.get(reverse('computer_catalog'))
+        self.benchmark('computer_catalog (cached)', reverse('computer_catalog'), max_queries=0)
+
+    def test_computer_api_detail(self):
+        self.benchmark(
+            'computer_api_detail', reverse('computer_api_detail', args=[self.computer.id]), max_queries=2,
+        )
+
+    def test_computer_list_api(self):
+        # Холодный кэш: страница компьютеров и изображения всех её компьютеров одним запросом
+        self.benchmark('computer_list_api', reverse('computer_list_api') + '?limit=50', max_queries=2)
+
+    def test_computer_list_api_ids(self):
+        ids = ','.join(str(pk) for pk in Computer.objects.values_list('id', flat=True)[:10])
+        self.benchmark('computer_list_api?ids', reverse('computer_list_api') + f'?ids={ids}', max_queries=2)
+
+    def test_catalog_facets_api(self):
+        # Холодный кэш: все фасеты одним агрегирующим запросом
+        self.benchmark('catalog_facets_api', reverse('catalog_facets_api'), max_queries=1)
+
+    def test_search(self):
+        self.client.force_login(self.admin)
+        self.benchmark('search', reverse('search') + '?q=Иван', max_queries=5)
+
+    def test_contact(self):
+        self.benchmark('contact', reverse('contact'), max_queries=0)
+
+    def test_article(self):
+        self.benchmark('article', reverse('article'), max_queries=0)
+
+    def test_profile(self):
+        self.client.force_login(self.client_user)
+        self.benchmark('profile', reverse('profile'), max_queries=2)
+
+    def test_request(self):
+        self.client.force_login(self.client_user)
+        self.benchmark('request', reverse('request'), max_queries=5)
+
+    def test_request_post(self):
+        self.client.force_login(self.client_user)
+        issue = IssueOption.objects.first()
+        before = ServiceRequest.objects.count()
+        self.benchmark(
+            'request[POST]', reverse('request'), method='post', max_queries=9,
+            data={
+                'customer_type': 'individual',
+                'full_name': 'Петров Пётр',
+                'phone_number': '+7 (999) 123-45-67',
+                'address': 'г. Москва, ул. Ленина, д. 1',
+                'device_type': ServiceRequest.DEVICE_TYPE_CHOICES[0][0],
+                'issues': [issue.code],
+                'description': 'Не включается',
+            },
+        )
+        self.assertGreater(ServiceRequest.objects.count(), before)
+
+    def test_logout(self):
+        self.client.force_login(self.client_user)
+        self.benchmark('logout', reverse('logout'), status=302, max_queries=4, repeat=1)
+
+    def test_login_with_email(self):
+        self.benchmark('login_with_email', reverse('login_with_email'), max_queries=0)
+
+    @override_settings(**MAIL_SETTINGS)
+    def test_login_with_email_post(self):
+        self.benchmark(
+            'login_with_email[POST]', reverse('login_with_email'), method='post', status=302,
+            max_queries=4, data={'email': self.client_user.email},
+        )
+
+    def test_verify_login_code(self):
+        self.benchmark('verify_login_code', reverse('verify_login_code'), max_queries=0)
+
+    def test_register_with_email(self):
+        self.benchmark('register_with_email', reverse('register_with_email'), max_queries=0)
+
+    @override_settings(**MAIL_SETTINGS)
+    def test_register_with_email_post(self):
+        self.benchmark(
+            'register_with_email[POST]', reverse('register_with_email'), method='post', status=302,
+            max_queries=5, data={'email': 'new-perf@example.org', 'person_name': 'perfnewcomer'},
+        )
+
+    def test_verify_registration_code(self):
+        self.benchmark('verify_registration_code', reverse('verify_registration_code'), max_queries=0)
+
+
+class CatalogCacheTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.computer = make_computer('Старое имя', price=100000)
+
+    def get_catalog(self):
+        return self.client.get(reverse('computer_catalog')).content.decode()
+
+    def test_anonymous_hit_served_from_cache(self):
+        self.get_catalog()
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('computer_catalog'))
+        app_queries = [q['sql'] for q in queries.captured_queries if 'my_cache_table' not in q['sql']]
+        self.assertEqual(app_queries, [])
+        self.assertContains(response, 'Старое имя')
+        self.assertEqual(
+            self.client.get(reverse('computer_catalog'), HTTP_IF_NONE_MATCH=response['ETag']).status_code, 304,
+        )
+
+    def test_computer_save_and_delete_invalidate(self):
+        self.get_catalog()
+        self.computer.name = 'Новое имя'
+        self.computer.save()
+        page = self.get_catalog()
+        self.assertIn('Новое имя', page)
+        self.assertNotIn('Старое имя', page)
+
+        self.computer.delete()
+        self.assertIn('Компьютеры временно отсутствуют', self.get_catalog())
+
+    def test_image_change_rerenders_card(self):
+        self.assertIn('default_computer.png', self.get_catalog())
+        image = ComputerImage.objects.create(computer=self.computer, image='computers/test.jpg')
+        self.assertIn('computers/test.jpg', self.get_catalog())
+        image.delete()
+        self.assertIn('default_computer.png', self.get_catalog())
+
+    def test_logged_in_user_gets_cached_cards(self):
+        user = User.objects.create_user(email='catalog@example.com', password='x')
+        self.client.force_login(user)
+        self.get_catalog()
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('computer_catalog'))
+        tables = [q['sql'] for q in queries.captured_queries if 'my_cache_table' not in q['sql']]
+        # Только сессия и пользователь для шапки
+        self.assertEqual(len(tables), 2, tables)
+        self.assertContains(response, 'Выход')
+        self.assertFalse(response.has_header('ETag'))
+
+
+class CatalogApiTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.cheap = make_computer('Офисный', category='office', price=40000)
+        self.middle = make_computer('Домашний', category='home', price=80000)
+        self.gaming = make_computer('Игровой', category='gaming', price=150000)
+        self.hidden = make_computer('Снят', category='gaming', price=90000, is_available=False)
+        # bulk_create — без сигнала построения копий: файлов изображений в тесте нет
+        ComputerImage.objects.bulk_create([
+            ComputerImage(computer=self.gaming, image='computers/b.jpg', order=1),
+            ComputerImage(computer=self.gaming, image='computers/a.jpg', order=0, is_main=True),
+        ])
+
+    def get(self, query=''):
+        return self.client.get(reverse('computer_list_api') + query)
+
+    def names(self, query=''):
+        response = self.get(query)
+        self.assertEqual(response.status_code, 200, response.content)
+        return [item['name'] for item in response.json()['results']]
+
+    def test_default_lists_available_newest_first(self):
+        response = self.get()
+        data = response.json()
+        self.assertEqual([item['name'] for item in data['results']], ['Игровой', 'Домашний', 'Офисный'])
+        self.assertIsNone(data['next_cursor'])
+        self.assertEqual([image['image'] for image in data['results'][0]['images']],
+                         ['/media/computers/a.jpg', '/media/computers/b.jpg'])
+        self.assertEqual(data['results'][0]['price_display'], '150 000 ₽')
+
+    def test_filters_and_sorts(self):
+        self.assertEqual(self.names('?category=gaming,office&sort=price'), ['Офисный', 'Игровой'])
+        self.assertEqual(self.names('?category=home&category=office&sort=-price'), ['Домашний', 'Офисный'])
+        self.assertEqual(self.names('?min_price=50000&max_price=100000'), ['Домашний'])
+        self.assertEqual(self.names('?sort=name'), ['Домашний', 'Игровой', 'Офисный'])
+
+    def test_cursor_pagination(self):
+        seen, cursor = [], None
+        while True:
+            data = self.get('?sort=price&limit=2' + (f'&cursor={cursor}' if cursor else '')).json()
+            seen += [item['name'] for item in data['results']]
+            cursor = data['next_cursor']
+            if not cursor:
+                break
+        self.assertEqual(seen, ['Офисный', 'Домашний', 'Игровой'])
+
+    def test_ids_batch_keeps_requested_order(self):
+        data = self.get(f'?ids={self.gaming.id},{self.cheap.id},{self.hidden.id},999999').json()
+        self.assertEqual([item['id'] for item in data['results']], [self.gaming.id, self.cheap.id])
+        self.assertEqual(data['missing'], [self.hidden.id, 999999])
+
+    def test_spec_filters(self):
+        self.middle.ram, self.middle.graphics_card = '2x16GB DDR5', 'NVIDIA GeForce RTX 4070 Super'
+        self.middle.save()
+        self.assertEqual(self.names('?min_ram=32&gpu_vendor=nvidia&min_gpu_tier=4'), ['Домашний'])
+        self.assertEqual(self.names('?min_ram=16&cpu_family=ryzen-5&sort=price'), ['Офисный', 'Домашний', 'Игровой'])
+        self.assertEqual(self.names('?storage_type=hdd'), [])
+        item = self.get(f'?ids={self.middle.id}').json()['results'][0]
+        self.assertEqual(item['specs']['ram_gb'], 32)
+        self.assertEqual(item['specs']['gpu_tier'], 4)
+
+    def test_invalid_parameters(self):
+        for query in ('?category=server', '?min_price=abc', '?min_price=10&max_price=5', '?sort=random',
+                      '?limit=x', '?cursor=!!!', '?ids=1,a', '?available=maybe', '?min_ram=lots',
+                      '?gpu_vendor=3dfx', '?min_gpu_tier=9'):
+            with self.subTest(query=query):
+                self.assertEqual(self.get(query).status_code, 400)
+
+    def test_unavailable_only_for_staff(self):
+        self.assertEqual(self.get('?available=all').status_code, 403)
+        staff = User.objects.create_user(email='catalog-staff@example.com', password='x', is_staff=True)
+        self.client.force_login(staff)
+        self.assertEqual(self.names('?available=false'), ['Снят'])
+        self.assertEqual(len(self.names('?available=all')), 4)
+
+    def test_cached_and_invalidated(self):
+        first = self.get('?sort=price')
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(self.get('?sort=price').content, first.content)
+        self.assertEqual([q for q in queries.captured_queries if 'my_cache_table' not in q['sql']], [])
+        self.assertEqual(self.client.get(reverse('computer_list_api') + '?sort=price',
+                                         HTTP_IF_NONE_MATCH=first['ETag']).status_code, 304)
+
+        self.cheap.price = 200000
+        self.cheap.save()
+        self.assertEqual(self.names('?sort=price'), ['Домашний', 'Игровой', 'Офисный'])
+
+
+@override_settings(CATALOG_PRICE_BUCKETS=(0, 50000, 100000))
+class CatalogFacetsTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.office = make_computer('Офисный', category='office', price=40000)
+        self.home = make_computer('Домашний', category='home', price=80000)
+        self.gaming = make_computer('Игровой', category='gaming', price=150000)
+        make_computer('Снят', category='gaming', price=90000, is_available=False)
+
+    def get_facets(self, expected_queries):
+        with CaptureQueriesContext(connection) as queries:
+            facets = catalog_facets.get_facets()
+        app_queries = [q['sql'] for q in queries.captured_queries if q['sql'].startswith('SELECT')
+                       and 'my_cache_table' not in q['sql']]
+        self.assertEqual(len(app_queries), expected_queries, app_queries)
+        return facets
+
+    def test_compute_in_one_query(self):
+        facets = self.get_facets(expected_queries=1)
+        self.assertEqual(facets['categories'], {'gaming': 1, 'workstation': 0, 'office': 1, 'home': 1})
+        self.assertEqual((facets['available'], facets['unavailable']), (3, 1))
+        self.assertEqual(facets['buckets'], [1, 1, 1])
+        self.assertEqual((facets['min_price'], facets['max_price']), (40000, 150000))
+
+    def test_incremental_refresh_matches_recompute(self):
+        catalog_facets.get_facets()
+        # Разница применяется после коммита
+        with self.captureOnCommitCallbacks(execute=True):
+            station = make_computer('Станция', category='workstation', price=120000)
+            self.home.category, self.home.price = 'office', 45000.0
+            self.home.save()
+            self.assertIn('Станция', self.client.get(reverse('computer_list_api')).content.decode())
+            station = Computer.objects.get(pk=station.pk)
+            station.is_available = False
+            station.save()
+        # Без пересчёта: в кэше уже посчитанные с учётом изменений фасеты
+        self.assertEqual(self.get_facets(expected_queries=0), catalog_facets.compute_facets())
+
+    def test_removing_price_extreme_recomputes(self):
+        catalog_facets.get_facets()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.office.delete()
+        self.assertIsNone(cache.get(catalog_facets.FACETS_KEY))
+        self.assertEqual(catalog_facets.get_facets()['min_price'], 80000)
+
+    def test_change_applied_to_copy(self):
+        cached = catalog_facets.compute_facets()
+        before = copy.deepcopy(cached)
+        office = catalog_facets.snapshot(self.office)
+        # Бэкенд, отдающий одно и то же значение всем читателям (как LRU без копий)
+        with mock.patch.object(catalog_facets, 'cache') as backend:
+            backend.get.return_value = cached
+            catalog_facets.apply_change(catalog_facets.snapshot(self.home), ('gaming', 85000, True))
+            self.assertEqual(cached, before)
+            written = backend.set.call_args.args[1]
+            self.assertIsNot(written, cached)
+            self.assertEqual(written['categories']['gaming'], before['categories']['gaming'] + 1)
+
+            # Несогласованное изменение (убран минимум цены) — запись удаляется, значение не тронуто
+            backend.reset_mock()
+            catalog_facets.apply_change(office, None)
+            self.assertEqual(cached, before)
+            backend.set.assert_not_called()
+            backend.delete.assert_called_once_with(catalog_facets.FACETS_KEY)
+
+    def test_deferred_load_recomputes(self):
+        catalog_facets.get_facets()
+        computer = Computer.objects.only('id', 'name').get(pk=self.home.pk)
+        computer.name = 'Переименован'
+        with self.captureOnCommitCallbacks(execute=True):
+            computer.save()
+        self.assertIsNone(cache.get(catalog_facets.FACETS_KEY))
+
+    def test_api_and_catalog_page(self):
+        data = self.client.get(reverse('catalog_facets_api')).json()
+        self.assertEqual(data['total'], 3)
+        self.assertEqual([bucket['label'] for bucket in data['price']['buckets']],
+                         ['до 50 000 ₽', '50 000 – 100 000 ₽', 'от 100 000 ₽'])
+        self.assertEqual({c['value']: c['count'] for c in data['categories']}['gaming'], 1)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.gaming.delete()
+        data = self.client.get(reverse('catalog_facets_api')).json()
+        self.assertEqual({c['value']: c['count'] for c in data['categories']}['gaming'], 0)
+        page = self.client.get(reverse('computer_catalog')).content.decode()
+        self.assertIn('data-value="office">Офисный <span>1</span>', page)
+        self.assertNotIn('data-value="gaming"', page)
+
+
+class SpecParserTest(TestCase):
+    def test_parsers(self):
+        cases = [
+            (specs.parse_ram, '16GB DDR4 3200MHz', 16),
+            (specs.parse_ram, '2x16GB DDR5', 32),
+            (specs.parse_ram, '64 ГБ', 64),
+            (specs.parse_ram, 'много', None),
+            (specs.parse_storage, 'SSD 2TB NVMe + HDD 2TB', (4000, 'nvme')),
+            (specs.parse_storage, 'SSD 256GB SATA', (256, 'ssd')),
+            (specs.parse_storage, 'HDD 1 ТБ 7200rpm', (1000, 'hdd')),
+            (specs.parse_cpu, 'Intel Core i7-13700K', ('intel', 'core-i7')),
+            (specs.parse_cpu, 'AMD Ryzen 7 7800X3D', ('amd', 'ryzen-7')),
+            (specs.parse_cpu, 'AMD Ryzen Threadripper 7980X', ('amd', 'threadripper')),
+            (specs.parse_cpu, 'Apple M2 Pro', ('apple', 'm2')),
+            (specs.parse_gpu, 'NVIDIA RTX 3060 12GB', ('nvidia', 3)),
+            (specs.parse_gpu, 'GeForce RTX 4090', ('nvidia', 5)),
+            (specs.parse_gpu, 'AMD RX 7800 XT 16GB', ('amd', 4)),
+            (specs.parse_gpu, 'Intel Arc A750', ('intel', 4)),
+            (specs.parse_gpu, 'Intel UHD 730', ('intel', 1)),
+            (specs.parse_gpu, 'Видеокарта', ('', None)),
+            (specs.parse_psu, '750W 80+ Gold', 750),
+            (specs.parse_psu, 'Блок питания 650 Вт', 650),
+        ]
+        for parse, text, expected in cases:
+            with self.subTest(text=text):
+                self.assertEqual(parse(text), expected)
+
+    def test_save_fills_columns(self):
+        computer = make_computer(
+            'Сборка', processor='Intel Core i5-12400F', graphics_card='NVIDIA RTX 4070 12GB', ram='32GB DDR5',
+            storage='SSD 1TB NVMe',
+        )
+        self.assertEqual(Computer.objects.filter(ram_gb__gte=32, gpu_vendor='nvidia').get(), computer)
+        computer.ram = '64GB DDR5'
+        computer.save(update_fields=['ram'])
+        self.assertEqual(Computer.objects.get(pk=computer.pk).ram_gb, 64)
+
+    def test_backfill_command(self):
+        computer = make_computer(
+            'Сборка', category='office', processor='AMD Ryzen 5 5600X', graphics_card='Intel UHD 730', ram='8GB',
+            storage='SSD 512GB', power_supply='500W',
+        )
+        # Строки до появления столбцов и изменённые мимо save()
+        Computer.objects.filter(pk=computer.pk).update(ram_gb=None, cpu_family='', psu_watts=None)
+        out = io.StringIO()
+        call_command('parse_specs', stdout=out)
+        self.assertIn('обновлено 1', out.getvalue())
+        computer.refresh_from_db()
+        self.assertEqual((computer.ram_gb, computer.cpu_family, computer.psu_watts), (8, 'ryzen-5', 500))
+
+
+@override_settings(THUMBNAIL_WIDTHS=(100, 200, 1280))
+class ThumbnailTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        self.enterContext(override_settings(MEDIA_ROOT=media.name))
+        self.media_root = media.name
+        self.computer = make_computer('С фото')
+
+    def upload(self, size=(400, 300)):
+        buffer = io.BytesIO()
+        Image.new('RGB', size, (200, 30, 30)).save(buffer, 'JPEG')
+        return ComputerImage.objects.create(computer=self.computer, image=ContentFile(buffer.getvalue(), 'photo.jpg'))
+
+    def test_upload_builds_jpeg_and_webp_variants(self):
+        image = self.upload()
+        image.refresh_from_db()
+        # 1280 шире оригинала — вместо неё копия в ширину оригинала
+        self.assertEqual(image.variants, {'name': image.image.name, 'widths': [100, 200, 400]})
+        root = os.path.splitext(image.image.name)[0]
+        for width in (100, 200, 400):
+            for ext in ('jpg', 'webp'):
+                with Image.open(os.path.join(self.media_root, f'{root}.w{width}.{ext}')) as variant:
+                    self.assertEqual(variant.width, width)
+        self.assertIn(f'{root}.w200.webp 200w', image.webp_srcset)
+
+        data = self.client.get(reverse('computer_api_detail', args=[self.computer.id])).json()
+        self.assertEqual(data['images'][0]['srcset'], image.srcset)
+        self.assertIn('.w100.', data['images'][0]['thumbnail'])
+        self.assertContains(self.client.get(reverse('computer_catalog')), image.webp_srcset)
+
+    def test_backfill_command_in_parallel(self):
+        images = [self.upload(), self.upload((150, 100))]
+        ComputerImage.objects.update(variants={})
+
+        out = io.StringIO()
+        call_command('build_thumbnails', '--workers', '2', stdout=out)
+
+        self.assertIn('обработано 2, ошибок 0', out.getvalue())
+        widths = [image.variants['widths'] for image in ComputerImage.objects.filter(pk__in=[i.pk for i in images])]
+        self.assertEqual(widths, [[100, 200, 400], [100, 150]])
+
+
+class MediaServingTest(SimpleTestCase):
+    def setUp(self):
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        self.enterContext(override_settings(MEDIA_ROOT=media.name, MEDIA_SERVE_MODE=None))
+        self.content = bytes(range(256)) * 40
+        self.name = blob_storage().save('computers/photo.jpg', ContentFile(self.content))
+        self.url = reverse('media', args=[self.name])
+
+    def get(self, **headers):
+        response = self.client.get(self.url, headers=headers)
+        body = b''.join(response.streaming_content) if response.streaming else response.content
+        response.close()
+        return response, body
+
+    def test_full_file_with_immutable_caching(self):
+        response, body = self.get()
+        self.assertEqual((response.status_code, body), (200, self.content))
+        self.assertEqual(response['Cache-Control'], 'public, max-age=31536000, immutable')
+        self.assertEqual(response['Accept-Ranges'], 'bytes')
+        self.assertEqual(response['Content-Type'], 'image/jpeg')
+
+        not_modified, _ = self.get(**{'If-None-Match': response['ETag']})
+        self.assertEqual(not_modified.status_code, 304)
+
+    def test_byte_ranges(self):
+        response, body = self.get(Range='bytes=100-199')
+        self.assertEqual((response.status_code, body), (206, self.content[100:200]))
+        self.assertEqual(response['Content-Range'], f'bytes 100-199/{len(self.content)}')
+
+        response, body = self.get(Range='bytes=-10')
+        self.assertEqual(body, self.content[-10:])
+
+        response, _ = self.get(Range=f'bytes={len(self.content)}-')
+        self.assertEqual(response.status_code, 416)
+
+        # If-Range со старым ETag — файл целиком
+        response, body = self.get(Range='bytes=0-9', **{'If-Range': '"old"'})
+        self.assertEqual((response.status_code, len(body)), (200, len(self.content)))
+
+    def test_front_server_handoff(self):
+        with override_settings(MEDIA_SERVE_MODE='accel'):
+            response, body = self.get()
+        self.assertEqual(response['X-Accel-Redirect'], '/protected-media/' + self.name)
+        self.assertEqual(body, b'')
+
+        with override_settings(MEDIA_SERVE_MODE='sendfile'):
+            response, _ = self.get()
+        self.assertTrue(response['X-Sendfile'].endswith(self.name))
+
+    def test_non_ascii_name_handoff_is_percent_encoded(self):
+        legacy = os.path.join(settings.MEDIA_ROOT, 'computers')
+        os.makedirs(legacy)
+        with open(os.path.join(legacy, 'фото сборки.jpg'), 'wb') as handle:
+            handle.write(b'x')
+        url = reverse('media', args=['computers/фото сборки.jpg'])
+
+        encoded = 'computers/%D1%84%D0%BE%D1%82%D0%BE%20%D1%81%D0%B1%D0%BE%D1%80%D0%BA%D0%B8.jpg'
+        with override_settings(MEDIA_SERVE_MODE='accel'):
+            response = self.client.get(url)
+        self.assertEqual(response['X-Accel-Redirect'], '/protected-media/' + encoded)
+        with override_settings(MEDIA_SERVE_MODE='sendfile'):
+            response = self.client.get(url)
+        self.assertTrue(response['X-Sendfile'].endswith('/' + encoded))
+        self.assertTrue(response['X-Sendfile'].isascii())
+
+    def test_blob_variants_are_revalidated(self):
+        root, _ = os.path.splitext(self.name)
+        variant = f'{root}.w320.webp'
+        with open(os.path.join(settings.MEDIA_ROOT, variant), 'wb') as handle:
+            handle.write(b'old')
+        response = self.client.get(reverse('media', args=[variant]))
+        response.close()
+        self.assertEqual(response['Cache-Control'], 'public, max-age=3600')
+
+        # Перекодированная копия под тем же именем получает новый ETag
+        time.sleep(0.01)
+        with open(os.path.join(settings.MEDIA_ROOT, variant), 'wb') as handle:
+            handle.write(b'new')
+        again = self.client.get(reverse('media', args=[variant]), headers={'If-None-Match': response['ETag']})
+        again.close()
+        self.assertEqual(again.status_code, 200)
+
+    def test_outside_media_root_not_found(self):
+        self.assertEqual(self.client.get(reverse('media', args=['../manage.py'])).status_code, 404)
+        legacy = os.path.join(settings.MEDIA_ROOT, 'avatars')
+        os.makedirs(legacy)
+        with open(os.path.join(legacy, 'a.png'), 'wb') as handle:
+            handle.write(b'x')
+        response = self.client.get(reverse('media', args=['avatars/a.png']))
+        self.assertEqual(response['Cache-Control'], 'public, max-age=3600')
+        response.close()
+
+
+SPEC_FIELDS = ('processor', 'graphics_card', 'ram', 'storage', 'power_supply', 'case', 'cooling')
+
+
+class ContentAddressedStorageTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        self.enterContext(override_settings(MEDIA_ROOT=media.name))
+        self.media_root = media.name
+        self.admin = User.objects.create_superuser(email='cas-admin@example.org', password='x')
+        self.client.force_login(self.admin)
+        buffer = io.BytesIO()
+        Image.new('RGB', (64, 48), (10, 120, 200)).save(buffer, 'JPEG')
+        self.photo = buffer.getvalue()
+
+    def save_computer(self, name, *files, **extra):
+        data = {
+            'name': name, 'category': 'gaming', 'price': '1000', 'short_description': '-',
+            'full_description': '-', 'operating_system': '', **{field: '-' for field in SPEC_FIELDS}, **extra,
+            'images': [SimpleUploadedFile(file_name, content) for file_name, content in files],
+        }
+        response = self.client.post(reverse('computer_save'), data)
+        self.assertEqual(response.status_code, 200, response.content)
+        return Computer.objects.get(pk=response.json()['id'])
+
+    def test_same_photo_stored_once(self):
+        first = self.save_computer('Первый', ('a.jpg', self.photo), ('b.JPG', self.photo))
+        second = self.save_computer('Второй', ('c.jpg', self.photo))
+
+        names = set(ComputerImage.objects.values_list('image', flat=True))
+        self.assertEqual(len(names), 1)
+        name, = names
+        self.assertEqual(name, f'blobs/{name[6:8]}/{name[9:11]}/{hashlib.sha256(self.photo).hexdigest()}.jpg')
+        # Повтор внутри одной сборки не создаёт второй строки
+        self.assertEqual((first.images.count(), second.images.count()), (1, 1))
+        self.assertEqual(first.images.get().variants, second.images.get().variants)
+
+    def test_gc_removes_only_unreferenced_files(self):
+        kept = self.save_computer('Остаётся', ('a.jpg', self.photo))
+        other = io.BytesIO()
+        Image.new('RGB', (64, 48), (250, 0, 0)).save(other, 'JPEG')
+        dropped = self.save_computer('Очищается', ('b.jpg', other.getvalue()))
+        dropped_name = dropped.images.get().image.name
+        # clear_images удаляет строки, файлы остаются до сборки мусора
+        self.save_computer('Очищается', id=dropped.id, clear_images='1')
+        self.assertTrue(os.path.exists(os.path.join(self.media_root, dropped_name)))
+
+        out = io.StringIO()
+        call_command('gc_media', '--grace', '0', stdout=out)
+
+        self.assertIn('Удалено файлов: 3', out.getvalue())  # оригинал и две копии (JPEG и WebP)
+        self.assertFalse(os.path.exists(os.path.join(self.media_root, dropped_name)))
+        kept_name = kept.images.get().image.name
+        self.assertTrue(os.path.exists(os.path.join(self.media_root, kept_name)))
+        self.assertTrue(kept.images.get().srcset)
+
+
+class AvatarTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        self.enterContext(override_settings(MEDIA_ROOT=media.name))
+        self.manager = User.objects.create_user(email='avatar-manager@example.com', password='x', role='manager')
+        self.client.force_login(self.manager)
+
+    def photo(self, size=(1200, 800), fmt='JPEG', exif=True):
+        image = Image.new('RGB' if fmt == 'JPEG' else 'L', size, 120)
+        buffer = io.BytesIO()
+        if exif:
+            metadata = Image.Exif()
+            metadata[0x010F] = 'Камера'  # Make
+            image.save(buffer, fmt, exif=metadata)
+        else:
+            image.save(buffer, fmt)
+        return SimpleUploadedFile(f'photo.{fmt.lower()}', buffer.getvalue())
+
+    def test_upload_is_resized_reencoded_and_stripped(self):
+        response = self.client.post(reverse('update_user'), {'user_id': self.manager.id, 'avatar': self.photo()})
+        self.assertEqual(response.json(), {'success': True})
+
+        self.manager.refresh_from_db()
+        data = self.client.get(reverse('get_user_data', args=[self.manager.id])).json()
+        self.assertTrue(data['avatar'].endswith('.s128.webp'))
+        self.assertTrue(data['avatar_large'].endswith('.webp'))
+        self.assertEqual(data['avatar'], data['avatar_large'][:-len('.webp')] + '.s128.webp')
+        with Image.open(self.manager.avatar.path) as large:
+            self.assertEqual((large.format, large.size), ('WEBP', (512, 512)))
+            self.assertNotIn('exif', large.info)
+
+    def test_decompression_bomb_rejected(self):
+        response = self.client.post(
+            reverse('update_user'),
+            {'user_id': self.manager.id, 'avatar': self.photo((6000, 6000), fmt='PNG', exif=False)},
+        )
+        self.assertEqual(response.status_code, 400)
+        self.manager.refresh_from_db()
+        self.assertFalse(self.manager.avatar)
+
+    def test_profile_form_uses_pipeline(self):
+        response = self.client.post(reverse('profile'), {
+            'person_name': 'Аватар', 'preferred_contact_method': self.manager.preferred_contact_method,
+            'avatar': self.photo((300, 500)),
+        })
+        self.assertEqual(response.status_code, 302)
+        self.manager.refresh_from_db()
+        self.assertRegex(self.manager.avatar.name, r'^blobs/[0-9a-f]{2}/[0-9a-f]{2}/[0-9a-f]{64}\.webp$')
+
+
+class ProfilingMiddlewareTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.staff = User.objects.create_superuser(email='perf-staff@example.org', password='x')
+        make_computer()
+
+    def setUp(self):
+        # Каталог кэшируется — каждый тест должен видеть настоящие SQL-запросы
+        cache.clear()
+
+    def test_server_timing_only_for_staff(self):
+        self.assertNotIn('Server-Timing', self.client.get(reverse('computer_catalog')).headers)
+
+        self.client.force_login(self.staff)
+        timing = self.client.get(reverse('computer_catalog')).headers['Server-Timing']
+        self.assertRegex(timing, r'^db;dur=[\d.]+;desc="[1-9]\d* queries", tpl;dur=[\d.]+, app;dur=[\d.]+, total;dur=')
+
+    def test_normalize_sql(self):
+        self.assertEqual(
+            normalize_sql('SELECT *\n  FROM t WHERE id IN (%s, %s, %s)'),
+            'SELECT * FROM t WHERE id IN (...)',
+        )
+        self.assertEqual(
+            normalize_sql('INSERT INTO t (a, b) VALUES (%s, %s), (%s, %s)'),
+            'INSERT INTO t (a, b) VALUES (...), ...',
+        )
+
+    def test_slow_request_logged_with_plan(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'slow.log')
+            with override_settings(PROFILING_SLOW_MS=0, PROFILING_SAMPLE_RATE=1, PROFILING_LOG_FILE=path):
+                self.client.get(reverse('computer_catalog'))
+            with open(path, encoding='utf-8') as handle:
+                entry = json.loads(handle.readline())
+
+        self.assertEqual(entry['path'], reverse('computer_catalog'))
+        self.assertGreaterEqual(entry['queries'], 1)
+        select = next(s for s in entry['statements'] if s['sql'].startswith('SELECT'))
+        self.assertTrue(select['plan'])
+
+
+class AccessLogTest(SimpleTestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+        self.path = os.path.join(self.directory.name, 'access.jsonl')
+
+    def record(self, view, ms, status=200):
+        return {'time': '2026-01-01T00:00:00+00:00', 'view': view, 'status': status, 'ms': ms,
+                'queries': 2, 'bytes': 100, 'role': 'client'}
+
+    def test_rotation_by_size_keeps_backup_count(self):
+        writer = AccessLogWriter(self.path, max_bytes=200, backup_count=2, flush_interval=0.01)
+        for i in range(20):
+            writer.write(self.record('home', i))
+            time.sleep(0.02)
+        writer.close()
+        rotated = [name for name in os.listdir(self.directory.name) if name != 'access.jsonl']
+        self.assertEqual(len(rotated), 2)
+
+    def test_default_path_is_per_process(self):
+        with override_settings(BASE_DIR=self.directory.name):
+            del settings.ACCESS_LOG_FILE
+            self.assertEqual(log_path(), os.path.join(self.directory.name, 'logs', f'access.{os.getpid()}.jsonl'))
+            logs = os.path.join(self.directory.name, 'logs')
+            os.makedirs(logs)
+            names = ['access.101.jsonl', 'access.101.jsonl.20260101-000000', 'access.202.jsonl']
+            for name in names:
+                open(os.path.join(logs, name), 'w').close()
+            self.assertEqual(log_files(), [os.path.join(logs, name) for name in names])
+
+    def test_full_queue_drops_instead_of_blocking(self):
+        released = threading.Event()
+
+        class StalledWriter(AccessLogWriter):
+            # Поток не забирает записи, пока «диск» не освободится
+            def _run(self):
+                released.wait()
+                super()._run()
+
+        writer = StalledWriter(self.path, queue_size=2, flush_interval=0.01)
+        started = time.perf_counter()
+        for i in range(5):
+            writer.write(self.record('home', i))
+        self.assertLess(time.perf_counter() - started, 0.5)
+        released.set()
+        writer.close()
+
+        with open(self.path, encoding='utf-8') as handle:
+            lines = [json.loads(line) for line in handle]
+        self.assertEqual(len([line for line in lines if 'view' in line]), 2)
+        self.assertEqual(sum(line.get('dropped', 0) for line in lines), 3)
+
+    def test_stats_command_percentiles(self):
+        with open(self.path, 'w', encoding='utf-8') as handle:
+            for ms in range(1, 101):
+                handle.write(json.dumps(self.record('home', float(ms))) + '\n')
+            handle.write(json.dumps(self.record('search', 5.0, status=500)) + '\n')
+            handle.write(json.dumps({'time': '2026-01-01T00:00:00+00:00', 'dropped': 7}) + '\n')
+        out = io.StringIO()
+        call_command('access_log_stats', self.path, '--json', stdout=out)
+        report = json.loads(out.getvalue())
+
+        home = next(row for row in report['views'] if row['view'] == 'home')
+        self.assertEqual((home['count'], home['p50'], home['p95'], home['p99']), (100, 50.0, 95.0, 99.0))
+        search = next(row for row in report['views'] if row['view'] == 'search')
+        self.assertEqual(search['errors'], 1)
+        self.assertEqual(report['dropped'], 7)
+
+
+class HybridMiddlewareTest(SimpleTestCase):
+    """ProfilingMiddleware и AccessLogMiddleware в асинхронной цепочке (ASGI)."""
+    databases = {'default'}
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+        self.path = os.path.join(self.directory.name, 'access.jsonl')
+
+    def staff_request(self):
+        request = RequestFactory().get('/async/')
+        request._acached_user = User(email='async-staff@example.org', is_staff=True, role='manager')
+        return request
+
+    @staticmethod
+    async def view(request):
+        def query():
+            with connection.cursor() as cursor:
+                cursor.execute('SELECT 1')
+        await sync_to_async(query)()
+        return HttpResponse('ok')
+
+    def test_sync_chain_stays_sync(self):
+        middleware = AccessLogMiddleware(ProfilingMiddleware(lambda request: HttpResponse('ok')))
+        self.assertFalse(iscoroutinefunction(middleware))
+        self.assertFalse(iscoroutinefunction(middleware.get_response))
+
+    async def test_async_chain(self):
+        with override_settings(ACCESS_LOG_ENABLED=True, ACCESS_LOG_FILE=self.path,
+                               ACCESS_LOG_FLUSH_INTERVAL=0.01):
+            middleware = AccessLogMiddleware(ProfilingMiddleware(self.view))
+            self.assertTrue(iscoroutinefunction(middleware))
+            self.assertTrue(iscoroutinefunction(middleware.get_response))
+
+            request = self.staff_request()
+            response = await middleware(request)
+            get_writer().close()
+
+        self.assertEqual(response.content, b'ok')
+        self.assertIn('desc="1 queries"', response['Server-Timing'])
+        self.assertEqual(request.profile.db_count, 1)
+        # Обёртки SQL сняты с соединения потока, где выполнялся запрос
+        self.assertEqual(await sync_to_async(lambda: connection.execute_wrappers)(), [])
+
+        with open(self.path, encoding='utf-8') as handle:
+            entry = json.loads(handle.readline())
+        self.assertEqual((entry['path'], entry['status'], entry['queries'], entry['role']),
+                         ('/async/', 200, 1, 'manager'))
+
+    async def test_async_slow_request_captured(self):
+        path = os.path.join(self.directory.name, 'slow.log')
+        with override_settings(PROFILING_SLOW_MS=0, PROFILING_SAMPLE_RATE=1, PROFILING_LOG_FILE=path):
+            await ProfilingMiddleware(self.view)(self.staff_request())
+        with open(path, encoding='utf-8') as handle:
+            entry = json.loads(handle.readline())
+        self.assertEqual((entry['path'], entry['queries']), ('/async/', 1))
+        self.assertEqual(entry['statements'][0]['sql'], 'SELECT 1')
+
+    async def test_disabled_passes_through(self):
+        with override_settings(PROFILING_ENABLED=False):
+            request = self.staff_request()
+            response = await AccessLogMiddleware(ProfilingMiddleware(self.view))(request)
+        self.assertNotIn('Server-Timing', response)
+        self.assertFalse(hasattr(request, 'profile'))
+
+
+class SQLiteLockRetryTest(SimpleTestCase):
+    def test_write_waits_for_lock_instead_of_failing(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'db.sqlite3')
+            holder = sqlite3.connect(path, isolation_level=None, check_same_thread=False)
+            holder.execute('CREATE TABLE t (x INTEGER)')
+            holder.execute('BEGIN IMMEDIATE')
+            # busy_timeout=0: без повтора вторая запись упала бы сразу
+            writer = sqlite3.connect(path, isolation_level=None, timeout=0)
+            threading.Timer(0.1, holder.execute, ['COMMIT']).start()
+
+            cursor = writer.cursor(factory=RetryingCursorWrapper)
+            cursor.retry = {'attempts': 10, 'base_delay': 0.02, 'max_delay': 0.1}
+            cursor.execute('INSERT INTO t (x) VALUES (%s)', [1])
+
+            self.assertEqual(writer.execute('SELECT count(*) FROM t').fetchone(), (1,))
+            writer.close()
+            holder.close()
+
+
+@override_settings(REPLICA_MAX_LAG=30)
+class ReplicaRouterTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.router = ReplicaRouter()
+
+    def read_alias(self, cookies=None, write=False, before=None):
+        """Куда вьюха с @use_replica прочитала бы компьютеры."""
+        @use_replica
+        def view(request):
+            if write:
+                self.router.db_for_write(Computer)
+            if before is not None:
+                before()
+            return HttpResponse(self.router.db_for_read(Computer) or 'default')
+
+        request = RequestFactory().get('/')
+        request.COOKIES.update(cookies or {})
+        return view(request).content.decode()
+
+    def test_fresh_replica_serves_reads(self):
+        cache.set(SYNCED_AT_KEY, time.time())
+        self.assertEqual(self.read_alias(), 'replica')
+
+    def test_stale_or_unsynced_replica_falls_back_to_primary(self):
+        self.assertEqual(self.read_alias(), 'default')
+        cache.set(SYNCED_AT_KEY, time.time() - 31)
+        self.assertEqual(self.read_alias(), 'default')
+
+    def test_own_recent_write_pins_reads_to_primary(self):
+        synced_at = time.time()
+        cache.set(SYNCED_AT_KEY, synced_at)
+        self.assertEqual(self.read_alias({WRITE_COOKIE: str(synced_at + 1)}), 'default')
+        self.assertEqual(self.read_alias({WRITE_COOKIE: str(synced_at - 1)}), 'replica')
+
+    def test_write_in_request_switches_to_primary(self):
+        cache.set(SYNCED_AT_KEY, time.time())
+        self.assertEqual(self.read_alias(write=True), 'default')
+
+    def test_facets_read_primary_without_pinning_request(self):
+        cache.set(SYNCED_AT_KEY, time.time())
+        self.assertEqual(self.read_alias(before=catalog_facets.compute_facets), 'replica')
+
+    def test_reads_outside_decorated_views_use_primary(self):
+        cache.set(SYNCED_AT_KEY, time.time())
+        self.assertIsNone(self.router.db_for_read(Computer))
+
+    def test_post_sets_stickiness_cookie(self):
+        response = self.client.post(reverse('home'))
+        self.assertIn(WRITE_COOKIE, response.cookies)
+        self.assertNotIn(WRITE_COOKIE, self.client.get(reverse('home')).cookies)
+
+    async def test_stickiness_in_async_chain(self):
+        async def view(request):
+            return HttpResponse('ok')
+
+        middleware = ReplicaStickinessMiddleware(view)
+        self.assertTrue(iscoroutinefunction(middleware))
+        response = await middleware(RequestFactory().post('/'))
+        self.assertIn(WRITE_COOKIE, response.cookies)
+        response = await middleware(RequestFactory().get('/'))
+        self.assertNotIn(WRITE_COOKIE, response.cookies)
+        self.assertFalse(iscoroutinefunction(ReplicaStickinessMiddleware(lambda request: HttpResponse('ok'))))
+
+    def test_refresh_command_marks_sync_time(self):
+        before = time.time()
+        call_command('refresh_replica', stdout=io.StringIO())
+        self.assertGreaterEqual(cache.get(SYNCED_AT_KEY), before)
+
+
+@override_settings(CACHES={
+    'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'twotier-default'},
+    'shared': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'twotier-shared'},
+})
+class TwoTierCacheTest(SimpleTestCase):
+    """Два экземпляра TwoTierCache над одним общим кэшем — как два процесса."""
+
+    def setUp(self):
+        caches['shared'].clear()
+        self.first, self.second = self.make_cache(), self.make_cache()
+
+    def make_cache(self):
+        return TwoTierCache('', {'OPTIONS': {'SHARED': 'shared', 'INVALIDATION_INTERVAL': 0, 'LOCK_TIMEOUT': 5}})
+
+    def test_get_or_set_computes_once_across_threads(self):
+        calls = []
+
+        def build():
+            calls.append(1)
+            time.sleep(0.05)
+            return 'готово'
+
+        results = []
+        threads = [
+            threading.Thread(target=lambda: results.append(self.first.get_or_set('facets', build)))
+            for _ in range(5)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(results, ['готово'] * 5)
+        self.assertEqual(len(calls), 1)
+
+    def test_get_or_set_waits_for_other_process(self):
+        # Первый «процесс» взял блокировку и считает значение
+        self.assertTrue(caches['shared'].add(LOCK_PREFIX + 'facets', 1))
+        timer = threading.Timer(0.05, lambda: self.first.set('facets', 'чужое'))
+        timer.start()
+        try:
+            value = self.second.get_or_set('facets', lambda: self.fail('значение считается дважды'))
+        finally:
+            timer.join()
+        self.assertEqual(value, 'чужое')
+        self.assertEqual(self.second.stats()['waits'], 1)
+
+    def test_ordinary_writes_keep_other_lru(self):
+        self.second.set('facets', 1)
+        self.assertEqual(self.first.get('facets'), 1)
+        epoch = caches['shared'].get(EPOCH_KEY)
+
+        self.second.set('facets', 2)
+        self.second.set_many({'ver:computer:1': 10, 'ver:computer:2': 20})
+        self.second.delete('catalog:facets')
+        self.assertEqual(caches['shared'].get(EPOCH_KEY), epoch)
+        # Копия живёт в чужом LRU до LOCAL_TIMEOUT
+        self.assertEqual(self.first.get('facets'), 1)
+
+    def test_version_bump_invalidates_other_lru(self):
+        self.second.set('facets', 1)
+        self.assertEqual(self.first.get('facets'), 1)
+        self.second.set('facets', 2)
+
+        self.second.delete_many(['ver:computer:1'])
+        self.assertEqual(self.first.get('facets'), 2)
+
+        self.second.invalidate(['facets'])
+        self.assertIsNone(self.first.get('facets'))
+
+    def test_local_hits_return_private_copies(self):
+        facets = {'categories': {'gaming': 1}, 'buckets': [1, 2]}
+        self.first.set('facets', facets)
+        facets['buckets'].append(3)
+
+        value = self.first.get('facets')
+        self.assertEqual(value, {'categories': {'gaming': 1}, 'buckets': [1, 2]})
+        value['categories']['gaming'] = 99
+        self.assertEqual(self.first.get('facets')['categories'], {'gaming': 1})
+        self.assertEqual(self.first.get_many(['facets'])['facets']['categories'], {'gaming': 1})
+        self.assertEqual(self.first.stats()['local_hits'], 3)
+
+    def test_login_codes_bypass_lru(self):
+        self.first.set('login_code_user@example.org', '123456', 300)
+        self.assertEqual(self.second.get('login_code_user@example.org'), '123456')
+        self.second.delete('login_code_user@example.org')
+        self.assertIsNone(self.first.get('login_code_user@example.org'))
+        self.assertEqual(self.first.stats()['local_entries'], 0)
+
+
+class UserImportTest(TestCase):
+    def setUp(self):
+        User.objects.create_user(email='ivan@old.example.org', password='x')  # person_name 'ivan'
+
+    def rows(self, count, domain='import.example.org'):
+        return [{'email': f'user{index}@{domain}', 'role': 'client'} for index in range(count)]
+
+    def test_allocator_fills_gaps_and_remembers_suffix(self):
+        allocator = PersonNameAllocator(['ivan', 'ivan1', 'ivan3'])
+        self.assertEqual([allocator.allocate('ivan') for _ in range(3)], ['ivan2', 'ivan4', 'ivan5'])
+        self.assertEqual([allocator.allocate('petr'), allocator.allocate('petr')], ['petr', 'petr1'])
+        self.assertEqual(allocator._next_suffix, {'ivan': 6, 'petr': 2})
+
+    def test_name_collisions_within_batch(self):
+        rows = [
+            {'email': 'ivan@a.example.org'},
+            {'email': 'ivan@b.example.org', 'role': 'engineer', 'department': ' Ремонт '},
+            {'email': 'x@c.example.org', 'person_name': 'ivan'},
+            {'email': 'ivan@B.EXAMPLE.ORG'},  # тот же адрес: домен приводится к нижнему регистру
+        ]
+        stats = User.objects.bulk_import(rows)
+        self.assertEqual((stats['created'], stats['skipped'], stats['errors']), (3, 1, []))
+        names = dict(User.objects.filter(email__in=['ivan@a.example.org', 'ivan@b.example.org', 'x@c.example.org'])
+                     .values_list('email', 'person_name'))
+        self.assertEqual(names, {'ivan@a.example.org': 'ivan1', 'ivan@b.example.org': 'ivan2',
+                                 'x@c.example.org': 'ivan3'})
+        engineer = User.objects.get(email='ivan@b.example.org')
+        self.assertEqual((engineer.role, engineer.department), ('engineer', 'Ремонт'))
+        self.assertFalse(engineer.has_usable_password())
+
+    def test_invalid_rows_reported_with_line_numbers(self):
+        rows = [{'email': ''}, {'email': 'not-an-email'}, {'email': 'a@x.example.org', 'role': 'boss'},
+                {'email': 'b@x.example.org', 'preferred_contact_method': 'fax'}, {'email': 'c@x.example.org'}]
+        stats = User.objects.bulk_import(rows, start=10)
+        self.assertEqual(stats['created'], 1)
+        self.assertEqual([line for line, _ in stats['errors']], [11, 12, 13, 14])
+
+    def test_reimport_is_idempotent(self):
+        rows = self.rows(5)
+        self.assertEqual(User.objects.bulk_import(rows)['created'], 5)
+        total = User.objects.count()
+        stats = User.objects.bulk_import(rows + self.rows(2, domain='more.example.org'))
+        self.assertEqual((stats['processed'], stats['created'], stats['skipped']), (7, 2, 5))
+        self.assertEqual(User.objects.count(), total + 2)
+
+    def test_batches(self):
+        progress = []
+        with CaptureQueriesContext(connection) as queries:
+            stats = User.objects.bulk_import(
+                self.rows(5), batch_size=2, progress=lambda stats: progress.append(stats['created']),
+            )
+        self.assertEqual(stats['created'], 5)
+        self.assertEqual(progress, [2, 4, 5])
+        inserts = [query['sql'] for query in queries.captured_queries if query['sql'].startswith('INSERT')]
+        self.assertEqual(len(inserts), 3)
+
+    def test_import_users_command(self):
+        with tempfile.TemporaryDirectory() as directory:
+            csv_path = os.path.join(directory, 'users.csv')
+            with open(csv_path, 'w', encoding='utf-8') as handle:
+                handle.write('email,person_name,role\n')
+                handle.write('first@cmd.example.org,,manager\nsecond@cmd.example.org,ivan,client\n')
+            jsonl_path = os.path.join(directory, 'users.jsonl')
+            with open(jsonl_path, 'w', encoding='utf-8') as handle:
+                handle.write('{"email": "skipped@cmd.example.org"}\n[1, 2]\n{"email": "third@cmd.example.org"}\n')
+
+            out, err = io.StringIO(), io.StringIO()
+            call_command('import_users', csv_path, '--batch-size', '1', stdout=out, stderr=err)
+            self.assertIn('создано 2', out.getvalue())
+            call_command('import_users', jsonl_path, '--skip', '1', stdout=out, stderr=err)
+            # Строка со списком — ошибка с номером строки файла
+            self.assertIn('Строка 2: не указан email', err.getvalue())
+
+            with open(csv_path, 'w', encoding='utf-8') as handle:
+                handle.write('name\nivan\n')
+            with self.assertRaisesMessage(CommandError, 'нет колонки email'):
+                call_command('import_users', csv_path, stdout=out)
+
+        self.assertEqual(User.objects.get(email='first@cmd.example.org').role, 'manager')
+        self.assertEqual(User.objects.get(email='second@cmd.example.org').person_name, 'ivan1')
+        self.assertTrue(User.objects.filter(email='third@cmd.example.org').exists())
+        self.assertFalse(User.objects.filter(email='skipped@cmd.example.org').exists())
+
+
+class NormalizePhoneTest(SimpleTestCase):
+    CASES = [
+        ('+7 (999) 123-45-67', '+79991234567'),
+        ('8 999 123 45 67', '+79991234567'),
+        ('8(999)1234567', '+79991234567'),
+        ('9991234567', '+79991234567'),
+        ('  +7-999-123-45-67  ', '+79991234567'),
+        ('79991234567', '+79991234567'),
+        ('+375 29 123-45-67', '+375291234567'),
+        ('+44 20 7946 0958', '+442079460958'),
+        # С явным «+» восьмёрка не заменяется
+        ('+8 999 123 45 67', '+89991234567'),
+        ('123-45-67', ''),
+        ('12345', ''),
+        ('+1234567890123456', ''),
+        ('нет телефона', ''),
+        ('', ''),
+        (None, ''),
+    ]
+
+    def test_normalize_phone(self):
+        for raw, expected in self.CASES:
+            with self.subTest(raw=raw):
+                self.assertEqual(normalize_phone(raw), expected)
+
+    def test_other_country_code(self):
+        self.assertEqual(normalize_phone('0441234567', country_code='380'), '+3800441234567')
+        # Замена 8 → код страны — только для России
+        self.assertEqual(normalize_phone('8 999 123 45 67', country_code='380'), '+89991234567')
+
+
+class KeysetPaginationTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        # Повторяющиеся цены и даты — границы страниц приходятся на равные значения первого поля
+        for index, price in enumerate([500, 100, 300, 100, 300, 100, 200]):
+            make_computer(f'ПК {index}', price=price)
+        same = timezone.now().replace(microsecond=123456)
+        Computer.objects.filter(price__lte=200).update(created_at=same)
+
+    def walk(self, ordering, limit):
+        pages, cursor = [], None
+        while True:
+            objects, cursor = keyset_page(Computer.objects.all(), ordering, cursor=cursor, limit=limit)
+            pages.append([computer.pk for computer in objects])
+            if cursor is None:
+                return pages
+
+    def test_pages_cover_ordering_exactly_once(self):
+        for ordering in (('price', 'id'), ('-price', '-id'), ('-created_at', '-id'), ('name', 'id')):
+            for limit in (1, 2, 3, 7, 10):
+                with self.subTest(ordering=ordering, limit=limit):
+                    pages = self.walk(ordering, limit)
+                    expected = list(Computer.objects.order_by(*ordering).values_list('pk', flat=True))
+                    self.assertEqual([pk for page in pages for pk in page], expected)
+                    self.assertTrue(all(len(page) == limit for page in pages[:-1]))
+
+    def test_cursor_round_trip(self):
+        moment = timezone.now().replace(microsecond=654321)
+        cursor = encode_cursor([moment, Decimal('199.90'), 42])
+        self.assertNotIn('=', cursor)
+        self.assertEqual(decode_cursor(cursor, 3), [moment.isoformat(), '199.90', 42])
+
+    def test_tampered_cursors_rejected(self):
+        cursors = [
+            '!!!', 'e30', encode_cursor([1]), encode_cursor({'price': 1, 'id': 2}),
+            encode_cursor([{}, 1]), encode_cursor([[1], 1]), encode_cursor(['x', 1]), encode_cursor([None, 1]),
+            encode_cursor(['2026-01-01T00:00:00+00:00', 'abc']),
+        ]
+        for cursor in cursors:
+            with self.subTest(cursor=cursor):
+                with self.assertRaises(InvalidCursor):
+                    keyset_page(Computer.objects.all(), ('-created_at', '-id'), cursor=cursor)
+
+    def test_tampered_cursor_is_400_in_api(self):
+        for cursor in (encode_cursor([{}, 1]), encode_cursor([None, 1])):
+            response = self.client.get(reverse('computer_list_api'), {'sort': 'newest', 'cursor': cursor})
+            self.assertEqual(response.status_code, 400)
+
+
+class FakeSMTPServer:
+    """Локальная замена SMTP для OutboxWorker: считает подключения, NOOP и письма."""
+
+    def __init__(self):
+        self.down = False
+        self.noop_code = 250
+        self.fail_sends = 0
+        self.refuse = set()
+        self.opens = self.noops = 0
+        self.sent = []
+
+    def connection(self):
+        return FakeSMTPConnection(self)
+
+
+class FakeSMTPConnection:
+    def __init__(self, server):
+        self.server = server
+        self.connection = None
+
+    def open(self):
+        self.server.opens += 1
+        if self.server.down:
+            raise ConnectionRefusedError('SMTP недоступен')
+        self.connection = self
+
+    def noop(self):
+        self.server.noops += 1
+        return self.server.noop_code, b''
+
+    def close(self):
+        self.connection = None
+
+    def send_messages(self, messages):
+        for message in messages:
+            if self.server.fail_sends:
+                self.server.fail_sends -= 1
+                raise smtplib.SMTPServerDisconnected('Соединение разорвано')
+            if message.to[0] in self.server.refuse:
+                raise smtplib.SMTPRecipientsRefused({message.to[0]: (550, b'No such user')})
+            self.server.sent.append(message)
+        return len(messages)
+
+
+@override_settings(
+    EMAIL_HOST_USER='robot@example.org', MAIL_OUTBOX_BATCH_SIZE=10, MAIL_OUTBOX_MAX_ATTEMPTS=3,
+    MAIL_OUTBOX_RETRY_BASE=30, MAIL_OUTBOX_BREAKER_THRESHOLD=2, MAIL_OUTBOX_BREAKER_COOLDOWN=60,
+)
+class MailOutboxTest(TestCase):
+    def setUp(self):
+        self.server = FakeSMTPServer()
+        self.worker = OutboxWorker(connection_factory=self.server.connection)
+        self.now = 1000.0
+        self.worker.breaker.clock = lambda: self.now
+
+    def enqueue(self, count=1, to='user@example.org'):
+        return [enqueue_email(to, 'Код', f'Ваш код: {index}', '<b>код</b>') for index in range(count)]
+
+    def test_batch_over_one_connection_clears_body(self):
+        self.enqueue(3)
+        self.assertEqual(self.worker.run_once(), (3, 0))
+        self.assertEqual(self.server.opens, 1)
+        self.assertEqual(len(self.server.sent), 3)
+        self.assertEqual(set(OutgoingEmail.objects.values_list('status', 'body', 'html_body', 'attempts')),
+                         {('sent', '', '', 1)})
+
+    def test_idle_connection_checked_with_noop(self):
+        self.enqueue()
+        self.worker.run_once()
+        self.enqueue()
+        self.worker.run_once()
+        # Живое соединение переиспользуется
+        self.assertEqual((self.server.opens, self.server.noops), (1, 1))
+
+        self.server.noop_code = 421
+        self.enqueue()
+        self.assertEqual(self.worker.run_once(), (1, 0))
+        self.assertEqual(self.server.opens, 2)
+
+    def test_retry_with_backoff_then_failed(self):
+        message, = self.enqueue()
+        self.server.fail_sends = 3
+        for attempt in (1, 2):
+            before = timezone.now()
+            self.assertEqual(self.worker.run_once(), (0, 1))
+            message.refresh_from_db()
+            self.assertEqual((message.status, message.attempts), ('pending', attempt))
+            delay = (message.next_attempt_at - before).total_seconds()
+            self.assertAlmostEqual(delay, 30 * 2 ** (attempt - 1), delta=5)
+            OutgoingEmail.objects.filter(pk=message.pk).update(next_attempt_at=timezone.now())
+            self.worker.breaker.record_success()
+        self.worker.run_once()
+        message.refresh_from_db()
+        self.assertEqual((message.status, message.attempts), ('failed', 3))
+        self.assertIn('Соединение разорвано', message.last_error)
+
+    def test_refused_recipient_keeps_connection(self):
+        self.enqueue(to='bad@example.org')
+        self.enqueue(to='good@example.org')
+        self.server.refuse.add('bad@example.org')
+        self.assertEqual(self.worker.run_once(), (1, 1))
+        self.assertEqual(self.server.opens, 1)
+        self.assertEqual(OutgoingEmail.objects.get(to='bad@example.org').status, 'pending')
+
+    def test_circuit_breaker_opens_and_closes(self):
+        message, = self.enqueue()
+        self.server.down = True
+        self.assertEqual(self.worker.run_once(), (0, 1))
+        self.assertEqual(self.worker.run_once(), (0, 1))
+        self.assertTrue(self.worker.breaker.is_open)
+        # Письмо возвращено в очередь без траты попыток
+        message.refresh_from_db()
+        self.assertEqual((message.status, message.attempts), ('pending', 0))
+
+        # Пока размыкатель открыт, SMTP не трогаем
+        OutgoingEmail.objects.update(next_attempt_at=timezone.now())
+        self.assertEqual(self.worker.run_once(), (0, 0))
+        self.assertEqual(self.server.opens, 2)
+
+        # После паузы — одна пробная попытка; удачная замыкает размыкатель
+        self.now += 60
+        self.server.down = False
+        self.assertEqual(self.worker.run_once(), (1, 0))
+        self.assertFalse(self.worker.breaker.is_open)
+        self.assertEqual(self.worker.breaker.failures, 0)
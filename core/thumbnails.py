@@ -0,0 +1,179 @@
+# core/thumbnails.py
+"""
+Уменьшенные копии изображений компьютеров для srcset.
+
+Для каждой ширины из THUMBNAIL_WIDTHS (но не шире оригинала) рядом с
+оригиналом сохраняются JPEG и WebP:
+
+    computers/2026/01/05/photo.jpg       — оригинал
+    computers/2026/01/05/photo.w320.jpg
+    computers/2026/01/05/photo.w320.webp
+    ...
+
+Какие ширины готовы, записано в ComputerImage.variants вместе с именем
+оригинала: {'name': ..., 'widths': [320, 640]}. Если оригинал заменили
+(например, в админке), имя не совпадёт и копии считаются отсутствующими —
+шаблоны и API тогда отдают оригинал.
+
+Копии строит сигнал post_save ComputerImage (загрузка через дашборд и
+админку), а для уже загруженных изображений — команда build_thumbnails,
+которая раскладывает работу по процессам.
+
+Настройки (все необязательные):
+    THUMBNAIL_WIDTHS        — ширины копий, px ((320, 640, 1280));
+    THUMBNAIL_JPEG_QUALITY  — качество JPEG (82);
+    THUMBNAIL_WEBP_QUALITY  — качество WebP (80).
+"""
+import io
+import logging
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import connections
+from PIL import Image, ImageOps
+
+from .http_cache import bump_version, bump_versions
+
+logger = logging.getLogger(__name__)
+
+FORMATS = {'jpeg': '.jpg', 'webp': '.webp'}
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+def variant_name(name, width, fmt):
+    root, _ = os.path.splitext(name)
+    return f'{root}.w{width}{FORMATS[fmt]}'
+
+
+def ready_widths(image):
+    """Ширины готовых копий ComputerImage; пустой список — копий нет или они от другого оригинала."""
+    variants = image.variants or {}
+    if not image.image or variants.get('name') != image.image.name:
+        return []
+    return variants.get('widths', [])
+
+
+def srcset(image, fmt='jpeg'):
+    """Значение атрибута srcset ('' — копий нет)."""
+    return ', '.join(
+        f'{default_storage.url(variant_name(image.image.name, width, fmt))} {width}w'
+        for width in ready_widths(image)
+    )
+
+
+def thumbnail_url(image, fmt='jpeg'):
+    """Самая маленькая копия (для миниатюр галереи), иначе оригинал."""
+    widths = ready_widths(image)
+    if not widths:
+        return image.image.url
+    return default_storage.url(variant_name(image.image.name, widths[0], fmt))
+
+
+def _encode(picture, fmt):
+    buffer = io.BytesIO()
+    if fmt == 'jpeg':
+        picture.save(buffer, 'JPEG', quality=_setting('THUMBNAIL_JPEG_QUALITY', 82), optimize=True, progressive=True)
+    else:
+        picture.save(buffer, 'WEBP', quality=_setting('THUMBNAIL_WEBP_QUALITY', 80), method=4)
+    return buffer.getvalue()
+
+
+def build_variants(name, storage=default_storage):
+    """
+    Строит копии оригинала name; возвращает значение для ComputerImage.variants.
+    Существующие файлы копий перезаписываются.
+    """
+    with storage.open(name, 'rb') as handle:
+        original = Image.open(handle)
+        original = ImageOps.exif_transpose(original)
+        original = original.convert('RGB')
+
+    widths = sorted({min(width, original.width) for width in _setting('THUMBNAIL_WIDTHS', (320, 640, 1280))})
+    for width in widths:
+        height = max(round(original.height * width / original.width), 1)
+        picture = original if width == original.width else original.resize((width, height), Image.LANCZOS)
+        for fmt in FORMATS:
+            target = variant_name(name, width, fmt)
+            if storage.exists(target):
+                storage.delete(target)
+            storage.save(target, ContentFile(_encode(picture, fmt)))
+    return {'name': name, 'widths': widths}
+
+
+def build_for(image):
+    """
+    Строит копии для ComputerImage и сохраняет variants без сигналов.
+    Ошибка (битый файл и т.п.) только логируется: тогда отдаётся оригинал.
+    """
+    try:
+        variants = build_variants(image.image.name)
+    except (OSError, ValueError, Image.DecompressionBombError) as e:
+        logger.warning("Не удалось построить копии изображения %s: %s", image.image.name, e)
+        return False
+    type(image).objects.filter(pk=image.pk).update(variants=variants)
+    image.variants = variants
+    return True
+
+
+def _build_worker(item):
+    pk, name = item
+    try:
+        return pk, build_variants(name), None
+    except Exception as e:
+        return pk, None, f'{name}: {e}'
+
+
+def _init_worker():
+    # Со spawn дочерний процесс начинает с нуля; с fork повторный setup ничего не делает
+    import django
+    django.setup()
+
+
+def backfill(workers=1, force=False, progress=None):
+    """
+    Строит копии для изображений без них (force — для всех), раскладывая
+    обработку по workers процессам. Записи в базу делает только текущий
+    процесс. Возвращает (сколько построено, список ошибок).
+    """
+    from .models import ComputerImage  # models импортирует этот модуль
+
+    pending = [
+        image for image in ComputerImage.objects.only('id', 'computer_id', 'image', 'variants').order_by('pk')
+        if image.image and (force or not ready_widths(image))
+    ]
+    items = [(image.pk, image.image.name) for image in pending]
+    computer_ids = {image.pk: image.computer_id for image in pending}
+
+    built, failed, touched = 0, [], set()
+
+    def collect(results):
+        nonlocal built
+        for pk, variants, error in results:
+            if error:
+                failed.append(error)
+            else:
+                ComputerImage.objects.filter(pk=pk).update(variants=variants)
+                touched.add(computer_ids[pk])
+                built += 1
+            if progress is not None:
+                progress(built + len(failed), len(items))
+
+    if workers > 1 and len(items) > 1:
+        # Соединения SQLite не переживают fork — дочерние процессы базу не трогают вовсе
+        connections.close_all()
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as pool:
+            collect(pool.map(_build_worker, items, chunksize=4))
+    else:
+        collect(map(_build_worker, items))
+
+    # update() не шлёт сигналов: карточки каталога и JSON компьютеров сбрасываем сами
+    if touched:
+        bump_versions('computer', touched)
+        bump_version('computer_catalog')
+    return built, failed
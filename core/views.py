@@ -1,11 +1,10 @@
+import hashlib
 import random
-import smtplib
 from venv import logger
 from django.shortcuts import render, redirect, get_object_or_404
 from django.http import HttpResponse, JsonResponse
 from django.contrib.auth import authenticate, login, logout
 from django.contrib.auth import get_user_model
-from django.core.mail import send_mail
 from django.contrib.auth.decorators import login_required
 from django import forms
 from .models import User
@@ -13,13 +12,27 @@ from django.contrib import messages
 from django.conf import settings
 from .models import Computer
 from django.template.loader import render_to_string
-from django.core.mail import get_connection
+from django.core.files.uploadedfile import UploadedFile
 from django.core.cache import cache  # <-- Импортируем кэш
+from django.templatetags.static import static
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from .http_cache import cached_json_response, version_key
+from .avatars import process_avatar, store_avatar
+from .catalog_cache import CATALOG_VERSION_KEY, cached_page, catalog_etag, render_cards, store_page
+from .catalog_api import (
+    CATALOG_SORTS, CatalogQueryError, apply_filters, parse_filters, parse_ids, parse_page, serialize_computer,
+)
+from .catalog_facets import facets_payload, get_facets
+from .pagination import InvalidCursor, keyset_page
+from .mail_outbox import enqueue_email
+from ServiceRequest.search import MIN_TERM_LENGTH, search_requests
 
 
 def _send_beautiful_email(email, code, subject, title, body_text):
     """
     Вспомогательная функция для отправки красивого HTML-письма.
+    Письмо только ставится в очередь: SMTP-соединением занимается
+    воркер manage.py send_queued_mail, запрос не ждёт почтовый сервер.
     """
     html_message = render_to_string(
         'email_template.html',
@@ -30,33 +43,10 @@ def _send_beautiful_email(email, code, subject, title, body_text):
         }
     )
 
-    try:
-        if not all([settings.EMAIL_HOST_USER, settings.EMAIL_HOST_PASSWORD, settings.EMAIL_HOST]):
-            raise Exception("Настройки EMAIL в settings.py неполные или отсутствуют.")
-
-        connection = get_connection()
-        connection.open()
-
-        send_mail(
-            subject,
-            f'{body_text}: {code}',
-            settings.EMAIL_HOST_USER,
-            [email],
-            html_message=html_message,
-            fail_silently=False,
-            connection=connection
-        )
-    except smtplib.SMTPAuthenticationError:
-        raise Exception(
-            "Ошибка аутентификации SMTP. Проверьте EMAIL_HOST_USER и EMAIL_HOST_PASSWORD. Возможно, вам нужно создать пароль приложения для Google.")
-    except smtplib.SMTPException as e:
-        raise Exception(
-            f"Ошибка SMTP: {e}. Возможно, порт или хост настроены неверно, или брандмауэр блокирует соединение.")
-    except Exception as e:
-        raise Exception(f"Неизвестная ошибка при отправке письма: {e}")
-    finally:
-        if 'connection' in locals():
-            connection.close()
+    if not all([settings.EMAIL_HOST_USER, settings.EMAIL_HOST_PASSWORD, settings.EMAIL_HOST]):
+        raise Exception("Настройки EMAIL в settings.py неполные или отсутствуют.")
+
+    enqueue_email(email, subject, f'{body_text}: {code}', html_message)
 
 
 # === Вход через email ===
@@ -243,29 +233,49 @@ def my_view(request):
         return HttpResponse("Привет, аноним. Пожалуйста, войди.")
 
 
+def _catalog_context():
+    # Фасеты из кэша, пересчитываются по изменениям (catalog_facets.py)
+    return {'cards': render_cards(), 'facets': facets_payload(get_facets())}
+
+
 def computer_catalog(request):
-    computers = Computer.objects.filter(is_available=True)
-    return render(request, 'catalog/catalog.html', {'computers': computers})
+    # Аноним без cookie сессии: вся страница берётся из кэша, база не нужна (см. catalog_cache.py)
+    if settings.SESSION_COOKIE_NAME in request.COOKIES:
+        return render(request, 'catalog/catalog.html', _catalog_context())
+
+    etag = catalog_etag()
+    response = get_conditional_response(request, etag=etag)
+    if response is None:
+        content = cached_page(etag)
+        if content is None:
+            content = render(request, 'catalog/catalog.html', _catalog_context()).content
+            store_page(etag, content)
+        response = HttpResponse(content)
+    response['ETag'] = etag
+    # Страница одна на всех анонимов, но после входа шапка другая
+    patch_vary_headers(response, ['Cookie'])
+    return response
 
 def computer_api_detail(request, computer_id):
-    computer = get_object_or_404(Computer, id=computer_id, is_available=True)
-
-    # Собираем данные в словарь
-    data = {
-        'id': computer.id,
-        'name': computer.name,
-        'price': computer.get_price_display(),
-        'short_description': computer.short_description,
-        'full_description': computer.full_description,
-        'processor': computer.processor,
-        'graphics_card': computer.graphics_card,
-        'ram': computer.ram,
-        'storage': computer.storage,
-        'power_supply': computer.power_supply,
-        'case': computer.case,
-        'cooling': computer.cooling,
-        'operating_system': computer.operating_system or 'Не установлена',
-        'specs': f"""
+    def build():
+        computer = get_object_or_404(Computer, id=computer_id, is_available=True)
+
+        # Собираем данные в словарь
+        data = {
+            'id': computer.id,
+            'name': computer.name,
+            'price': computer.get_price_display(),
+            'short_description': computer.short_description,
+            'full_description': computer.full_description,
+            'processor': computer.processor,
+            'graphics_card': computer.graphics_card,
+            'ram': computer.ram,
+            'storage': computer.storage,
+            'power_supply': computer.power_supply,
+            'case': computer.case,
+            'cooling': computer.cooling,
+            'operating_system': computer.operating_system or 'Не установлена',
+            'specs': f"""
             <strong>Процессор:</strong> {computer.processor}<br>
             <strong>Видеокарта:</strong> {computer.graphics_card}<br>
             <strong>Оперативная память:</strong> {computer.ram}<br>
@@ -275,30 +285,120 @@ def computer_api_detail(request, computer_id):
             <strong>Охлаждение:</strong> {computer.cooling}<br>
             <strong>ОС:</strong> {computer.operating_system or 'Не установлена'}
         """,
-        'images': [
-            {
-                'image': img.image.url,
-                'is_main': img.is_main,
-                'order': img.order
-            } for img in computer.images.all().order_by('order')
-        ] or [
-            {
-                'image': request.build_absolute_uri(static('images/default_computer.png')),
-                'is_main': True,
-                'order': 0
-            }
-        ]
-    }
+            'images': [
+                {
+                    'image': img.image.url,
+                    'thumbnail': img.thumbnail_url,
+                    'srcset': img.srcset,
+                    'webp_srcset': img.webp_srcset,
+                    'is_main': img.is_main,
+                    'order': img.order
+                } for img in computer.images.all().order_by('order')
+            ] or [
+                {
+                    'image': request.build_absolute_uri(static('images/default_computer.png')),
+                    'is_main': True,
+                    'order': 0
+                }
+            ]
+        }
+        return data, computer.updated_at, None
+
+    # Хост входит в ключ: заглушка изображения отдаётся абсолютным URL
+    return cached_json_response(
+        request,
+        f'computer_api_detail:{request.get_host()}',
+        [version_key('computer', computer_id)],
+        build,
+    )
+
 
-    return JsonResponse(data, json_dumps_params={'ensure_ascii': False})
+def _is_staff(user):
+    return user.is_authenticated and (user.is_staff or user.role in ('engineer', 'manager', 'admin'))
+
+
+def computer_list_api(request):
+    """
+    Список компьютеров каталога с фильтрами, сортировкой и курсорной пагинацией;
+    ?ids=1,2,3 — пакетный режим для сравнения (порядок как в запросе). Параметры —
+    в core/catalog_api.py. Изображения всех компьютеров страницы — одним запросом.
+    """
+    try:
+        filters = parse_filters(request.GET)
+        ids = parse_ids(request.GET['ids']) if 'ids' in request.GET else None
+        sort, limit, cursor = (None, None, None) if ids else parse_page(request.GET)
+    except CatalogQueryError as e:
+        return JsonResponse({'error': str(e)}, status=400, json_dumps_params={'ensure_ascii': False})
+    # Снятые с продажи видят только сотрудники; для обычного запроса пользователь не загружается
+    if filters['available'] != 'true' and not _is_staff(request.user):
+        return JsonResponse({'error': 'Доступ запрещён'}, status=403, json_dumps_params={'ensure_ascii': False})
+
+    queryset = apply_filters(Computer.objects.all(), filters).prefetch_related('images')
+
+    def build():
+        if ids:
+            found = {computer.id: computer for computer in queryset.filter(id__in=ids)}
+            computers = [found[pk] for pk in ids if pk in found]
+            data = {'results': [], 'missing': [pk for pk in ids if pk not in found]}
+        else:
+            try:
+                computers, next_cursor = keyset_page(queryset, CATALOG_SORTS[sort], cursor=cursor, limit=limit)
+            except InvalidCursor as e:
+                return JsonResponse({'error': str(e)}, status=400, json_dumps_params={'ensure_ascii': False})
+            data = {'sort': sort, 'results': [], 'next_cursor': next_cursor}
+        data['results'] = [serialize_computer(computer) for computer in computers]
+        last_modified = max((computer.updated_at for computer in computers), default=None)
+        return data, last_modified, None
+
+    # Ответ зависит только от параметров (доступ проверен выше) — ключ общий для всех пользователей
+    params = repr((filters, ids, sort, limit, cursor))
+    return cached_json_response(
+        request,
+        f'computer_list_api:{hashlib.md5(params.encode()).hexdigest()}',
+        [CATALOG_VERSION_KEY],
+        build,
+    )
+
+
+def catalog_facets_api(request):
+    """Счётчики по категориям, доступности и гистограмма цен для панели фильтров."""
+    def build():
+        return facets_payload(get_facets()), None, None
+
+    return cached_json_response(request, 'catalog_facets_api', [CATALOG_VERSION_KEY], build)
 
 
 def contact(request):
     return render(request, "contact/contact.html")
 
 
+SEARCH_PAGE_SIZE = 20
+
+
 def search(request):
-    return render(request, "search/search.html")
+    """Поиск заявок по индексу FTS5; первая страница рендерится сервером, дальше — через API."""
+    query = request.GET.get('q', '').strip()
+    context = {'query': query, 'min_length': MIN_TERM_LENGTH}
+
+    if request.user.is_authenticated and query:
+        try:
+            page = max(int(request.GET.get('page', 1)), 1)
+        except ValueError:
+            page = 1
+        user = request.user
+        # Сотрудники ищут по всем заявкам, клиенты — только по своим
+        staff = user.is_staff or user.role in ('engineer', 'manager', 'admin')
+        results, total = search_requests(
+            query, owner_id=None if staff else user.id, page=page, page_size=SEARCH_PAGE_SIZE
+        )
+        context.update({
+            'results': results,
+            'total': total,
+            'page': page,
+            'has_prev': page > 1,
+            'has_next': page * SEARCH_PAGE_SIZE < total,
+        })
+    return render(request, "search/search.html", context)
 
 def create_request(request):
     return render(request, "request/request.html")
@@ -343,9 +443,18 @@ def profile(request):
                 })
             }
 
+        def clean_avatar(self):
+            avatar = self.cleaned_data.get('avatar')
+            # Новый файл перекодируется (core/avatars.py); уже сохранённый аватар не трогаем
+            if isinstance(avatar, UploadedFile):
+                self.rendered_avatar = process_avatar(avatar)
+            return avatar
+
     if request.method == 'POST':
         form = ProfileForm(request.POST, request.FILES, instance=user)
         if form.is_valid():
+            if getattr(form, 'rendered_avatar', None):
+                store_avatar(user, form.rendered_avatar)
             form.save()
             messages.success(request, 'Профиль успешно обновлён!')
             return redirect('profile')
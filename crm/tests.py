@@ -1,3 +1,149 @@
-from django.test import TestCase
+import json
 
-# Create your tests here.
+from django.contrib.auth import get_user_model
+from django.urls import reverse
+
+from core.models import Computer, ComputerImage
+from core.testing import EndpointBenchmarkTestCase
+from core.tests import route_names
+from ServiceRequest.models import ServiceRequest, Tag
+
+from . import urls as crm_urls
+
+User = get_user_model()
+
+
+class CrmEndpointsTest(EndpointBenchmarkTestCase):
+    """Маршруты crm/urls.py (панель сотрудников под /system/)."""
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.admin = User.objects.create_superuser(email='perf-admin@example.org', password='x', role='admin')
+        cls.client_user = User.objects.filter(role='client').first()
+        cls.service_request = ServiceRequest.objects.order_by('-id').first()
+        cls.computer = Computer.objects.first()
+
+    def setUp(self):
+        super().setUp()
+        self.client.force_login(self.admin)
+
+    def post_json(self, name, path, payload, **kwargs):
+        return self.benchmark(
+            name, path, method='post', data=json.dumps(payload), content_type='application/json', **kwargs
+        )
+
+    def test_every_route_is_benchmarked(self):
+        missing = sorted(name for name in route_names(crm_urls.urlpatterns) if not hasattr(self, f'test_{name}'))
+        self.assertEqual(missing, [], "Для этих маршрутов нет нагрузочного теста")
+
+    def test_crm(self):
+        self.benchmark('crm', reverse('crm'), max_queries=3)
+
+    def test_get_user_data(self):
+        self.benchmark('get_user_data', reverse('get_user_data', args=[self.client_user.id]), max_queries=3)
+
+    def test_update_user(self):
+        self.benchmark(
+            'update_user', reverse('update_user'), method='post', max_queries=4,
+            data={'user_id': self.client_user.id, 'job_title': 'Бухгалтер'},
+        )
+
+    def test_toggle_user(self):
+        self.benchmark(
+            'toggle_user', reverse('toggle_user'), method='post', max_queries=4,
+            data={'user_id': self.client_user.id},
+        )
+
+    def test_user_self(self):
+        self.benchmark('user_self', reverse('user_self'), max_queries=3)
+
+    def test_cache_stats(self):
+        self.benchmark('cache_stats', reverse('cache_stats'), max_queries=2)
+
+    def test_create_service_request(self):
+        self.benchmark('create_service_request', reverse('create_service_request'), max_queries=2)
+
+    def test_request_board_api(self):
+        self.benchmark('request_board_api', reverse('request_board_api') + '?status=waiting', max_queries=3)
+
+    def test_request_counters_api(self):
+        self.benchmark('request_counters_api', reverse('request_counters_api'), max_queries=3)
+
+    def test_search_requests_api(self):
+        self.benchmark('search_requests_api', reverse('search_requests_api') + '?q=Иванов', max_queries=5)
+
+    def test_customer_history_api(self):
+        self.benchmark(
+            'customer_history_api',
+            reverse('customer_history_api') + f'?phone={self.service_request.phone_key}'
+            f'&email={self.service_request.email}',
+            max_queries=3,
+        )
+
+    def test_request_events_stream(self):
+        # Под WSGI тестового клиента поток не открывается — отвечает 204
+        self.benchmark('request_events_stream', reverse('request_events_stream'), status=204, max_queries=2)
+
+    def test_service_request_api(self):
+        self.benchmark(
+            'service_request_api', reverse('service_request_api', args=[self.service_request.id]), max_queries=6,
+        )
+
+    def test_update_service_request(self):
+        # save() перечитывает ключ счётчика под блокировкой строки — +1 запрос
+        self.post_json(
+            'update_service_request', reverse('update_service_request', args=[self.service_request.id]),
+            {'status': 'working', 'tags': [Tag.objects.first().code]}, max_queries=14,
+        )
+
+    def test_bulk_update_service_requests(self):
+        ids = list(ServiceRequest.objects.order_by('id').values_list('id', flat=True)[:100])
+        self.post_json(
+            'bulk_update_service_requests', reverse('bulk_update_service_requests'),
+            # Счётчики обновляются отдельным UPDATE на каждое сочетание статуса, устройства и типа заказчика
+            {'ids': ids, 'status': 'working', 'tags': {'add': [Tag.objects.first().code]}}, max_queries=60,
+        )
+
+    def test_computer_dashboard(self):
+        # Холодный кэш: сессия, пользователь, фасеты (один агрегирующий запрос), компьютеры, изображения
+        self.benchmark('computer_dashboard', reverse('computer_dashboard'), max_queries=5)
+
+    def test_computer_save(self):
+        self.benchmark(
+            'computer_save', reverse('computer_save'), method='post', max_queries=5,
+            data={
+                'id': self.computer.id,
+                'name': self.computer.name,
+                'category': self.computer.category,
+                'short_description': self.computer.short_description,
+                'full_description': self.computer.full_description,
+                'price': '99990',
+                'is_available': 'on',
+                'processor': self.computer.processor,
+                'graphics_card': self.computer.graphics_card,
+                'ram': self.computer.ram,
+                'storage': self.computer.storage,
+                'power_supply': self.computer.power_supply,
+                'case': self.computer.case,
+                'cooling': self.computer.cooling,
+                'operating_system': self.computer.operating_system,
+            },
+        )
+
+    def test_computer_delete(self):
+        self.post_json(
+            'computer_delete', reverse('computer_delete'), {'id': self.computer.id}, max_queries=6, repeat=1,
+        )
+        self.assertFalse(Computer.objects.filter(id=self.computer.id).exists())
+
+    def test_computer_delete_image(self):
+        image = ComputerImage.objects.first()
+        self.post_json(
+            'computer_delete_image', reverse('computer_delete_image'), {'image_id': image.id},
+            max_queries=4, repeat=1,
+        )
+        self.assertFalse(ComputerImage.objects.filter(id=image.id).exists())
+
+    def test_computer_data(self):
+        self.benchmark('computer_data', reverse('computer_data', args=[self.computer.id]), max_queries=4)
@@ -12,10 +12,17 @@ urlpatterns = [
     path('api/user/update/', views.update_user, name='update_user'),
     path('api/user/toggle/', views.toggle_user, name='toggle_user'),
     path('api/user/self/', views.user_self, name='user_self'),
+    path('api/cache-stats/', views.cache_stats, name='cache_stats'),
     path('request/', ServiceRequest_views.request_list, name='create_service_request'),
+    path('api/service-requests/board/', ServiceRequest_views.request_board_api, name='request_board_api'),
+    path('api/service-requests/counters/', ServiceRequest_views.request_counters_api, name='request_counters_api'),
+    path('api/service-requests/search/', ServiceRequest_views.search_requests_api, name='search_requests_api'),
+    path('api/service-requests/history/', ServiceRequest_views.customer_history_api, name='customer_history_api'),
+    path('api/service-requests/events/', ServiceRequest_views.request_events_stream, name='request_events_stream'),
     path('api/service-requests/<int:request_id>/', ServiceRequest_views.service_request_api, name='service_request_api'),
     path('api/service-requests/<int:request_id>/', ServiceRequest_views.service_request_api, name='service_request_api'),
     path('api/service-requests/<int:pk>/update/', ServiceRequest_views.update_service_request, name='update_service_request'),
+    path('api/service-requests/bulk-update/', ServiceRequest_views.bulk_update_service_requests, name='bulk_update_service_requests'),
     path('catalog/', ServiceRequest_views.computer_dashboard, name='computer_dashboard'),
     path('catalog/save/', ServiceRequest_views.computer_save, name='computer_save'),
     path('catalog/delete/', ServiceRequest_views.computer_delete, name='computer_delete'),
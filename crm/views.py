@@ -2,14 +2,21 @@
 from django.http import JsonResponse
 from django.views.decorators.csrf import csrf_exempt
 from django.contrib.auth.decorators import login_required
-from django.core.exceptions import PermissionDenied
+from django.core.exceptions import PermissionDenied, ValidationError
 from django.shortcuts import get_object_or_404, render
 from django.contrib.auth import get_user_model
+from django.core.cache import cache
 import json
+import os
+
+from core.avatars import process_avatar, small_avatar_url, store_avatar
+from core.http_cache import cached_json_response, version_key
+from core.db_router import use_replica
 
 User = get_user_model()
 
 @login_required
+@use_replica
 def crm(request):
     allowed_roles = ['engineer', 'manager', 'admin']
     if not request.user.is_staff and request.user.role not in allowed_roles:
@@ -21,25 +28,28 @@ def crm(request):
 
 @login_required
 def user_self(request):
-    # Принудительно получаем свежие данные из БД
-    user = User.objects.get(id=request.user.id)
-
-    return JsonResponse({
-        'id': user.id,
-        'person_name': user.person_name,
-        'email': user.email,
-        'phone_number': user.phone_number,
-        'address': user.address,
-        'role': user.role,
-        'job_title': user.job_title,
-        'department': user.department,
-        'work_schedule': user.work_schedule,
-        'preferred_contact_method': user.preferred_contact_method,
-        'avatar': user.avatar.url if user.avatar else None,
-        'is_active': user.is_active,
-        'created_at': user.created_at.isoformat() if user.created_at else None,
-        'last_login': user.last_login.isoformat() if user.last_login else None,
-    })
+    def build():
+        # Принудительно получаем свежие данные из БД (только при промахе кэша)
+        user = User.objects.get(id=request.user.id)
+        return {
+            'id': user.id,
+            'person_name': user.person_name,
+            'email': user.email,
+            'phone_number': user.phone_number,
+            'address': user.address,
+            'role': user.role,
+            'job_title': user.job_title,
+            'department': user.department,
+            'work_schedule': user.work_schedule,
+            'preferred_contact_method': user.preferred_contact_method,
+            'avatar': small_avatar_url(user),
+            'avatar_large': user.avatar.url if user.avatar else None,
+            'is_active': user.is_active,
+            'created_at': user.created_at.isoformat() if user.created_at else None,
+            'last_login': user.last_login.isoformat() if user.last_login else None,
+        }, user.updated_at, None
+
+    return cached_json_response(request, 'user_self', [version_key('user', request.user.id)], build)
 
 
 # Получение данных пользователя
@@ -48,20 +58,24 @@ def get_user_data(request, user_id):
     if not request.user.is_staff and request.user.role not in ['manager', 'admin']:
         return JsonResponse({'error': 'Доступ запрещён'}, status=403)
 
-    user = get_object_or_404(User, id=user_id)
-    return JsonResponse({
-        'id': user.id,
-        'person_name': user.person_name,
-        'email': user.email,
-        'phone_number': user.phone_number,
-        'address': user.address,
-        'role': user.role,
-        'job_title': user.job_title,
-        'department': user.department,
-        'work_schedule': user.work_schedule,
-        'preferred_contact_method': user.preferred_contact_method,
-        'avatar': user.avatar.url if user.avatar else None,
-    })
+    def build():
+        user = get_object_or_404(User, id=user_id)
+        return {
+            'id': user.id,
+            'person_name': user.person_name,
+            'email': user.email,
+            'phone_number': user.phone_number,
+            'address': user.address,
+            'role': user.role,
+            'job_title': user.job_title,
+            'department': user.department,
+            'work_schedule': user.work_schedule,
+            'preferred_contact_method': user.preferred_contact_method,
+            'avatar': small_avatar_url(user),
+            'avatar_large': user.avatar.url if user.avatar else None,
+        }, user.updated_at, None
+
+    return cached_json_response(request, 'get_user_data', [version_key('user', user_id)], build)
 
 
 # Обновление пользователя
@@ -86,7 +100,10 @@ def update_user(request):
         user.preferred_contact_method = request.POST.get('preferred_contact_method', user.preferred_contact_method)
 
         if 'avatar' in request.FILES:
-            user.avatar = request.FILES['avatar']
+            try:
+                store_avatar(user, process_avatar(request.FILES['avatar']))
+            except ValidationError as e:
+                return JsonResponse({'success': False, 'error': e.messages[0]}, status=400)
 
         user.save()
         return JsonResponse({'success': True})
@@ -108,4 +125,15 @@ def toggle_user(request):
         user.save()
         return JsonResponse({'success': True})
     except Exception as e:
-        return JsonResponse({'success': False, 'error': str(e)})
\ No newline at end of file
+        return JsonResponse({'success': False, 'error': str(e)})
+
+# Счётчики кэша текущего процесса (для каждого воркера свои)
+@login_required
+def cache_stats(request):
+    if not request.user.is_staff:
+        return JsonResponse({'error': 'Доступ запрещён'}, status=403)
+
+    stats = getattr(cache, 'stats', None)
+    if stats is None:
+        return JsonResponse({'error': 'Кэш не ведёт статистику'}, status=404)
+    return JsonResponse({'pid': os.getpid(), **stats()})